@@ -3,6 +3,7 @@ import sys
 import os
 from datetime import datetime
 import time
+import uuid
 
 # Agregar path del proyecto
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -12,6 +13,7 @@ from config import Config
 from rag_system import RAGSystem
 from ingestion_pipeline import IngestionPipeline
 from vector_database import VectorDatabase
+from profiling import profile_request
 
 # Configuración de la página
 st.set_page_config(
@@ -470,8 +472,11 @@ if mode == "💬 Chat Inteligente":
             try:
                 start_time = time.time()
                 
-                # Ejecutar RAG
-                result = st.session_state.rag_system.query(query)
+                # Ejecutar RAG (perfilado bajo demanda con ?profile=1 o PROFILE_SAMPLE_RATE)
+                request_id = uuid.uuid4().hex[:12]
+                profile_flag = True if st.query_params.get("profile") == "1" else None
+                with profile_request(request_id, enabled=profile_flag):
+                    result = st.session_state.rag_system.query(query)
                 
                 end_time = time.time()
                 response_time = end_time - start_time
@@ -610,24 +615,43 @@ elif mode == "⚙️ Configuración":
                         with open(temp_path, 'wb') as f:
                             f.write(uploaded_file.getvalue())
                         
-                        # Ingestar
+                        # Ingestar (progreso real por etapa)
                         progress_bar = st.progress(0)
-                        st.write("1️⃣ Extrayendo texto...")
-                        progress_bar.progress(25)
+                        stage_status = st.empty()
+                        stage_labels = {
+                            'extract': "1️⃣ Extrayendo texto",
+                            'clean': "2️⃣ Limpiando",
+                            'chunk': "3️⃣ Dividiendo en chunks",
+                            'embed': "4️⃣ Generando embeddings",
+                            'store': "5️⃣ Almacenando en base de datos"
+                        }
                         
-                        st.write("2️⃣ Generando embeddings...")
-                        progress_bar.progress(50)
+                        def show_progress(snapshot):
+                            progress_bar.progress(int(snapshot['fraction'] * 100))
+                            lines = []
+                            for stage in snapshot['stages']:
+                                done = stage['items_out'] if stage['name'] == 'extract' else stage['items_in']
+                                icon = "✅" if stage['finished'] else "⏳"
+                                lines.append(
+                                    f"{icon} {stage_labels.get(stage['name'], stage['name'])}: "
+                                    f"{done} {stage['unit']} ({stage['throughput']:.1f}/s, "
+                                    f"{stage['workers']} worker(s), en cola: {stage['queued']})"
+                                )
+                            stage_status.markdown("\n\n".join(lines))
                         
-                        result = st.session_state.ingestion.ingest_single_document(temp_path)
-                        progress_bar.progress(75)
-                        
-                        st.write("3️⃣ Almacenando en base de datos...")
+                        result = st.session_state.ingestion.ingest_single_document(
+                            temp_path, source_name=uploaded_file.name,
+                            progress_callback=show_progress
+                        )
                         progress_bar.progress(100)
                         
                         # Limpiar archivo temporal
                         os.remove(temp_path)
                         
-                        st.success(f"""
+                        if result['status'] == 'unchanged':
+                            st.info(f"ℹ️ **{uploaded_file.name}** no ha cambiado desde la última ingesta; se omitió ({result['chunks_count']} chunks existentes).")
+                        else:
+                            st.success(f"""
                         ✅ **Documento ingestado exitosamente!**
                         - Chunks creados: {result['chunks_count']}
                         - Embeddings generados: {result['embeddings_count']}
@@ -14,9 +14,15 @@ Course: Building GenAI Applications with Bedrock and Python
 import boto3
 import json
 import os
-from typing import Dict, List, Optional, Any
+from collections.abc import Mapping
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Any
 from botocore.exceptions import ClientError
 
+from profiling import profile_request
+from tracing import set_attribute, start_span, traced
+
 # ============================================================================
 # Configuration
 # ============================================================================
@@ -26,14 +32,99 @@ KNOWLEDGE_BASE_ID = os.getenv("KNOWLEDGE_BASE_ID", "")
 EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
 LLM_MODEL_ID = os.getenv("LLM_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
 
+# Optional endpoint override, e.g. the local emulator in scripts/bedrock_emulator.py
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL") or None
+
 # Initialize Bedrock clients
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-bedrock_agent_runtime = boto3.client("bedrock-agent-runtime", region_name=AWS_REGION)
+bedrock_runtime = boto3.client(
+    "bedrock-runtime", region_name=AWS_REGION, endpoint_url=BEDROCK_ENDPOINT_URL
+)
+bedrock_agent_runtime = boto3.client(
+    "bedrock-agent-runtime", region_name=AWS_REGION, endpoint_url=BEDROCK_ENDPOINT_URL
+)
+
+# ============================================================================
+# Result Types
+# ============================================================================
+
+PREVIEW_LENGTH = 200
+
+
+class _DictCompat(Mapping):
+    """
+    Read-only mapping over `_keys`, so callers written for the old dicts keep
+    working: hit['text'], dict(hit), **hit, iteration, len() and comparison
+    with a dict. json.dumps needs a plain dict: json.dumps(hit.to_dict())
+    or json.dumps(results, default=dict).
+    """
+    
+    __slots__ = ()
+    _keys = ()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the plain dict format returned by earlier versions."""
+        return {key: getattr(self, key) for key in self._keys}
+
+
+# eq=False keeps Mapping's dict-style equality
+@dataclass(frozen=True, eq=False)
+class RetrievalHit(_DictCompat):
+    """
+    One document chunk returned by the Knowledge Base.
+    
+    `metadata` and `location` reference the objects from the API response
+    instead of copying them; `document_id` is only resolved when accessed.
+    """
+    
+    __slots__ = ('text', 'score', 'metadata', 'location')
+    _keys = ('text', 'score', 'metadata', 'location', 'document_id')
+    
+    text: str
+    score: float
+    metadata: Dict[str, Any]
+    location: Dict[str, Any]
+    
+    @property
+    def document_id(self) -> str:
+        return self.location.get('s3Location', {}).get('uri', 'unknown')
+
+
+@dataclass(frozen=True, eq=False)
+class SourceRef(_DictCompat):
+    """A document cited in a generated response; the preview is built on access."""
+    
+    __slots__ = ('document_id', 'score', 'text')
+    _keys = ('document_id', 'score', 'preview')
+    
+    document_id: str
+    score: float
+    text: str
+    
+    @property
+    def preview(self) -> str:
+        if len(self.text) > PREVIEW_LENGTH:
+            return self.text[:PREVIEW_LENGTH] + '...'
+        return self.text
 
 # ============================================================================
 # Knowledge Base Query Function
 # ============================================================================
 
+@traced("query_knowledge_base")
 def query_knowledge_base(
     query: str,
     knowledge_base_id: str = KNOWLEDGE_BASE_ID,
@@ -55,7 +146,9 @@ def query_knowledge_base(
         
     Returns:
         Dict containing:
-            - 'results': List of retrieved documents with text and metadata
+            - 'results': List of RetrievalHit objects (text, score, metadata,
+              location, document_id); they support dict-style access and
+              to_dict() for code written against the previous dict format
             - 'count': Number of results returned
             - 'query': Original query
             
@@ -80,18 +173,21 @@ def query_knowledge_base(
             raise ValueError("score_threshold must be between 0.0 and 1.0")
         
         # Call Bedrock Agent Runtime API to retrieve documents
-        response = bedrock_agent_runtime.retrieve(
-            knowledgeBaseId=knowledge_base_id,
-            retrievalQuery={
-                'text': query.strip()
-            },
-            retrievalConfiguration={
-                'vectorSearchConfiguration': {
-                    'numberOfResults': max_results,
-                    'overrideSearchType': 'HYBRID'  # Use both semantic and keyword search
+        with start_span("bedrock.retrieve", knowledge_base_id=knowledge_base_id,
+                        max_results=max_results):
+            response = bedrock_agent_runtime.retrieve(
+                knowledgeBaseId=knowledge_base_id,
+                retrievalQuery={
+                    'text': query.strip()
+                },
+                retrievalConfiguration={
+                    'vectorSearchConfiguration': {
+                        'numberOfResults': max_results,
+                        'overrideSearchType': 'HYBRID'  # Use both semantic and keyword search
+                    }
                 }
-            }
-        )
+            )
+            set_attribute('raw_result_count', len(response.get('retrievalResults', [])))
         
         # Process and filter results based on score threshold
         results = []
@@ -100,17 +196,16 @@ def query_knowledge_base(
             
             # Only include results above threshold
             if score >= score_threshold:
-                result_doc = {
-                    'text': item['content']['text'],
-                    'score': score,
-                    'metadata': item.get('metadata', {}),
-                    'location': item.get('location', {}),
-                    'document_id': item.get('location', {}).get('s3Location', {}).get('uri', 'unknown')
-                }
-                results.append(result_doc)
+                results.append(RetrievalHit(
+                    item['content']['text'],
+                    score,
+                    item.get('metadata', {}),
+                    item.get('location', {})
+                ))
         
         # Sort by score descending
-        results.sort(key=lambda x: x['score'], reverse=True)
+        results.sort(key=attrgetter('score'), reverse=True)
+        set_attribute('result_count', len(results))
         
         return {
             'results': results,
@@ -144,6 +239,7 @@ def query_knowledge_base(
 # Response Generation Function
 # ============================================================================
 
+@traced("generate_response")
 def generate_response(
     query: str,
     context_documents: List[Dict[str, Any]],
@@ -176,7 +272,7 @@ def generate_response(
         Dict containing:
             - 'response': Generated text response
             - 'model_id': Model used
-            - 'sources': List of source documents used
+            - 'sources': List of SourceRef objects (document_id, score, preview)
             - 'usage': Token usage statistics
             
     Example:
@@ -210,11 +306,7 @@ def generate_response(
             ])
             
             sources = [
-                {
-                    'document_id': doc['document_id'],
-                    'score': doc['score'],
-                    'preview': doc['text'][:200] + '...' if len(doc['text']) > 200 else doc['text']
-                }
+                SourceRef(doc['document_id'], doc['score'], doc['text'])
                 for doc in context_documents[:5]
             ]
         else:
@@ -263,13 +355,14 @@ Por favor, responde a la pregunta del empleado basándote en los documentos prop
         }
         
         # Call Bedrock Runtime API
-        response = bedrock_runtime.invoke_model(
-            modelId=model_id,
-            body=json.dumps(request_body)
-        )
-        
-        # Parse response
-        response_body = json.loads(response['body'].read())
+        with start_span("bedrock.invoke_model", model_id=model_id, max_tokens=max_tokens):
+            response = bedrock_runtime.invoke_model(
+                modelId=model_id,
+                body=json.dumps(request_body)
+            )
+            
+            # Parse response
+            response_body = json.loads(response['body'].read())
         
         # Extract generated text
         generated_text = response_body['content'][0]['text']
@@ -281,6 +374,10 @@ Por favor, responde a la pregunta del empleado basándote en los documentos prop
             'total_tokens': response_body.get('usage', {}).get('input_tokens', 0) + 
                            response_body.get('usage', {}).get('output_tokens', 0)
         }
+        set_attribute('model_id', model_id)
+        set_attribute('context_documents', len(context_documents or []))
+        set_attribute('input_tokens', usage['input_tokens'])
+        set_attribute('output_tokens', usage['output_tokens'])
         
         return {
             'response': generated_text,
@@ -319,6 +416,7 @@ Por favor, responde a la pregunta del empleado basándote en los documentos prop
 # Prompt Validation Function
 # ============================================================================
 
+@traced("valid_prompt")
 def valid_prompt(user_prompt: str) -> Dict[str, Any]:
     """
     Validate and categorize user prompts for safety and appropriate handling.
@@ -452,6 +550,8 @@ def valid_prompt(user_prompt: str) -> Dict[str, Any]:
             if matches:
                 entities[key] = matches
         
+        set_attribute('category', primary_category)
+        
         # Determine recommendation
         if confidence >= 0.6:
             recommendation = 'process'
@@ -488,6 +588,7 @@ def valid_prompt(user_prompt: str) -> Dict[str, Any]:
 # Complete RAG Pipeline Function
 # ============================================================================
 
+@traced("rag_pipeline")
 def rag_pipeline(
     user_query: str,
     knowledge_base_id: str = KNOWLEDGE_BASE_ID,
@@ -495,7 +596,9 @@ def rag_pipeline(
     temperature: float = 0.7,
     top_p: float = 0.9,
     max_results: int = 5,
-    score_threshold: float = 0.1
+    score_threshold: float = 0.1,
+    profile: Optional[bool] = None,
+    request_id: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Complete RAG pipeline: validate -> retrieve -> generate.
@@ -508,44 +611,48 @@ def rag_pipeline(
         top_p (float): LLM top_p parameter
         max_results (int): Max documents to retrieve
         score_threshold (float): Minimum similarity score
+        profile (bool): Force profiling of this request on/off; None follows
+            PROFILE_SAMPLE_RATE (see profiling.py)
+        request_id (str): Identifier used to name the profile output files
         
     Returns:
         Dict with validation, retrieval, and generation results
     """
-    # Step 1: Validate prompt
-    validation = valid_prompt(user_query)
-    
-    if not validation['is_valid']:
+    with profile_request(request_id, enabled=profile):
+        # Step 1: Validate prompt
+        validation = valid_prompt(user_query)
+        
+        if not validation['is_valid']:
+            return {
+                'validation': validation,
+                'retrieval': None,
+                'generation': None,
+                'final_response': f"Lo siento, no puedo procesar tu pregunta: {validation['reason']}"
+            }
+        
+        # Step 2: Retrieve relevant documents
+        retrieval = query_knowledge_base(
+            query=user_query,
+            knowledge_base_id=knowledge_base_id,
+            max_results=max_results,
+            score_threshold=score_threshold
+        )
+        
+        # Step 3: Generate response
+        generation = generate_response(
+            query=user_query,
+            context_documents=retrieval['results'],
+            model_id=model_id,
+            temperature=temperature,
+            top_p=top_p
+        )
+        
         return {
             'validation': validation,
-            'retrieval': None,
-            'generation': None,
-            'final_response': f"Lo siento, no puedo procesar tu pregunta: {validation['reason']}"
+            'retrieval': retrieval,
+            'generation': generation,
+            'final_response': generation['response']
         }
-    
-    # Step 2: Retrieve relevant documents
-    retrieval = query_knowledge_base(
-        query=user_query,
-        knowledge_base_id=knowledge_base_id,
-        max_results=max_results,
-        score_threshold=score_threshold
-    )
-    
-    # Step 3: Generate response
-    generation = generate_response(
-        query=user_query,
-        context_documents=retrieval['results'],
-        model_id=model_id,
-        temperature=temperature,
-        top_p=top_p
-    )
-    
-    return {
-        'validation': validation,
-        'retrieval': retrieval,
-        'generation': generation,
-        'final_response': generation['response']
-    }
 
 # ============================================================================
 # Testing and Examples
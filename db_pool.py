@@ -0,0 +1,309 @@
+"""
+PostgreSQL Connection Pool for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+Streamlit creates a RAGSystem per browser session; with one connection per
+VectorDatabase, every open tab held its own Aurora connection. This module
+provides a bounded, thread-safe pool shared by every VectorDatabase with
+the same connection settings:
+- ConnectionPool.connection: Lease a connection for one operation
+- get_pool: Shared pool per DSN
+- pool_statistics: Lease and wait-time metrics of every pool
+
+Connections are checked before they are handed out: one idle for longer
+than DB_POOL_CHECK_IDLE seconds is pinged with SELECT 1, and one older than
+DB_POOL_MAX_LIFETIME is replaced (so failovers and credential rotation are
+picked up). Every connection runs with statement_timeout set, so a slow
+query cannot hold a lease indefinitely.
+
+Configuration (environment variables):
+    DB_POOL_MIN_SIZE         Connections opened up front (default 1)
+    DB_POOL_MAX_SIZE         Maximum open connections (default 20)
+    DB_POOL_TIMEOUT          Seconds to wait for a free connection (default 30)
+    DB_POOL_MAX_LIFETIME     Seconds before a connection is replaced (default 1800)
+    DB_POOL_CHECK_IDLE       Idle seconds after which a lease pings first (default 30)
+    DB_STATEMENT_TIMEOUT_MS  Server-side statement timeout (default 30000; 0 disables)
+
+Example:
+    >>> pool = get_pool(dsn)
+    >>> with pool.connection() as conn:
+    ...     with conn, conn.cursor() as cur:
+    ...         cur.execute("SELECT 1")
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+
+from tracing import set_attribute
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+# ============================================================================
+# Connection Pool
+# ============================================================================
+
+class _Pooled:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    Callers block (up to `timeout` seconds) when all `max_size` connections
+    are leased. A connection that raised a connection-level error, or that
+    is returned closed, is discarded instead of reused.
+    """
+
+    def __init__(self, dsn: Dict[str, Any], min_size: int = DB_POOL_MIN_SIZE,
+                 max_size: int = DB_POOL_MAX_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME, check_idle: float = DB_POOL_CHECK_IDLE,
+                 statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+        """
+        Args:
+            dsn (Dict): psycopg2.connect keyword arguments
+            min_size (int): Connections opened up front
+            max_size (int): Maximum open connections
+            timeout (float): Seconds to wait for a free connection
+            max_lifetime (float): Seconds before a connection is replaced
+            check_idle (float): Idle seconds after which a lease is pinged first
+            statement_timeout_ms (int): Server-side statement timeout (0 disables)
+        """
+        self.dsn = dict(dsn)
+        if statement_timeout_ms > 0:
+            options = self.dsn.get('options', '')
+            self.dsn['options'] = f"{options} -c statement_timeout={statement_timeout_ms}".strip()
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+
+        self._cond = threading.Condition()
+        self._idle: List[_Pooled] = []
+        self._open = 0
+        self._closed = False
+
+        # Metrics
+        self._leases = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+        for _ in range(min(max(0, min_size), self.max_size)):
+            self._idle.append(self._create())
+
+    def _create(self) -> _Pooled:
+        conn = psycopg2.connect(**self.dsn)
+        with self._cond:
+            self._open += 1
+            self._created += 1
+        return _Pooled(conn)
+
+    def _discard(self, pooled: _Pooled) -> None:
+        try:
+            if not pooled.conn.closed:
+                pooled.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _healthy(self, pooled: _Pooled) -> bool:
+        if pooled.conn.closed or time.monotonic() - pooled.created_at > self.max_lifetime:
+            return False
+        if time.monotonic() - pooled.last_used > self.check_idle:
+            try:
+                with pooled.conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                pooled.conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _acquire(self) -> _Pooled:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                while not self._idle and self._open >= self.max_size:
+                    waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._open >= self.max_size:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"No database connection free after {self.timeout:g}s "
+                                f"({self.max_size} in use)"
+                            )
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    # Reserve the slot before connecting outside the lock
+                    self._open += 1
+            if pooled is None:
+                try:
+                    conn = psycopg2.connect(**self.dsn)
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                pooled = _Pooled(conn)
+            elif not self._healthy(pooled):
+                self._discard(pooled)
+                continue
+
+            wait = time.monotonic() - start
+            with self._cond:
+                self._leases += 1
+                if waited:
+                    self._waits += 1
+                self._wait_seconds += wait
+                self._max_wait = max(self._max_wait, wait)
+            set_attribute('pool_wait_ms', round(wait * 1000, 2))
+            return pooled
+
+    def _release(self, pooled: _Pooled, broken: bool) -> None:
+        conn = pooled.conn
+        if not broken and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except Exception:
+                broken = True
+        if broken or conn.closed or self._closed:
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Lease a connection for the duration of the block.
+
+        Use `with conn:` inside the block for a transaction; anything left
+        open is rolled back when the lease ends.
+
+        Raises:
+            PoolTimeout: All connections stayed leased for `timeout` seconds
+        """
+        pooled = self._acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool size and lease metrics.
+
+        Returns:
+            Dict with 'open', 'idle', 'in_use', 'max_size', 'leases',
+            'waits' (leases that had to wait), 'avg_wait_ms', 'max_wait_ms',
+            'timeouts', 'created' and 'discarded'
+        """
+        with self._cond:
+            return {
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'max_size': self.max_size,
+                'leases': self._leases,
+                'waits': self._waits,
+                'avg_wait_ms': self._wait_seconds / self._leases * 1000 if self._leases else 0.0,
+                'max_wait_ms': self._max_wait * 1000,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded
+            }
+
+    def close(self) -> None:
+        """Close idle connections; leased ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+# ============================================================================
+# Shared Pools
+# ============================================================================
+
+_pools: Dict[Tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: Dict[str, Any], **options: Any) -> ConnectionPool:
+    """
+    The process-wide pool for a DSN, created on first use.
+
+    Args:
+        dsn (Dict): psycopg2.connect keyword arguments
+        **options: ConnectionPool arguments, used only when the pool is created
+    """
+    key = tuple(sorted(dsn.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = _pools[key] = ConnectionPool(dsn, **options)
+        return pool
+
+
+def pool_statistics() -> List[Dict[str, Any]]:
+    """stats() of every shared pool, with its host and database."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [
+        {'host': pool.dsn.get('host'), 'dbname': pool.dsn.get('dbname'), **pool.stats()}
+        for pool in pools
+    ]
+
+
+def close_pools() -> None:
+    """Close every shared pool (process shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,293 @@
+"""
+Near-Duplicate Chunk Detection for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+HR documents repeat headers, legal disclaimers and signature blocks across
+hundreds of files. This module finds such chunks before they are embedded:
+- minhash_signature: MinHash signature of a chunk's word shingles
+- text_key: Hash of a chunk's normalized words, for exact matching
+- DuplicateIndex: Persistent LSH index of stored chunks plus the list of
+  every other source each stored chunk also appears in
+
+A chunk whose estimated Jaccard similarity with an already stored chunk is
+at least DEDUP_THRESHOLD is not embedded or stored; instead it is linked to
+that canonical chunk, and the canonical chunk's metadata lists every
+source (file, chunk index, pages) so answers can still cite all of them.
+
+Dropping a chunk is lossy: chunks that differ only in a number, date or
+amount (two versions of a policy, the same table with other figures) are
+well above 0.9 similar, and answers would silently come from the other
+chunk. Detection is therefore off by default, and the default threshold
+1.0 links only chunks with the same words (case and punctuation aside);
+lower thresholds are for corpora where such differences do not matter.
+
+Signatures are split into DEDUP_BANDS bands for locality-sensitive hashing:
+two chunks are compared only if at least one band matches exactly, which
+keeps lookups constant-time as the corpus grows.
+
+Configuration (environment variables):
+    DEDUP_ENABLED    Detect duplicates during ingestion (default false)
+    DEDUP_THRESHOLD  Minimum estimated Jaccard similarity; 1.0 (default)
+                     requires identical words
+    DEDUP_INDEX_PATH SQLite index file (default .docsmart_dedup.db)
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "1.0"))
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", ".docsmart_dedup.db")
+
+# 128 permutations in 32 bands of 4 rows: pairs above ~0.42 similarity
+# share a band with high probability; candidates are then checked exactly
+# against DEDUP_THRESHOLD
+NUM_PERM = 128
+DEDUP_BANDS = 32
+SHINGLE_WORDS = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r'\w+')
+
+# ============================================================================
+# Signatures
+# ============================================================================
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> Set[str]:
+    """Lower-cased word n-grams of a text (the whole text if it is shorter)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature of a chunk.
+
+    Returns:
+        uint32 array of NUM_PERM values; the fraction of equal positions in
+        two signatures estimates the Jaccard similarity of their shingles
+    """
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+         for s in shingles(text)],
+        dtype=np.uint64
+    )
+    # (a * h + b) mod p, truncated to 32 bits, for every permutation at once
+    permuted = ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def text_key(text: str) -> str:
+    """Hash of a chunk's lower-cased words; equal keys mean the same words in the same order."""
+    return hashlib.blake2b(" ".join(_WORD.findall(text.lower())).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, int]]:
+    rows = NUM_PERM // DEDUP_BANDS
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                              digest_size=8).digest(), 'little', signed=True))
+        for band in range(DEDUP_BANDS)
+    ]
+
+# ============================================================================
+# Duplicate Index
+# ============================================================================
+
+class DuplicateIndex:
+    """
+    SQLite-backed LSH index of canonical (stored) chunks and their duplicates.
+
+    Writes are not committed automatically. Commit after each batch of
+    chunks so concurrent ingestion sessions are not locked out for a whole
+    document; to undo a failed document, use remove_source().
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, threshold: float = DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                text_key TEXT
+            );
+            CREATE INDEX IF NOT EXISTS signatures_source ON signatures (source);
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS buckets_chunk ON buckets (chunk_id);
+            CREATE TABLE IF NOT EXISTS links (
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                file_name TEXT,
+                chunk_index INTEGER NOT NULL,
+                page_start INTEGER,
+                page_end INTEGER,
+                chars INTEGER NOT NULL,
+                PRIMARY KEY (source, chunk_index)
+            );
+            CREATE INDEX IF NOT EXISTS links_chunk ON links (chunk_id);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        if 'text_key' not in columns:
+            # Index created before exact matching existed
+            self._conn.execute("ALTER TABLE signatures ADD COLUMN text_key TEXT")
+        self._conn.commit()
+
+    def find(self, signature: np.ndarray, key: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Most similar canonical chunk at or above the threshold.
+
+        Args:
+            signature (np.ndarray): minhash_signature of the chunk
+            key (str): text_key of the chunk; at threshold 1.0 only a
+                canonical chunk with the same key matches
+
+        Returns:
+            (chunk_id, similarity) or None
+        """
+        keys = _band_keys(signature)
+        with self._lock:
+            candidates = set()
+            for band, bucket in keys:
+                candidates.update(
+                    row[0] for row in self._conn.execute(
+                        "SELECT chunk_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                    )
+                )
+            best = None
+            for chunk_id in candidates:
+                row = self._conn.execute(
+                    "SELECT signature, text_key FROM signatures WHERE chunk_id = ?", (chunk_id,)
+                ).fetchone()
+                if self.threshold >= 1.0 and (key is None or row[1] != key):
+                    continue
+                score = similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (chunk_id, score)
+        return best
+
+    def add(self, chunk_id: str, source: str, signature: np.ndarray, key: Optional[str] = None) -> None:
+        """Register a stored (canonical) chunk."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (chunk_id, source, signature, text_key) VALUES (?, ?, ?, ?)",
+                (chunk_id, source, signature.astype(np.uint32).tobytes(), key)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                [(band, bucket, chunk_id) for band, bucket in _band_keys(signature)]
+            )
+
+    def link(self, chunk_id: str, source: str, file_name: str, chunk_index: int,
+             page_start: Optional[int], page_end: Optional[int], chars: int) -> None:
+        """Record that chunk `chunk_index` of `source` duplicates canonical `chunk_id`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO links "
+                "(chunk_id, source, file_name, chunk_index, page_start, page_end, chars) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chunk_id, source, file_name, chunk_index, page_start, page_end, chars)
+            )
+
+    def sources_of(self, chunk_id: str) -> List[Dict[str, Any]]:
+        """Other sources a canonical chunk appears in (for citations)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, file_name, chunk_index, page_start, page_end FROM links "
+                "WHERE chunk_id = ? ORDER BY source, chunk_index", (chunk_id,)
+            ).fetchall()
+        return [
+            {'source': r[0], 'file_name': r[1], 'chunk_index': r[2], 'page_start': r[3], 'page_end': r[4]}
+            for r in rows
+        ]
+
+    def remove_source(self, source: str) -> Tuple[Set[str], Set[str]]:
+        """
+        Forget a document: its canonical chunks and its links.
+
+        Returns:
+            (canonical chunk ids of other documents whose source lists lost
+            an entry, other sources that linked to this document's chunks
+            and therefore must be re-ingested)
+        """
+        with self._lock:
+            refreshed = {
+                row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT l.chunk_id FROM links l JOIN signatures s ON s.chunk_id = l.chunk_id "
+                    "WHERE l.source = ? AND s.source != ?", (source, source)
+                )
+            }
+            dependents = {
+                row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT l.source FROM links l JOIN signatures s ON s.chunk_id = l.chunk_id "
+                    "WHERE s.source = ? AND l.source != ?", (source, source)
+                )
+            }
+            owned = [row[0] for row in self._conn.execute(
+                "SELECT chunk_id FROM signatures WHERE source = ?", (source,)
+            )]
+            self._conn.execute("DELETE FROM links WHERE source = ?", (source,))
+            for chunk_id in owned:
+                self._conn.execute("DELETE FROM buckets WHERE chunk_id = ?", (chunk_id,))
+                self._conn.execute("DELETE FROM links WHERE chunk_id = ?", (chunk_id,))
+            self._conn.execute("DELETE FROM signatures WHERE source = ?", (source,))
+        return refreshed, dependents
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self) -> None:
+        with self._lock:
+            self._conn.rollback()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Savings so far.
+
+        Returns:
+            Dict with 'canonical_chunks', 'duplicate_chunks' (= embedding
+            calls and rows avoided) and 'chars_avoided' (text not stored)
+        """
+        with self._lock:
+            canonical = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            duplicates, chars = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM links"
+            ).fetchone()
+        return {'canonical_chunks': canonical, 'duplicate_chunks': duplicates, 'chars_avoided': chars}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,181 @@
+"""
+Document Manifest for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module remembers what has already been ingested (or uploaded) so that
+re-syncs only touch new, changed and removed files:
+- file_fingerprint: Size, mtime and SHA-256 content hash of a file
+- DocumentManifest: SQLite record of every file's fingerprint, chunk ids,
+  embedding model and chunking parameters
+
+Size and mtime are checked first; the file is only hashed when they differ
+from the manifest, so an unchanged 50K-document share is scanned with one
+stat() per file.
+
+Example:
+    >>> manifest = DocumentManifest(".docsmart_manifest.db")
+    >>> status, fingerprint = manifest.check("docs/politica.pdf", "amazon.titan-embed-text-v2:0")
+    >>> if status != "unchanged":
+    ...     chunk_ids = ingest(...)
+    ...     manifest.record("docs/politica.pdf", fingerprint, chunk_ids, "amazon.titan-embed-text-v2:0")
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Read files in 1 MB blocks when hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# ============================================================================
+# Fingerprints
+# ============================================================================
+
+def hash_file(path: str) -> str:
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Size, mtime (ns) and content hash of a file."""
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': content_hash or hash_file(path)
+    }
+
+# ============================================================================
+# Manifest
+# ============================================================================
+
+class DocumentManifest:
+    """Persistent record of ingested documents keyed by path."""
+
+    def __init__(self, path: str = ".docsmart_manifest.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                embedding_model TEXT,
+                ingested_at REAL NOT NULL,
+                chunking TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if 'chunking' not in columns:
+            # Manifests created before chunking parameters were recorded
+            self._conn.execute("ALTER TABLE documents ADD COLUMN chunking TEXT")
+        self._conn.commit()
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, size, mtime_ns, chunk_ids, embedding_model, ingested_at, chunking "
+                "FROM documents WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'path': path,
+            'content_hash': row[0],
+            'size': row[1],
+            'mtime_ns': row[2],
+            'chunk_ids': json.loads(row[3]),
+            'embedding_model': row[4],
+            'ingested_at': row[5],
+            'chunking': row[6]
+        }
+
+    def check(self, path: str, embedding_model: Optional[str] = None,
+              chunking: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Compare a file on disk with its manifest entry.
+
+        Args:
+            path (str): File path (the manifest key)
+            embedding_model (str): Model the caller will embed with; a different
+                model than the recorded one counts as a change
+            chunking (str): Chunking parameters the caller will use; a
+                difference also counts as a change
+
+        Returns:
+            (status, fingerprint) where status is "new", "changed" or
+            "unchanged". The fingerprint is None only for unchanged files
+            whose size and mtime matched (no hashing was needed).
+        """
+        entry = self.get(path)
+        if entry is None:
+            return 'new', file_fingerprint(path)
+
+        settings_changed = (
+            (embedding_model is not None and entry['embedding_model'] != embedding_model)
+            or (chunking is not None and entry['chunking'] != chunking)
+        )
+        stat = os.stat(path)
+        if not settings_changed and stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return 'unchanged', None
+
+        fingerprint = file_fingerprint(path)
+        if not settings_changed and fingerprint['content_hash'] == entry['content_hash']:
+            # Touched but not modified: refresh mtime so the next scan skips hashing
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE documents SET size = ?, mtime_ns = ? WHERE path = ?",
+                    (fingerprint['size'], fingerprint['mtime_ns'], path)
+                )
+                self._conn.commit()
+            return 'unchanged', fingerprint
+        return 'changed', fingerprint
+
+    def record(self, path: str, fingerprint: Dict[str, Any], chunk_ids: List[str],
+               embedding_model: Optional[str] = None, chunking: Optional[str] = None) -> None:
+        """Store (or replace) the entry for a file after it was processed."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(path, content_hash, size, mtime_ns, chunk_ids, embedding_model, ingested_at, chunking) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, fingerprint['content_hash'], fingerprint['size'], fingerprint['mtime_ns'],
+                 json.dumps(chunk_ids), embedding_model, time.time(), chunking)
+            )
+            self._conn.commit()
+
+    def invalidate(self, path: str) -> None:
+        """Force the next check() of a file to report it as changed."""
+        with self._lock:
+            self._conn.execute("UPDATE documents SET content_hash = '', size = -1 WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def paths(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM documents")]
+
+    def missing_paths(self, present: List[str]) -> List[str]:
+        """Manifest entries whose file is no longer in `present`."""
+        present_set = set(present)
+        return [path for path in self.paths() if path not in present_set]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
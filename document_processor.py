@@ -0,0 +1,304 @@
+"""
+Document Processor for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module turns source files into clean text chunks ready for embedding:
+- extract_text: Read PDF, DOCX, TXT and MD files
+- iter_segments: Stream a file as pages / paragraph blocks
+- clean_text: Normalize whitespace and drop empty lines
+- chunk_text: Split into overlapping chunks, preferring sentence boundaries
+- StreamingChunker / iter_chunks: Same chunking over a stream of segments
+  (SegmentBuffer is the base for other incremental chunkers)
+
+Chunking parameters follow the README defaults (CHUNK_SIZE=1000,
+CHUNK_OVERLAP=200 characters).
+"""
+
+import os
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.md'}
+
+# Target size of one streamed segment for DOCX/TXT (PDFs stream per page)
+SEGMENT_CHARS = 64 * 1024
+
+# ============================================================================
+# Text Extraction
+# ============================================================================
+
+def extract_text(file_path: str) -> str:
+    """
+    Extract the raw text of a document.
+
+    Args:
+        file_path (str): Path to a PDF, DOCX, TXT or MD file
+
+    Returns:
+        The document text
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    extension = Path(file_path).suffix.lower()
+
+    if extension == '.pdf':
+        from PyPDF2 import PdfReader
+        reader = PdfReader(file_path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    if extension == '.docx':
+        from docx import Document
+        document = Document(file_path)
+        return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+    if extension in ('.txt', '.md'):
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def _group_blocks(blocks: Iterable[str], separator: str) -> Iterator[str]:
+    """Join small blocks into segments of about SEGMENT_CHARS characters."""
+    buffer: List[str] = []
+    size = 0
+    for block in blocks:
+        buffer.append(block)
+        size += len(block) + len(separator)
+        if size >= SEGMENT_CHARS:
+            yield separator.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield separator.join(buffer)
+
+
+def _iter_text_file(file_path: str) -> Iterator[str]:
+    """Paragraphs of a text file, read line by line."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        paragraph: List[str] = []
+        for line in f:
+            if line.strip():
+                paragraph.append(line.rstrip('\n'))
+            elif paragraph:
+                yield '\n'.join(paragraph)
+                paragraph = []
+        if paragraph:
+            yield '\n'.join(paragraph)
+
+
+def iter_segments(file_path: str) -> Iterator[str]:
+    """
+    Stream the text of a document without loading all of it at once.
+
+    PDFs yield one segment per page (pages are read one at a time, so the
+    full text is never held in memory); DOCX and TXT/MD yield groups of
+    paragraphs of about SEGMENT_CHARS characters. Segment boundaries are
+    paragraph breaks, so iter_chunks joins them with a blank line.
+
+    Args:
+        file_path (str): Path to a PDF, DOCX, TXT or MD file
+
+    Returns:
+        Iterator over raw (uncleaned) text segments
+    """
+    extension = Path(file_path).suffix.lower()
+
+    if extension == '.pdf':
+        from PyPDF2 import PdfReader
+        reader = PdfReader(file_path)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    if extension == '.docx':
+        from docx import Document
+        document = Document(file_path)
+        yield from _group_blocks((p.text for p in document.paragraphs), "\n")
+        return
+
+    if extension in ('.txt', '.md'):
+        yield from _group_blocks(_iter_text_file(file_path), "\n\n")
+        return
+
+    raise ValueError(f"Unsupported file type: {extension}")
+
+# ============================================================================
+# Cleaning and Chunking
+# ============================================================================
+
+def clean_text(text: str) -> str:
+    """Normalize Unicode, collapse runs of spaces and drop blank lines (keeping paragraphs)."""
+    text = unicodedata.normalize('NFC', text)
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into chunks of about `chunk_size` characters.
+
+    Each chunk ends at the last sentence or paragraph break in its second
+    half when there is one, and the next chunk starts `chunk_overlap`
+    characters before that end.
+
+    Args:
+        text (str): Cleaned document text
+        chunk_size (int): Target chunk length in characters
+        chunk_overlap (int): Characters shared by consecutive chunks
+
+    Returns:
+        List of chunk strings
+    """
+    return list(iter_chunks([text], chunk_size, chunk_overlap))
+
+
+def _chunk_end(window: str, start: int, chunk_size: int) -> int:
+    boundary = max(window.rfind('\n\n'), window.rfind('. '), window.rfind('\n'))
+    if boundary > chunk_size // 2:
+        return start + boundary + 1
+    return start + len(window)
+
+
+class SegmentBuffer(ABC):
+    """
+    Base for incremental chunkers: feed cleaned segments in document order
+    with add() and call finish() at the end. Only the text not yet covered
+    by an emitted chunk (about one chunk) stays buffered, so a 2,000-page
+    PDF is chunked in constant memory and its first chunks are available
+    after the first pages.
+
+    Subclasses implement _spans(final), returning the (start, end) offsets
+    of the chunks that are complete and the offset the next chunk starts
+    at. Chunk strings are only materialized for those spans.
+
+    Each emitted chunk is a dict with 'text', 'page_start' and 'page_end'
+    (the pages passed to add(); None for documents without pages).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._first = True
+        # (offset in buffer, page) for every segment start still in the buffer
+        self._pages: List[Tuple[int, Optional[int]]] = []
+
+    @abstractmethod
+    def _spans(self, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        """Complete chunk spans in the buffer and the start of the next chunk."""
+
+    def _page_at(self, position: int) -> Optional[int]:
+        page = None
+        for offset, segment_page in self._pages:
+            if offset > position:
+                break
+            page = segment_page
+        return page
+
+    def _chunk(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        raw = self._buffer[start:end]
+        text = raw.strip()
+        if not text:
+            return None
+        first = start + (len(raw) - len(raw.lstrip()))
+        last = first + len(text) - 1
+        return {'text': text, 'page_start': self._page_at(first), 'page_end': self._page_at(last)}
+
+    def _consume(self, start: int) -> None:
+        """Drop buffered text before `start`, keeping page offsets aligned."""
+        self._buffer = self._buffer[start:]
+        pages = [(offset - start, page) for offset, page in self._pages]
+        kept = [(offset, page) for offset, page in pages if offset > 0]
+        before = [page for offset, page in pages if offset <= 0]
+        self._pages = ([(0, before[-1])] if before else []) + kept
+
+    def _emit(self, final: bool) -> List[Dict[str, Any]]:
+        spans, next_start = self._spans(final)
+        chunks = [chunk for chunk in (self._chunk(start, end) for start, end in spans) if chunk]
+        self._consume(len(self._buffer) if final else next_start)
+        return chunks
+
+    def add(self, segment: str, page: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Append a segment (joined to the previous one with a blank line).
+
+        Args:
+            segment (str): Cleaned text
+            page (int): Page number of the segment, if any
+
+        Returns:
+            The chunks that are now complete
+        """
+        if not segment:
+            return []
+        if not self._first:
+            self._buffer += "\n\n"
+        self._pages.append((len(self._buffer), page))
+        self._buffer += segment
+        self._first = False
+        return self._emit(final=False)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Chunks for the remaining buffered text."""
+        return self._emit(final=True)
+
+
+class StreamingChunker(SegmentBuffer):
+    """Incremental form of chunk_text() (character-based chunks)."""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def _spans(self, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        buffer = self._buffer
+        length = len(buffer)
+        spans = []
+        start = 0
+        # Without `final`, only chunks whose end is already decided (text
+        # continues past the window) are emitted
+        while (start < length) if final else (length - start > self.chunk_size):
+            end = min(start + self.chunk_size, length)
+            if end < length:
+                end = _chunk_end(buffer[start:end], start, self.chunk_size)
+            spans.append((start, end))
+            if end >= length:
+                break
+            start = max(end - self.chunk_overlap, start + 1)
+        return spans, start
+
+
+def iter_chunks(segments: Iterable[str], chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Chunk a stream of cleaned segments. Segments are joined with a blank
+    line; the chunks are the same as chunk_text() over the joined text.
+
+    Args:
+        segments (Iterable[str]): Cleaned text segments in document order
+        chunk_size (int): Target chunk length in characters
+        chunk_overlap (int): Characters shared by consecutive chunks
+
+    Returns:
+        Iterator over chunk strings
+    """
+    chunker = StreamingChunker(chunk_size, chunk_overlap)
+    for segment in segments:
+        for chunk in chunker.add(segment):
+            yield chunk['text']
+    for chunk in chunker.finish():
+        yield chunk['text']
@@ -0,0 +1,182 @@
+"""
+Embedding Micro-Batcher for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module merges embedding requests from many threads or coroutines into
+small batches:
+- EmbeddingBatcher.submit: Queue one text, get a Future for its vector
+- EmbeddingBatcher.embed / embed_async: Blocking and asyncio helpers
+
+A dispatcher thread waits for the first request, then keeps collecting for
+at most `max_wait_ms` or until `max_batch_size` texts are queued. Identical
+texts in a window are embedded once. Batches are sent with at most
+`max_parallel` calls in flight: as one call for models that accept several
+inputs (Cohere Embed), or as individual calls for single-input models
+(Titan). While a call slot is free, the wait window caps the latency the
+batcher adds. When `max_parallel` calls are in flight the dispatcher waits
+for a slot, so queued requests also wait for the model (and the next batch
+grows meanwhile): that wait is bounded by the model's latency, not by
+`max_wait_ms`.
+
+Example:
+    >>> batcher = EmbeddingBatcher(service.embed_uncached, max_wait_ms=5)
+    >>> futures = [batcher.submit(text) for text in ["uno", "dos", "uno"]]
+    >>> vectors = [f.result() for f in futures]
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+EmbedBatchFn = Callable[[List[str]], List[List[float]]]
+
+_SHUTDOWN = object()
+
+
+class EmbeddingBatcher:
+    """Collects concurrent embedding requests and dispatches them in batches."""
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_parallel: int = 4,
+        multi_input: bool = False
+    ):
+        """
+        Args:
+            embed_batch: Function embedding a list of texts, results in order
+            max_batch_size (int): Texts collected before dispatching early
+            max_wait_ms (float): Longest time a request waits for companions
+            max_parallel (int): Calls to the model in flight at once
+            multi_input (bool): True if embed_batch makes a single model call
+                for the whole list; False splits batches into one call per text
+        """
+        if max_batch_size < 1 or max_parallel < 1:
+            raise ValueError("max_batch_size and max_parallel must be at least 1")
+
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.multi_input = multi_input
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._slots = threading.Semaphore(max_parallel)
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="embed-batch")
+        self._closed = False
+        # Held while checking _closed and enqueueing, so nothing is queued
+        # behind the shutdown marker
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.model_calls = 0
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embed-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, text: str) -> Future:
+        """Queue `text` and return a Future resolving to its embedding."""
+        future: Future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: float = None) -> List[float]:
+        return self.submit(text).result(timeout=timeout)
+
+    async def embed_async(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def close(self) -> None:
+        """Flush queued requests and stop the dispatcher."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_SHUTDOWN)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'model_calls': self.model_calls,
+                'avg_batch_size': self.requests / self.batches if self.batches else 0.0
+            }
+
+    # ------------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------------
+
+    def _dispatch_loop(self) -> None:
+        shutting_down = False
+        while not shutting_down:
+            first = self._queue.get()
+            if first is _SHUTDOWN:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _SHUTDOWN:
+                    shutting_down = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Future]]) -> None:
+        # Route every caller of the same text to a single embedding
+        waiters: Dict[str, List[Future]] = {}
+        for text, future in batch:
+            if future.set_running_or_notify_cancel():
+                waiters.setdefault(text, []).append(future)
+        if not waiters:
+            return
+
+        with self._stats_lock:
+            # Cancelled futures are not requests the batch served
+            self.requests += sum(len(futures) for futures in waiters.values())
+            self.batches += 1
+
+        texts = list(waiters)
+        groups = [texts] if self.multi_input else [[text] for text in texts]
+        for group in groups:
+            # Blocks while max_parallel calls are in flight; meanwhile new
+            # requests accumulate and the next batch gets bigger.
+            self._slots.acquire()
+            self._executor.submit(self._run, group, waiters)
+
+    def _run(self, texts: List[str], waiters: Dict[str, List[Future]]) -> None:
+        try:
+            with self._stats_lock:
+                self.model_calls += 1
+            vectors = self.embed_batch(texts)
+            for text, vector in zip(texts, vectors):
+                for future in waiters[text]:
+                    future.set_result(vector)
+        except Exception as e:
+            for text in texts:
+                for future in waiters[text]:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            self._slots.release()
@@ -0,0 +1,214 @@
+"""
+Persistent Embedding Cache for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module stores embeddings on disk so unchanged chunks and repeated
+queries never pay for a second Bedrock call:
+- cache_key: Content address built from model id, dimensions and normalized text
+- EmbeddingCache: SQLite store of packed little-endian float32 vectors with
+  LRU-style size limits and hit/miss statistics
+
+Example:
+    >>> cache = EmbeddingCache("embedding_cache.db", max_entries=100_000)
+    >>> key = cache_key("amazon.titan-embed-text-v2:0", 1024, "Hola mundo")
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, [0.1] * 1024)
+    >>> len(cache.get(key))
+    1024
+"""
+
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ============================================================================
+# Keys and Encoding
+# ============================================================================
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC and collapsed whitespace, so trivial differences share a key."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(model_id: str, dimensions: int, text: str, normalize: bool = True) -> str:
+    """SHA-256 content address for one embedding request."""
+    payload = f"{model_id}\x00{dimensions}\x00{int(normalize)}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    """Encode as little-endian float32 (4 bytes per dimension)."""
+    packed = array('f', vector)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    values = array('f')
+    values.frombytes(blob)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist()
+
+# ============================================================================
+# Cache Store
+# ============================================================================
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store backed by a single SQLite file.
+
+    Entries beyond `max_entries` (or `max_bytes` of vector data) are evicted
+    least-recently-used first. Access times are recorded with one-second
+    resolution to keep hits cheap.
+    """
+
+    # Fraction of the limit freed on each eviction, so we do not evict on every put
+    EVICTION_HEADROOM = 0.1
+
+    def __init__(self, path: str = "embedding_cache.db", max_entries: int = 500_000,
+                 max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used_idx ON embeddings (last_used)")
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Look up several keys in one query; missing keys are absent from the result."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, unpack_vector(blob)) for key, blob in rows)
+
+            if found:
+                now = int(time.time())
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ? AND last_used < ?",
+                    [(now, key, now) for key in found]
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, vector: Sequence[float]) -> None:
+        self.put_many([(key, vector)])
+
+    def put_many(self, items: Iterable[Tuple[str, Sequence[float]]]) -> None:
+        """Insert or replace vectors, then evict if over the size limits."""
+        now = int(time.time())
+        rows = [(key, pack_vector(vector), now) for key, vector in items]
+        if not rows:
+            return
+
+        with self._lock:
+            existing = self._existing_sizes([key for key, _, _ in rows])
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # Never leave the shared connection inside a transaction
+                self._conn.execute("ROLLBACK")
+                raise
+            for key, blob, _ in rows:
+                if key in existing:
+                    self._bytes -= existing[key]
+                else:
+                    self._entries += 1
+                self._bytes += len(blob)
+            self._evict_if_needed()
+
+    def _existing_sizes(self, keys: List[str]) -> Dict[str, int]:
+        sizes: Dict[str, int] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            sizes.update(self._conn.execute(
+                f"SELECT key, LENGTH(vector) FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return sizes
+
+    def _evict_if_needed(self) -> None:
+        over_entries = self.max_entries and self._entries > self.max_entries
+        over_bytes = self.max_bytes and self._bytes > self.max_bytes
+        if not (over_entries or over_bytes):
+            return
+
+        target_entries = self._entries
+        if over_entries:
+            target_entries = int(self.max_entries * (1 - self.EVICTION_HEADROOM))
+        if over_bytes and self._entries:
+            avg_size = self._bytes / self._entries
+            target_entries = min(target_entries, int(self.max_bytes * (1 - self.EVICTION_HEADROOM) / avg_size))
+
+        to_remove = self._entries - max(target_entries, 0)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (to_remove,)
+        )
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        self.evictions += to_remove
+
+    def stats(self) -> Dict[str, float]:
+        """Hit statistics for this process and the current size of the store."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': self._entries,
+            'size_mb': round(self._bytes / (1024 * 1024), 2)
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._entries, self._bytes = 0, 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
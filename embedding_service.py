@@ -0,0 +1,226 @@
+"""
+Embedding Service for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module generates Amazon Titan embeddings for document chunks (at
+ingestion) and for user queries (at search time):
+- EmbeddingService.generate_embedding: Embed one text
+- EmbeddingService.generate_embeddings: Embed a list of texts
+
+Embeddings are looked up in a persistent content-addressed cache first
+(see embedding_cache.py), so re-ingesting unchanged chunks and repeating a
+query cost no Bedrock calls. Cache misses from concurrent callers can be
+merged by an EmbeddingBatcher (see embedding_batcher.py) when
+EMBEDDING_BATCH_WINDOW_MS is set.
+
+Configuration (environment variables):
+    EMBEDDING_MODEL_ID           Titan model (default amazon.titan-embed-text-v2:0)
+    EMBEDDING_DIMENSIONS         256, 512 or 1024 (default 1024)
+    EMBEDDING_CACHE_PATH         SQLite cache file; empty disables the cache
+    EMBEDDING_CACHE_MAX_ENTRIES  LRU limit for the cache (default 500000)
+    EMBEDDING_BATCH_WINDOW_MS    Micro-batching window; 0 disables batching (default 0)
+    EMBEDDING_MAX_PARALLEL       Embedding calls in flight per service (default 4)
+"""
+
+import json
+import os
+import threading
+from typing import Any, List, Optional
+
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache, cache_key
+from tracing import set_attribute, start_span
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1024"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "0"))
+EMBEDDING_MAX_PARALLEL = int(os.getenv("EMBEDDING_MAX_PARALLEL", "4"))
+
+# Titan v2 accepts up to 8192 tokens (~50,000 characters)
+MAX_INPUT_CHARS = 50000
+
+# Models whose request body accepts a list of texts, and the list size limit
+MULTI_INPUT_MODEL_PREFIXES = ('cohere.embed',)
+MAX_TEXTS_PER_CALL = 96
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def get_default_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache shared by every EmbeddingService (None if disabled)."""
+    global _default_cache
+    if _default_cache is None and EMBEDDING_CACHE_PATH:
+        _default_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    return _default_cache
+
+# ============================================================================
+# Embedding Service
+# ============================================================================
+
+class EmbeddingService:
+    """Generates (and caches) Titan embeddings."""
+
+    def __init__(
+        self,
+        model_id: str = EMBEDDING_MODEL_ID,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        normalize: bool = True,
+        client: Any = None,
+        cache: Any = "default",
+        batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+        max_parallel: int = EMBEDDING_MAX_PARALLEL,
+        input_type: str = "search_document"
+    ):
+        """
+        Args:
+            model_id (str): Bedrock embedding model ID
+            dimensions (int): Output dimensions (256, 512 or 1024)
+            normalize (bool): Ask Titan for unit-length vectors
+            client: bedrock-runtime client (defaults to the one in bedrock_utils)
+            cache: EmbeddingCache instance, "default" for the shared cache, or None
+            batch_window_ms (float): Micro-batching window for cache misses; 0 disables it
+            max_parallel (int): Embedding calls in flight when batching
+            input_type (str): Cohere input type ("search_document" or "search_query")
+        """
+        if dimensions not in (256, 512, 1024):
+            raise ValueError("dimensions must be 256, 512 or 1024")
+
+        if client is None:
+            from bedrock_utils import bedrock_runtime
+            client = bedrock_runtime
+
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.normalize = normalize
+        self.client = client
+        self.cache = get_default_cache() if cache == "default" else cache
+        self.input_type = input_type
+        self.multi_input = model_id.startswith(MULTI_INPUT_MODEL_PREFIXES)
+        self.api_calls = 0
+        self._calls_lock = threading.Lock()
+
+        # Cohere vectors depend on the input type, so it is part of the cache key
+        self._cache_model = f"{model_id}#{input_type}" if self.multi_input else model_id
+
+        self.batcher = None
+        if batch_window_ms > 0:
+            self.batcher = EmbeddingBatcher(
+                self.embed_uncached,
+                max_batch_size=MAX_TEXTS_PER_CALL if self.multi_input else 32,
+                max_wait_ms=batch_window_ms,
+                max_parallel=max_parallel,
+                multi_input=self.multi_input
+            )
+
+    def _count_call(self) -> None:
+        # The batcher invokes the model from several threads
+        with self._calls_lock:
+            self.api_calls += 1
+
+    def _invoke(self, text: str) -> List[float]:
+        """Call Titan for a single text (no cache)."""
+        with start_span("bedrock.embed", model_id=self.model_id, chars=len(text)):
+            response = self.client.invoke_model(
+                modelId=self.model_id,
+                body=json.dumps({
+                    'inputText': text[:MAX_INPUT_CHARS],
+                    'dimensions': self.dimensions,
+                    'normalize': self.normalize
+                })
+            )
+            self._count_call()
+            return json.loads(response['body'].read())['embedding']
+
+    def _invoke_multi(self, texts: List[str]) -> List[List[float]]:
+        """Call a multi-input model (Cohere Embed) for up to MAX_TEXTS_PER_CALL texts."""
+        with start_span("bedrock.embed_batch", model_id=self.model_id, texts=len(texts)):
+            response = self.client.invoke_model(
+                modelId=self.model_id,
+                body=json.dumps({
+                    'texts': [text[:MAX_INPUT_CHARS] for text in texts],
+                    'input_type': self.input_type,
+                    'truncate': 'END'
+                })
+            )
+            self._count_call()
+            return json.loads(response['body'].read())['embeddings']
+
+    def embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with as few model calls as the model allows (no cache)."""
+        if not self.multi_input:
+            return [self._invoke(text) for text in texts]
+
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), MAX_TEXTS_PER_CALL):
+            vectors.extend(self._invoke_multi(texts[start:start + MAX_TEXTS_PER_CALL]))
+        return vectors
+
+    def generate_embedding(self, text: str) -> List[float]:
+        """
+        Generate the embedding for one text.
+
+        Args:
+            text (str): Text to embed (chunk or query)
+
+        Returns:
+            List of `dimensions` floats
+
+        Example:
+            >>> service = EmbeddingService()
+            >>> len(service.generate_embedding("¿Cuántos días de vacaciones tengo?"))
+            1024
+        """
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts, calling Bedrock only for cache misses.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            Embeddings in the same order as `texts`
+        """
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Text to embed cannot be empty")
+
+        keys = [cache_key(self._cache_model, self.dimensions, text, self.normalize) for text in texts]
+        cached = self.cache.get_many(keys) if self.cache else {}
+        set_attribute('embedding_cache_hits', len(cached))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            if self.batcher:
+                futures = {key: self.batcher.submit(text) for key, text in missing.items()}
+                computed = {key: future.result() for key, future in futures.items()}
+            else:
+                computed = dict(zip(missing, self.embed_uncached(list(missing.values()))))
+            if self.cache:
+                self.cache.put_many(computed.items())
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def cache_stats(self) -> dict:
+        """Cache statistics plus the number of Bedrock calls made by this service."""
+        stats = self.cache.stats() if self.cache else {}
+        stats['api_calls'] = self.api_calls
+        if self.batcher:
+            stats['batching'] = self.batcher.stats()
+        return stats
+
+    def close(self) -> None:
+        """Flush and stop the micro-batcher, if any."""
+        if self.batcher:
+            self.batcher.close()
@@ -0,0 +1,252 @@
+"""
+Parallel Text Extraction for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+PyPDF2 and python-docx are pure Python and CPU-bound, so extraction on the
+caller's thread uses a single core. This module fans extraction out to a
+process pool:
+- ExtractionPool.iter_pdf_pages: One large PDF, split into page ranges
+- ExtractionPool.extract_documents: Many documents, one task per file
+- get_default_pool: Process-wide pool shared by every pipeline
+
+Results stream back in input order. At most one task per worker is in
+flight, so every task starts as soon as it is submitted and its timeout
+is measured from then; a task that exceeds EXTRACT_TIMEOUT is reported as
+failed and the pool is replaced so a pathological file cannot stall the
+rest of the batch. On POSIX the worker also stops the task itself at the
+timeout (SIGALRM), so the abandoned pool's processes exit instead of
+running on. Opening a PDF to count its pages is a task too. Tasks of
+other callers that a restart cancels are resubmitted.
+
+Configuration (environment variables):
+    EXTRACT_WORKERS         Worker processes (default: number of CPUs)
+    EXTRACT_TIMEOUT         Seconds allowed per task (default 120)
+    EXTRACT_PAGES_PER_TASK  PDF pages per task (default 20)
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from document_processor import iter_segments
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "120"))
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "20"))
+
+# ============================================================================
+# Worker Functions (run in child processes)
+# ============================================================================
+
+def _run_task(fn: Callable[[Any], Any], task: Any, timeout: float) -> Any:
+    if not hasattr(signal, 'setitimer'):
+        return fn(task)
+
+    def expire(signum, frame):
+        raise TimeoutError(f"Extraction exceeded {timeout:.0f}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(task)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_document(file_path: str) -> List[str]:
+    return list(iter_segments(file_path))
+
+
+def _extract_pdf_pages(task: Tuple[str, int, int]) -> List[str]:
+    file_path, start, end = task
+    from PyPDF2 import PdfReader
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def pdf_page_count(file_path: str) -> int:
+    from PyPDF2 import PdfReader
+    return len(PdfReader(file_path).pages)
+
+# ============================================================================
+# Extraction Pool
+# ============================================================================
+
+_default_pool: Optional["ExtractionPool"] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> "ExtractionPool":
+    """Process-wide pool shared by every IngestionPipeline (workers start on first use)."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ExtractionPool()
+        return _default_pool
+
+
+class ExtractionPool:
+    """Process pool for CPU-bound text extraction with ordered, time-limited results."""
+
+    def __init__(self, max_workers: int = EXTRACT_WORKERS, timeout: float = EXTRACT_TIMEOUT,
+                 pages_per_task: int = EXTRACT_PAGES_PER_TASK):
+        """
+        Args:
+            max_workers (int): Worker processes
+            timeout (float): Seconds allowed per task
+            pages_per_task (int): PDF pages extracted by one task
+        """
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.pages_per_task = max(1, pages_per_task)
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Several pipelines (Streamlit sessions) may share the pool
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the caller is multi-threaded (Streamlit, ingestion stages)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Abandon `executor` (one of its workers is stuck) and start a fresh pool on next use."""
+        with self._lock:
+            if self._executor is not executor:
+                # Another caller already replaced it
+                return
+            self._executor = None
+            self.restarts += 1
+        # A running task cannot be cancelled; its worker gives up at the
+        # alarm set by _run_task and the old pool then exits
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def map_ordered(self, fn: Callable[[Any], Any], tasks: Iterable[Any]
+                    ) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """
+        Run `fn` over `tasks` in the pool, yielding results in input order.
+
+        Args:
+            fn: Picklable top-level function taking one task
+            tasks (Iterable): Task arguments
+
+        Returns:
+            Iterator of (task, result, error); result is None when error is set
+            (TimeoutError for tasks that exceeded the timeout)
+        """
+        task_iter = iter(tasks)
+        pending = deque()
+
+        def submit(task):
+            executor = self._pool()
+            return (task, executor.submit(_run_task, fn, task, self.timeout),
+                    time.monotonic() + self.timeout, executor)
+
+        def fill():
+            while len(pending) < self.max_workers:
+                try:
+                    task = next(task_iter)
+                except StopIteration:
+                    return
+                pending.append(submit(task))
+
+        def lost(future):
+            # Cancelled or failed by a restart, not by the task itself
+            return future.cancelled() or isinstance(future.exception(), BrokenProcessPool)
+
+        def resubmit_unfinished():
+            # Keep tasks that completed before the restart, with their result
+            # or their own error; rerun the rest
+            survivors = list(pending)
+            pending.clear()
+            for entry in survivors:
+                future = entry[1]
+                if future.done() and not lost(future):
+                    pending.append(entry)
+                else:
+                    pending.append(submit(entry[0]))
+
+        fill()
+        while pending:
+            task, future, deadline, executor = pending.popleft()
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except CancelledError:
+                # Another caller restarted the shared pool before this task ran
+                pending.appendleft(submit(task))
+                continue
+            except FutureTimeoutError:
+                print(f"✗ Extraction timed out after {self.timeout:.0f}s: {task}")
+                self._restart(executor)
+                resubmit_unfinished()
+                yield task, None, TimeoutError(f"Extraction exceeded {self.timeout:.0f}s")
+            except BrokenProcessPool as e:
+                # A worker crashed (e.g. segfault in a parser); isolate and continue
+                self._restart(executor)
+                resubmit_unfinished()
+                yield task, None, e
+            except Exception as e:
+                yield task, None, e
+            else:
+                yield task, result, None
+            fill()
+
+    def extract_documents(self, file_paths: Iterable[str]
+                          ) -> Iterator[Tuple[str, Optional[List[str]], Optional[BaseException]]]:
+        """
+        Extract many documents in parallel, one task per file.
+
+        Returns:
+            Iterator of (file_path, segments, error) in input order
+        """
+        return self.map_ordered(_extract_document, file_paths)
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Stream the pages of one PDF, extracting page ranges in parallel.
+
+        Raises:
+            The first extraction error (including TimeoutError)
+        """
+        # Counting pages parses the whole cross-reference table; a malformed
+        # file can hang there, so it runs under the same timeout
+        _, pages, error = next(self.map_ordered(pdf_page_count, [file_path]))
+        if error is not None:
+            raise error
+        tasks = [
+            (file_path, start, min(start + self.pages_per_task, pages))
+            for start in range(0, pages, self.pages_per_task)
+        ]
+        for _, texts, error in self.map_ordered(_extract_pdf_pages, tasks):
+            if error is not None:
+                raise error
+            yield from texts
+
+    def iter_segments(self, file_path: str) -> Iterator[str]:
+        """document_processor.iter_segments, with PDF pages extracted in parallel."""
+        if file_path.lower().endswith('.pdf') and self.max_workers > 1:
+            return self.iter_pdf_pages(file_path)
+        return iter_segments(file_path)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,285 @@
+"""
+Staged Ingestion Engine for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module runs ingestion as a chain of stages connected by bounded queues:
+- Stage: A named step with its own worker count
+- StagedPipeline: Wires stages together, runs them on worker threads and
+  reports per-stage progress and throughput to a callback
+
+Because every queue is bounded, a fast stage blocks once it is QUEUE_SIZE
+items ahead of the next one, so memory stays flat however large the
+document is. The progress callback is called on the thread that called
+run(), which is what Streamlit needs to update widgets.
+
+Example:
+    >>> pipeline = StagedPipeline(
+    ...     source=iter_segments("manual.pdf"),
+    ...     stages=[
+    ...         Stage("clean", lambda seg: [clean_text(seg)], workers=2),
+    ...         Stage("store", store_batch, workers=1),
+    ...     ],
+    ...     progress_callback=print
+    ... )
+    >>> stats = pipeline.run()
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", "0.25"))
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# ============================================================================
+# Stages
+# ============================================================================
+
+class Stage:
+    """
+    One pipeline step.
+
+    `fn` receives one item and returns an iterable of output items (zero,
+    one or many), so a stage can filter, map or fan out. With `workers > 1`
+    items are processed concurrently and may leave the stage out of order.
+    `flush`, if given, is called once after the last input item and may
+    emit trailing outputs (for stateful stages such as chunking or batching).
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Iterable[Any]], workers: int = 1,
+                 unit: str = "items", flush: Optional[Callable[[], Iterable[Any]]] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.unit = unit
+        self.flush = flush
+
+        # Counters, updated under the pipeline lock
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.finished = False
+        self.input: Optional[queue.Queue] = None
+        self.output: Optional[queue.Queue] = None
+
+
+class StagedPipeline:
+    """Runs a source iterator through stages on threads joined by bounded queues."""
+
+    def __init__(self, source: Iterable[Any], stages: List[Stage], queue_size: int = QUEUE_SIZE,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 progress_interval: float = PROGRESS_INTERVAL, source_name: str = "extract",
+                 source_unit: str = "segments"):
+        """
+        Args:
+            source (Iterable): Produces the first stage's input (e.g. pages)
+            stages (List[Stage]): Steps in order
+            queue_size (int): Capacity of each inter-stage queue
+            progress_callback: Called with snapshot() while running and once at the end
+            progress_interval (float): Seconds between progress callbacks
+            source_name (str): Name under which the source shows up in progress
+            source_unit (str): Unit label for the source's items
+        """
+        if not stages:
+            raise ValueError("At least one stage is required")
+        self.source = source
+        self.source_stage = Stage(source_name, fn=None, workers=1, unit=source_unit)
+        self.stages = stages
+        self.queue_size = queue_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._start_time = 0.0
+
+    # ------------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """Blocking put that gives up when the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
+
+    def _run_source(self) -> None:
+        stage = self.source_stage
+        try:
+            iterator = iter(self.source)
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                with self._lock:
+                    stage.busy_seconds += time.perf_counter() - started
+                    stage.items_out += 1
+                if not self._put(stage.output, item):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                stage.finished = True
+            self._put(stage.output, _DONE)
+
+    def _emit(self, stage: Stage, outputs: List[Any]) -> bool:
+        if stage.output is not None:
+            for output in outputs:
+                if not self._put(stage.output, output):
+                    return False
+        return True
+
+    def _run_worker(self, stage: Stage, remaining: List[int]) -> None:
+        last = False
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = stage.input.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    # Let sibling workers see the end marker too
+                    stage.input.put(_DONE)
+                    break
+
+                started = time.perf_counter()
+                outputs = list(stage.fn(item))
+                with self._lock:
+                    stage.busy_seconds += time.perf_counter() - started
+                    stage.items_in += 1
+                    stage.items_out += len(outputs)
+                if not self._emit(stage, outputs):
+                    return
+
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and stage.flush is not None and not self._stop.is_set():
+                outputs = list(stage.flush())
+                with self._lock:
+                    stage.items_out += len(outputs)
+                self._emit(stage, outputs)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if last or self._stop.is_set():
+                with self._lock:
+                    stage.finished = True
+            if last and stage.output is not None:
+                self._put(stage.output, _DONE)
+
+    # ------------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current progress.
+
+        Returns:
+            Dict with 'elapsed', 'fraction' (0-1 estimate of overall progress)
+            and 'stages': a list of {'name', 'workers', 'unit', 'items_in',
+            'items_out', 'queued', 'busy_seconds', 'throughput', 'finished'}
+        """
+        elapsed = time.perf_counter() - self._start_time if self._start_time else 0.0
+        stages = []
+        fractions = []
+        with self._lock:
+            for stage in [self.source_stage] + self.stages:
+                queued = stage.input.qsize() if stage.input is not None and not stage.finished else 0
+                processed = stage.items_out if stage.fn is None else stage.items_in
+                stages.append({
+                    'name': stage.name,
+                    'workers': stage.workers,
+                    'unit': stage.unit,
+                    'items_in': stage.items_in,
+                    'items_out': stage.items_out,
+                    'queued': queued,
+                    'busy_seconds': stage.busy_seconds,
+                    'throughput': processed / elapsed if elapsed > 0 else 0.0,
+                    'finished': stage.finished
+                })
+                if stage.finished:
+                    fractions.append(1.0)
+                elif stage.fn is None:
+                    fractions.append(0.5 if processed else 0.0)
+                else:
+                    fractions.append(processed / (processed + queued) if processed + queued else 0.0)
+
+        fraction = sum(fractions) / len(fractions)
+        if not all(s['finished'] for s in stages):
+            fraction = min(fraction, 0.99)
+        return {'elapsed': elapsed, 'fraction': fraction, 'stages': stages}
+
+    # ------------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------------
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run to completion, calling the progress callback periodically.
+
+        Returns:
+            The final snapshot()
+
+        Raises:
+            The first exception raised by the source or any stage (the
+            remaining work is cancelled)
+        """
+        previous = self.source_stage
+        previous.output = queue.Queue(maxsize=self.queue_size)
+        for i, stage in enumerate(self.stages):
+            stage.input = previous.output
+            last = i == len(self.stages) - 1
+            stage.output = None if last else queue.Queue(maxsize=self.queue_size)
+            previous = stage
+
+        self._start_time = time.perf_counter()
+        threads = [threading.Thread(target=self._run_source, name=f"{self.source_stage.name}-0", daemon=True)]
+        for stage in self.stages:
+            remaining = [stage.workers]
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._run_worker, args=(stage, remaining),
+                    name=f"{stage.name}-{n}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(self.progress_interval)
+                if self.progress_callback and thread.is_alive():
+                    self.progress_callback(self.snapshot())
+
+        if self._errors:
+            raise self._errors[0]
+
+        final = self.snapshot()
+        if self.progress_callback:
+            self.progress_callback(final)
+        return final
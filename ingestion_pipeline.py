@@ -0,0 +1,592 @@
+"""
+Ingestion Pipeline for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module ingests documents end to end: extract -> clean -> chunk ->
+embed -> store in the pgvector knowledge base. The stages run concurrently,
+connected by bounded queues (see ingestion_engine.py), so a document is
+streamed page by page and memory does not grow with its size.
+- IngestionPipeline.ingest_single_document: Ingest one file (used by the
+  upload tab in app_demo.py)
+- IngestionPipeline.sync_directory: Incrementally sync a whole folder
+
+A DocumentManifest (see document_manifest.py) records each file's content
+hash, size, mtime, chunk ids, embedding model and chunking parameters.
+Unchanged files are skipped, changed files replace their previous chunks
+and files that disappeared from a synced folder have their chunks deleted.
+
+The cleaned text of every ingested file is kept in a compressed TextCache
+(see text_cache.py) keyed by content hash, so re-chunking the corpus with
+different CHUNK_SIZE/CHUNK_OVERLAP replays the cache instead of parsing
+every PDF and DOCX again.
+
+With DEDUP_ENABLED, duplicate chunks (boilerplate headers, disclaimers,
+signature blocks) are detected with MinHash before embedding (see dedup.py):
+they are not embedded or stored, and the stored copy lists every source it
+appears in.
+
+Usage:
+    python ingestion_pipeline.py spec-sheets/
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dedup import DEDUP_ENABLED, DEDUP_INDEX_PATH, DuplicateIndex, minhash_signature, text_key
+from document_manifest import DocumentManifest, file_fingerprint
+from document_processor import (
+    CHUNK_OVERLAP, CHUNK_SIZE, SUPPORTED_EXTENSIONS, StreamingChunker, clean_text, iter_segments
+)
+from extraction_pool import EXTRACT_WORKERS, ExtractionPool, get_default_pool
+from ingestion_engine import Stage, StagedPipeline
+from text_cache import TEXT_CACHE_DIR, TextCache
+from tracing import set_attribute, start_span, wrap_context
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", ".docsmart_manifest.db")
+
+# Workers per stage (extraction is a single sequential reader)
+CLEAN_WORKERS = int(os.getenv("INGEST_CLEAN_WORKERS", "2"))
+EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+STORE_WORKERS = int(os.getenv("INGEST_STORE_WORKERS", "1"))
+
+# "chars" (CHUNK_SIZE/CHUNK_OVERLAP characters) or "tokens"
+# (CHUNK_TOKENS/CHUNK_OVERLAP_TOKENS, see token_chunker.py)
+CHUNKER = os.getenv("CHUNKER", "chars")
+
+# Chunks per embedding request
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "16"))
+
+# Rows per write to the vector database (one binary COPY each)
+STORE_BATCH_SIZE = int(os.getenv("INGEST_STORE_BATCH_SIZE", "1000"))
+
+# Namespace for deterministic chunk ids (uuid5 of source key + content hash +
+# chunking/model version + chunk index)
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c9e2a-4b7d-5e3f-9a8b-2c1d0e4f5a6b")
+
+
+def chunk_id(key: str, content_hash: str, version: str, index: int) -> str:
+    # The key keeps identical files under different paths/upload names apart;
+    # the version (chunking parameters and embedding model) keeps a re-chunked
+    # file from overwriting the previous version's rows before it is complete
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{key}:{content_hash}:{version}:{index}"))
+
+
+class _OrderedChunker:
+    """
+    Chunk stage state: puts cleaned segments back in document order (the
+    clean stage may finish them out of order), chunks them and groups the
+    chunks into numbered batches for embedding.
+    """
+
+    def __init__(self, chunker: Any, batch_size: int,
+                 on_segment: Optional[Callable[[Optional[int], str], None]] = None,
+                 is_duplicate: Optional[Callable[[int, Dict[str, Any]], bool]] = None):
+        self.chunker = chunker
+        self.batch_size = batch_size
+        self.on_segment = on_segment
+        # Chunks for which this returns True keep their index but are not batched
+        self.is_duplicate = is_duplicate
+        self.pending: List[Any] = []
+        self.next_seq = 0
+        self.next_index = 0
+        self.batch: List[Any] = []
+
+    def _batches(self, chunks: List[Dict[str, Any]], final: bool = False) -> List[List[Any]]:
+        for chunk in chunks:
+            if self.is_duplicate is None or not self.is_duplicate(self.next_index, chunk):
+                self.batch.append((self.next_index, chunk))
+            self.next_index += 1
+        batches = []
+        while len(self.batch) >= self.batch_size or (final and self.batch):
+            batches.append(self.batch[:self.batch_size])
+            self.batch = self.batch[self.batch_size:]
+        return batches
+
+    def add(self, item) -> List[List[Any]]:
+        heapq.heappush(self.pending, item)
+        chunks: List[Dict[str, Any]] = []
+        while self.pending and self.pending[0][0] == self.next_seq:
+            _, page, segment = heapq.heappop(self.pending)
+            if self.on_segment is not None:
+                self.on_segment(page, segment)
+            chunks.extend(self.chunker.add(segment, page))
+            self.next_seq += 1
+        return self._batches(chunks)
+
+    def finish(self) -> List[List[Any]]:
+        return self._batches(self.chunker.finish(), final=True)
+
+# ============================================================================
+# Ingestion Pipeline
+# ============================================================================
+
+class IngestionPipeline:
+    """Incremental document ingestion into the vector database."""
+
+    def __init__(
+        self,
+        vector_db: Any = None,
+        embedding_service: Any = None,
+        manifest: Optional[DocumentManifest] = None,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        extraction_pool: Optional[ExtractionPool] = None,
+        chunker: str = CHUNKER,
+        text_cache: Any = "default",
+        dedup_index: Any = "default"
+    ):
+        """
+        Args:
+            vector_db: VectorDatabase (created from DB_* settings if omitted)
+            embedding_service: EmbeddingService (created if omitted)
+            manifest: DocumentManifest (INGESTION_MANIFEST_PATH if omitted)
+            chunk_size (int): Chunk length in characters
+            chunk_overlap (int): Overlap between chunks in characters
+            extraction_pool: Process pool for text extraction, shut down by
+                close(); defaults to the shared pool (get_default_pool) when
+                EXTRACT_WORKERS > 1, otherwise extraction runs in-process
+            chunker (str): "chars" or "tokens"
+            text_cache: TextCache, "default" (TEXT_CACHE_DIR; disabled when
+                empty) or None
+            dedup_index: DuplicateIndex, "default" (DEDUP_INDEX_PATH when
+                DEDUP_ENABLED) or None to store every chunk
+        """
+        if chunker not in ('chars', 'tokens'):
+            raise ValueError("chunker must be 'chars' or 'tokens'")
+        if vector_db is None:
+            from vector_database import VectorDatabase
+            vector_db = VectorDatabase()
+        if embedding_service is None:
+            from embedding_service import EmbeddingService
+            embedding_service = EmbeddingService()
+
+        self.vector_db = vector_db
+        self.embedding_service = embedding_service
+        self.manifest = manifest or DocumentManifest(MANIFEST_PATH)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunker = chunker
+        # A pool passed in is the pipeline's to close; the default one is
+        # shared by every pipeline in the process (one per Streamlit session)
+        self._owns_extraction_pool = extraction_pool is not None
+        if extraction_pool is None and EXTRACT_WORKERS > 1:
+            extraction_pool = get_default_pool()
+        self.extraction_pool = extraction_pool
+        if text_cache == "default":
+            text_cache = TextCache(TEXT_CACHE_DIR) if TEXT_CACHE_DIR else None
+        self.text_cache = text_cache
+        if dedup_index == "default":
+            dedup_index = DuplicateIndex(DEDUP_INDEX_PATH) if DEDUP_ENABLED else None
+        self.dedup_index = dedup_index
+
+    @property
+    def chunking(self) -> str:
+        """Chunking parameters, recorded in the manifest so changing them re-chunks files."""
+        if self.chunker == 'tokens':
+            from token_chunker import CHUNK_ENCODING, CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
+            return f"tokens:{CHUNK_TOKENS}:{CHUNK_OVERLAP_TOKENS}:{CHUNK_ENCODING}"
+        return f"chars:{self.chunk_size}:{self.chunk_overlap}"
+
+    def _new_chunker(self) -> Any:
+        if self.chunker == 'tokens':
+            from token_chunker import TokenChunker
+            return TokenChunker()
+        return StreamingChunker(self.chunk_size, self.chunk_overlap)
+
+    def _segments(self, file_path: str) -> Iterable[str]:
+        if self.extraction_pool is not None:
+            return self.extraction_pool.iter_segments(file_path)
+        return iter_segments(file_path)
+
+    def _numbered_segments(self, file_path: str, segments: Optional[Iterable[str]] = None):
+        """(sequence, page, text) items; PDF segments are pages (numbered from 1)."""
+        is_pdf = file_path.lower().endswith('.pdf')
+        if segments is None:
+            segments = self._segments(file_path)
+        for seq, text in enumerate(segments):
+            yield seq, (seq + 1 if is_pdf else None), text
+
+    def ingest_single_document(self, file_path: str, source_name: Optional[str] = None,
+                               force: bool = False,
+                               progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               segments: Optional[Iterable[str]] = None,
+                               check: Optional[Tuple[str, Optional[Dict[str, Any]]]] = None
+                               ) -> Dict[str, Any]:
+        """
+        Ingest one document unless the manifest shows it is unchanged.
+
+        Args:
+            file_path (str): File to read
+            source_name (str): Name recorded in metadata and used as the manifest
+                key (defaults to file_path; useful for temporary upload files)
+            force (bool): Re-ingest even if unchanged
+            progress_callback: Receives StagedPipeline.snapshot() dicts while
+                the document is processed (on the calling thread)
+            segments (Iterable[str]): Already extracted text segments (skips extraction)
+            check (Tuple): (status, fingerprint) the caller already got from
+                DocumentManifest.check for this file (skips hashing it again)
+
+        Returns:
+            Dict with 'status' (new/changed/unchanged), 'chunks_count',
+            'embeddings_count', 'embedding_api_calls', 'deleted_chunks',
+            'processing_time' and 'stages' (per-stage statistics)
+        """
+        start_time = time.time()
+        key = source_name or file_path
+        model_id = getattr(self.embedding_service, 'model_id', None)
+
+        with start_span("ingest_single_document", file=key) as span:
+            previous = self.manifest.get(key)
+            if check is not None and not force:
+                status, fingerprint = check
+            else:
+                status, fingerprint = self._check(key, file_path, model_id)
+            set_attribute('status', status)
+
+            if status == 'unchanged' and not force:
+                return {
+                    'file_name': Path(key).name,
+                    'status': status,
+                    'chunks_count': len(previous['chunk_ids']) if previous else 0,
+                    'embeddings_count': 0,
+                    'embedding_api_calls': 0,
+                    'deleted_chunks': 0,
+                    'processing_time': time.time() - start_time,
+                    'text_cache': None,
+                    'duplicates_skipped': 0,
+                    'chars_avoided': 0,
+                    'stages': []
+                }
+
+            if fingerprint is None:
+                fingerprint = file_fingerprint(file_path)
+            content_hash = fingerprint['content_hash']
+            file_name = Path(key).name
+
+            # Replay cleaned text from the cache, or record it while extracting
+            cache_writer = None
+            if segments is None and self.text_cache is not None and self.text_cache.has(content_hash):
+                source = (
+                    (seq, page, text)
+                    for seq, (page, text) in enumerate(self.text_cache.read(content_hash))
+                )
+                text_cache_status = 'hit'
+            else:
+                source = self._numbered_segments(file_path, segments)
+                if self.text_cache is not None:
+                    cache_writer = self.text_cache.open_writer(content_hash)
+                    text_cache_status = 'miss'
+                else:
+                    text_cache_status = 'off'
+            set_attribute('text_cache', text_cache_status)
+
+            # The previous version's chunks stay searchable until the new ones
+            # are stored; only its duplicate-index entries are dropped now, so
+            # the new chunks are not matched against them
+            previous_ids = set(previous['chunk_ids']) if previous else set()
+            version = f"{self.chunking}:{model_id}"
+            if previous:
+                self._forget_duplicates(key)
+
+            calls_before = getattr(self.embedding_service, 'api_calls', 0)
+            stored: List[Any] = []
+            stored_lock = threading.Lock()
+            # Canonical chunk id for every chunk skipped as a near-duplicate
+            linked: List[str] = []
+            duplicate_chars = [0]
+
+            def is_duplicate(index, chunk):
+                signature = minhash_signature(chunk['text'])
+                words = text_key(chunk['text'])
+                match = self.dedup_index.find(signature, words)
+                if match is None:
+                    self.dedup_index.add(chunk_id(key, content_hash, version, index), key, signature, words)
+                    return False
+                self.dedup_index.link(match[0], key, file_name, index, chunk['page_start'],
+                                      chunk['page_end'], len(chunk['text']))
+                linked.append(match[0])
+                duplicate_chars[0] += len(chunk['text'])
+                return True
+
+            chunker = _OrderedChunker(
+                self._new_chunker(), EMBED_BATCH_SIZE,
+                on_segment=cache_writer.write if cache_writer else None,
+                is_duplicate=is_duplicate if self.dedup_index is not None else None
+            )
+
+            def clean(item):
+                seq, page, segment = item
+                return [(seq, page, clean_text(segment))]
+
+            def commit_batches(batches):
+                # Short write transactions: other ingestion sessions share the index file
+                if batches and self.dedup_index is not None:
+                    self.dedup_index.commit()
+                return batches
+
+            def embed(batch):
+                embeddings = self.embedding_service.generate_embeddings([chunk['text'] for _, chunk in batch])
+                rows = []
+                for (index, chunk), embedding in zip(batch, embeddings):
+                    metadata = {
+                        'file_name': file_name,
+                        'source': key,
+                        'chunk_index': index,
+                        'content_hash': content_hash,
+                        'embedding_model': model_id
+                    }
+                    if chunk['page_start'] is not None:
+                        metadata['page_start'] = chunk['page_start']
+                        metadata['page_end'] = chunk['page_end']
+                    rows.append({
+                        'id': chunk_id(key, content_hash, version, index),
+                        'text': chunk['text'],
+                        'embedding': embedding,
+                        'metadata': metadata
+                    })
+                return [rows]
+
+            # Embedding batches are small; rows are buffered so each COPY is large
+            pending_rows: List[Dict[str, Any]] = []
+
+            def write(rows):
+                self.vector_db.insert_chunks(rows)
+                with stored_lock:
+                    stored.extend((row['metadata']['chunk_index'], row['id']) for row in rows)
+
+            def store(rows):
+                with stored_lock:
+                    pending_rows.extend(rows)
+                    if len(pending_rows) < STORE_BATCH_SIZE:
+                        return []
+                    rows = pending_rows[:]
+                    pending_rows.clear()
+                write(rows)
+                return []
+
+            def store_remaining():
+                if pending_rows:
+                    write(pending_rows)
+                return []
+
+            engine = StagedPipeline(
+                source=source,
+                stages=[
+                    Stage("clean", wrap_context(clean), workers=CLEAN_WORKERS, unit="segments"),
+                    Stage("chunk", lambda item: commit_batches(chunker.add(item)), workers=1, unit="segments",
+                          flush=lambda: commit_batches(chunker.finish())),
+                    Stage("embed", wrap_context(embed), workers=EMBED_WORKERS, unit="batches"),
+                    Stage("store", wrap_context(store), workers=STORE_WORKERS, unit="batches",
+                          flush=wrap_context(store_remaining)),
+                ],
+                progress_callback=progress_callback
+            )
+            try:
+                stats = engine.run()
+            except Exception:
+                if cache_writer:
+                    cache_writer.abort()
+                if self.dedup_index is not None:
+                    # Batches were already committed; forget this attempt's
+                    # entries (and re-queue anyone who linked to them)
+                    self.dedup_index.rollback()
+                    self._forget_duplicates(key)
+                # Remove the partial new version; the previous one is still recorded
+                self.vector_db.delete_chunks([cid for _, cid in stored if cid not in previous_ids])
+                raise
+            if cache_writer:
+                cache_writer.commit()
+            if self.dedup_index is not None:
+                # Canonical chunks now exist; list their other sources for citations
+                for canonical_id in set(linked):
+                    self.vector_db.set_chunk_sources(canonical_id, self.dedup_index.sources_of(canonical_id))
+                self.dedup_index.commit()
+
+            stored_ids = [cid for _, cid in sorted(stored)]
+            # Rows with unchanged ids were replaced in place by the store stage
+            deleted = self.vector_db.delete_chunks(list(previous_ids.difference(stored_ids)))
+            api_calls = getattr(self.embedding_service, 'api_calls', 0) - calls_before
+            self.manifest.record(key, fingerprint, stored_ids, model_id, self.chunking)
+
+            if span is not None:
+                span.set_attribute('chunks', len(stored_ids))
+                span.set_attribute('embedding_api_calls', api_calls)
+
+        return {
+            'file_name': file_name,
+            'status': status,
+            'chunks_count': len(stored_ids),
+            'embeddings_count': len(stored_ids),
+            'embedding_api_calls': api_calls,
+            'deleted_chunks': deleted,
+            'processing_time': time.time() - start_time,
+            'text_cache': text_cache_status,
+            'duplicates_skipped': len(linked),
+            'chars_avoided': duplicate_chars[0],
+            'stages': stats['stages']
+        }
+
+    def _check(self, key: str, file_path: str, model_id: Optional[str]):
+        if key == file_path:
+            return self.manifest.check(file_path, model_id, self.chunking)
+
+        # Uploads are written to a fresh temporary file, so mtime never matches;
+        # compare by content hash instead.
+        fingerprint = file_fingerprint(file_path)
+        entry = self.manifest.get(key)
+        if entry is None:
+            return 'new', fingerprint
+        if (entry['content_hash'] == fingerprint['content_hash'] and entry['embedding_model'] == model_id
+                and entry['chunking'] == self.chunking):
+            return 'unchanged', fingerprint
+        return 'changed', fingerprint
+
+    def _forget_duplicates(self, key: str) -> None:
+        """
+        Drop a document from the duplicate index after its chunks were deleted.
+
+        Chunks of other documents that were skipped as copies of this
+        document's chunks have no stored copy any more, so those documents
+        are marked for re-ingestion on the next sync.
+        """
+        if self.dedup_index is None:
+            return
+        refreshed, dependents = self.dedup_index.remove_source(key)
+        self.dedup_index.commit()
+        for canonical_id in refreshed:
+            self.vector_db.set_chunk_sources(canonical_id, self.dedup_index.sources_of(canonical_id))
+        for dependent in dependents:
+            self.manifest.invalidate(dependent)
+            print(f"⚠ {dependent} shared chunks with {key}; it will be re-ingested on the next sync")
+
+    def remove_document(self, key: str) -> int:
+        """Delete a document's chunks and forget it; returns chunks deleted."""
+        entry = self.manifest.get(key)
+        if entry is None:
+            return 0
+        deleted = self.vector_db.delete_chunks(entry['chunk_ids'])
+        self._forget_duplicates(key)
+        self.manifest.remove(key)
+        return deleted
+
+    def sync_directory(self, directory: str) -> Dict[str, Any]:
+        """
+        Bring the knowledge base in line with a folder: ingest new and changed
+        files, skip unchanged ones, and delete chunks of files that were removed.
+
+        Returns:
+            Summary dict with per-status counts and chunk/embedding totals
+        """
+        start_time = time.time()
+        root = Path(directory).resolve()
+        files = sorted(
+            str(path) for path in root.rglob('*')
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+
+        summary = {
+            'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0,
+            'chunks_written': 0, 'chunks_deleted': 0, 'embedding_api_calls': 0,
+            'text_cache_hits': 0, 'duplicates_skipped': 0, 'chars_avoided': 0
+        }
+        # Extract only what needs ingesting; the pool extracts upcoming files
+        # on other cores while the current one is chunked, embedded and stored
+        model_id = getattr(self.embedding_service, 'model_id', None)
+        to_ingest = []
+        checks = {}
+        for path in files:
+            status, fingerprint = self.manifest.check(path, model_id, self.chunking)
+            if status == 'unchanged':
+                summary['unchanged'] += 1
+            else:
+                to_ingest.append((path, fingerprint['content_hash']))
+                checks[path] = (status, fingerprint)
+
+        # Files in the text cache are replayed and PDFs are streamed page by
+        # page (in parallel page ranges when the pool is enabled), so only
+        # the remaining files are extracted whole here
+        deferred = []
+        others = []
+        for path, content_hash in to_ingest:
+            cached = self.text_cache is not None and self.text_cache.has(content_hash)
+            if cached or path.lower().endswith('.pdf'):
+                deferred.append(path)
+            else:
+                others.append(path)
+        if self.extraction_pool is not None:
+            extracted = self.extraction_pool.extract_documents(others)
+        else:
+            extracted = ((path, None, None) for path in others)
+        extracted = itertools.chain(extracted, ((path, None, None) for path in deferred))
+
+        for path, segments, error in extracted:
+            try:
+                if error is not None:
+                    raise error
+                result = self.ingest_single_document(path, segments=segments, check=checks[path])
+            except Exception as e:
+                print(f"✗ Error ingesting {path}: {e}")
+                summary['failed'] += 1
+                continue
+            summary[result['status']] += 1
+            summary['chunks_deleted'] += result['deleted_chunks']
+            summary['embedding_api_calls'] += result['embedding_api_calls']
+            summary['text_cache_hits'] += result['text_cache'] == 'hit'
+            summary['duplicates_skipped'] += result['duplicates_skipped']
+            summary['chars_avoided'] += result['chars_avoided']
+            if result['status'] != 'unchanged':
+                summary['chunks_written'] += result['chunks_count']
+                print(f"✓ {result['status']:<8} {path} ({result['chunks_count']} chunks)")
+
+        # Only files under this directory are candidates for removal
+        for path in self.manifest.missing_paths(files):
+            if path.startswith(str(root) + os.sep):
+                summary['chunks_deleted'] += self.remove_document(path)
+                summary['removed'] += 1
+                print(f"✓ removed  {path}")
+
+        summary['processing_time'] = time.time() - start_time
+        return summary
+
+    def close(self) -> None:
+        """Shut down an extraction pool passed in and close the manifest and duplicate index."""
+        if self.extraction_pool is not None and self._owns_extraction_pool:
+            self.extraction_pool.close()
+        if self.dedup_index is not None:
+            self.dedup_index.close()
+        self.manifest.close()
+
+# ============================================================================
+# Main Execution
+# ============================================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python ingestion_pipeline.py <directory>")
+        sys.exit(1)
+
+    pipeline = IngestionPipeline()
+    try:
+        result = pipeline.sync_directory(sys.argv[1])
+    finally:
+        pipeline.close()
+
+    print("\n" + "=" * 60)
+    print("Sync Summary")
+    print("=" * 60)
+    for key in ('new', 'changed', 'unchanged', 'removed', 'failed',
+                'chunks_written', 'chunks_deleted', 'embedding_api_calls', 'text_cache_hits',
+                'duplicates_skipped', 'chars_avoided'):
+        print(f"  {key}: {result[key]}")
+    print(f"  time: {result['processing_time']:.2f}s")
@@ -0,0 +1,191 @@
+"""
+On-Demand Request Profiling for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module profiles individual requests without restarting the process:
+- profile_request: Context manager that wraps one request in cProfile,
+  a stack sampler (collapsed stacks for flame graphs) and/or tracemalloc
+- should_profile: Sampling decision used when no explicit flag is given
+
+Output files are written to PROFILE_DIR and named after the request id:
+    <request_id>.pstats        cProfile stats (load with pstats / snakeviz)
+    <request_id>.collapsed     Collapsed stacks ("a;b;c 12"), for flamegraph.pl / speedscope
+    <request_id>.alloc.txt     Top allocation sites from tracemalloc
+
+When profiling is disabled (no flag and PROFILE_SAMPLE_RATE=0) the context
+manager returns immediately without touching any profiler.
+
+Configuration (environment variables):
+    PROFILE_SAMPLE_RATE   Fraction of requests profiled automatically (default 0.0)
+    PROFILE_DIR           Output directory (default "profiles")
+    PROFILE_MODE          "cpu", "memory" or "both" (default "both")
+"""
+
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "both")
+
+# Sampling interval for collapsed stacks and number of allocation sites kept
+STACK_SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 25
+
+# cProfile and tracemalloc are process-wide in practice, so only one request
+# is profiled at a time; concurrent requests simply run unprofiled.
+_profile_lock = threading.Lock()
+
+# ============================================================================
+# Stack Sampler
+# ============================================================================
+
+class StackSampler:
+    """Periodically samples one thread's stack and aggregates collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = STACK_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="docsmart-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def write(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+# ============================================================================
+# Profiling Context
+# ============================================================================
+
+def should_profile(enabled: Optional[bool] = None) -> bool:
+    """Explicit flag wins; otherwise sample at PROFILE_SAMPLE_RATE."""
+    if enabled is not None:
+        return enabled
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profile_request(
+    request_id: Optional[str] = None,
+    enabled: Optional[bool] = None,
+    mode: Optional[str] = None,
+    output_dir: Optional[str] = None
+) -> Iterator[Optional[str]]:
+    """
+    Profile the enclosed block if `enabled` (or the sampling rate) says so.
+
+    Args:
+        request_id (str): Used to name the output files (random if omitted)
+        enabled (bool): Force profiling on/off; None means use PROFILE_SAMPLE_RATE
+        mode (str): "cpu", "memory" or "both" (defaults to PROFILE_MODE)
+        output_dir (str): Directory for the output files (defaults to PROFILE_DIR)
+
+    Yields:
+        The request id when profiling, otherwise None
+
+    Example:
+        >>> with profile_request("req-42", enabled=True):
+        ...     rag_pipeline("¿Cuántos días de vacaciones tengo?")
+    """
+    if not should_profile(enabled) or not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+
+    request_id = request_id or uuid.uuid4().hex[:12]
+    mode = mode or PROFILE_MODE
+    out_dir = Path(output_dir or PROFILE_DIR)
+    cpu = mode in ('cpu', 'both')
+    memory = mode in ('memory', 'both')
+
+    profiler = cProfile.Profile() if cpu else None
+    sampler = StackSampler(threading.get_ident()) if cpu else None
+    started_tracemalloc = False
+    start = time.perf_counter()
+
+    try:
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            started_tracemalloc = True
+        if sampler:
+            sampler.start()
+        if profiler:
+            profiler.enable()
+
+        yield request_id
+
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.stop()
+            snapshot, peak = None, 0
+            if started_tracemalloc:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            out_dir.mkdir(parents=True, exist_ok=True)
+            if profiler:
+                profiler.dump_stats(str(out_dir / f"{request_id}.pstats"))
+                sampler.write(out_dir / f"{request_id}.collapsed")
+            if snapshot:
+                _write_allocations(snapshot, out_dir / f"{request_id}.alloc.txt", elapsed, peak)
+            print(f"Profile for request {request_id} written to {out_dir} ({elapsed * 1000:.0f} ms)")
+        except Exception as e:
+            print(f"Error writing profile for request {request_id}: {e}")
+        finally:
+            _profile_lock.release()
+
+
+def _write_allocations(snapshot: tracemalloc.Snapshot, path: Path, elapsed: float, peak: int) -> None:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    stats = snapshot.statistics('lineno')
+    total = sum(stat.size for stat in stats)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"Request time: {elapsed * 1000:.1f} ms\n")
+        f.write(f"Peak traced memory: {peak / 1024:.1f} KB\n")
+        f.write(f"Live allocations at end of request: {total / 1024:.1f} KB in {len(stats)} sites\n\n")
+        for stat in stats[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:>10.1f} KB  {stat.count:>7} blocks  {frame.filename}:{frame.lineno}\n")
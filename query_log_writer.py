@@ -0,0 +1,195 @@
+"""
+Asynchronous Query Log Writer for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+log_query used to insert one row (including a 1024-float embedding) on the
+request path. This module moves analytics writes off that path:
+- QueryLogWriter.submit: Enqueue a row (microseconds; never touches the database)
+- QueryLogWriter.flush: Wait until everything submitted so far is written
+- QueryLogWriter.close: Write what is queued and stop (also runs at exit)
+
+A background thread writes rows in batches, one multi-row insert per batch,
+when QUERY_LOG_BATCH_SIZE rows are queued or QUERY_LOG_FLUSH_INTERVAL
+seconds have passed. When the bounded queue fills up, QUERY_LOG_OVERFLOW
+decides what happens to new rows:
+    drop    Discard the row and count it (default; requests never wait)
+    block   Wait for space (no row is lost; requests slow down)
+    sample  Keep a decreasing fraction of rows once the queue is half full,
+            and drop when it is full
+
+Configuration (environment variables):
+    QUERY_LOG_ASYNC           Write in the background (default true)
+    QUERY_LOG_QUEUE_SIZE      Rows held in memory (default 10000)
+    QUERY_LOG_BATCH_SIZE      Rows per insert (default 200)
+    QUERY_LOG_FLUSH_INTERVAL  Seconds before a partial batch is written (default 1.0)
+    QUERY_LOG_OVERFLOW        drop, block or sample (default drop)
+
+Example:
+    >>> writer = QueryLogWriter(write_rows)
+    >>> writer.submit(("¿Cuántos días de vacaciones tengo?", embedding, 3, 120.5))
+    >>> writer.close()
+"""
+
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+QUERY_LOG_ASYNC = os.getenv("QUERY_LOG_ASYNC", "true").lower() == "true"
+QUERY_LOG_QUEUE_SIZE = int(os.getenv("QUERY_LOG_QUEUE_SIZE", "10000"))
+QUERY_LOG_BATCH_SIZE = int(os.getenv("QUERY_LOG_BATCH_SIZE", "200"))
+QUERY_LOG_FLUSH_INTERVAL = float(os.getenv("QUERY_LOG_FLUSH_INTERVAL", "1.0"))
+QUERY_LOG_OVERFLOW = os.getenv("QUERY_LOG_OVERFLOW", "drop")
+
+OVERFLOW_POLICIES = ("drop", "block", "sample")
+
+# Queue markers
+_STOP = object()
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+# ============================================================================
+# Writer
+# ============================================================================
+
+class QueryLogWriter:
+    """Bounded queue of log rows drained in batches by one background thread."""
+
+    def __init__(self, write_rows: Callable[[List[Any]], None],
+                 queue_size: int = QUERY_LOG_QUEUE_SIZE, batch_size: int = QUERY_LOG_BATCH_SIZE,
+                 flush_interval: float = QUERY_LOG_FLUSH_INTERVAL, overflow: str = QUERY_LOG_OVERFLOW):
+        """
+        Args:
+            write_rows: Writes a list of rows in one statement/transaction;
+                called only from the writer thread
+            queue_size (int): Rows held in memory
+            batch_size (int): Maximum rows per write_rows call
+            flush_interval (float): Seconds before a partial batch is written
+            overflow (str): "drop", "block" or "sample"
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got '{overflow}'")
+        self.write_rows = write_rows
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._stats_lock = threading.Lock()
+        self._stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'sampled_out': 0,
+                       'failed': 0, 'batches': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def closed(self) -> bool:
+        """True once close() has been called; submit() then discards rows."""
+        return self._closed
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def submit(self, row: Any) -> bool:
+        """
+        Queue a row for writing.
+
+        Returns:
+            False if the row was discarded by the overflow policy
+        """
+        if self._closed:
+            return False
+        if self.overflow == "sample":
+            fill = self._queue.qsize() / self._queue.maxsize
+            if fill >= 0.5 and random.random() >= 2 * (1 - fill):
+                self._count('sampled_out')
+                return False
+        try:
+            self._queue.put(row, block=self.overflow == "block")
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('submitted')
+        return True
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            self.write_rows(batch)
+        except Exception as e:
+            print(f"✗ Query log write failed ({len(batch)} rows): {e}")
+            self._count('failed', len(batch))
+        else:
+            with self._stats_lock:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+
+    def _run(self) -> None:
+        batch: List[Any] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _STOP or isinstance(item, _Flush):
+                # Interval elapsed, flush requested or shutting down
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = None
+                if isinstance(item, _Flush):
+                    item.done.set()
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until rows submitted before this call are written; False on timeout."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write everything queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Writer counters.
+
+        Returns:
+            Dict with 'submitted', 'written', 'dropped', 'sampled_out',
+            'failed', 'batches' and 'queued'
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,145 @@
+-- Spanish Full-Text and Hybrid Search
+-- DocSmart RAG System - AWS AI Engineer Nanodegree Final Project
+--
+-- The original full-text index was built on to_tsvector('english', chunks),
+-- but the corpus and the queries are Spanish: English stemming and stop
+-- words do not match Spanish inflections ("vacaciones"/"vacación"), and a
+-- query had to repeat the expression exactly to use the index at all.
+--
+-- This script adds:
+-- - spanish_unaccent: the spanish configuration with accents stripped
+--   before stemming, so "política" and "politica" match
+-- - bedrock_kb.chunks_tsv: a stored generated tsvector column, computed
+--   once per write instead of per query, with a GIN index
+-- - hybrid_search(): nearest-neighbour and full-text candidates fused with
+--   Reciprocal Rank Fusion (score = sum of weight / (rrf_k + rank)) in one
+--   statement, instead of two round trips and a merge in the application.
+--   An HNSW scan returns at most hnsw.ef_search rows, so the function
+--   raises it (transaction-local, up to 1000) to candidate_count when it is
+--   lower, and is therefore VOLATILE
+--
+-- Inlined in aurora_init.sql (STEP 6); keep both identical. Safe to run
+-- again on an existing database:
+--   psql -h YOUR_AURORA_ENDPOINT -U dbadmin -d docsmart_kb -f aurora_hybrid.sql
+-- On an existing table, adding the generated column rewrites bedrock_kb
+-- under an exclusive lock; run it in a maintenance window.
+
+-- ============================================================================
+-- Text Search Configuration
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_ts_config c
+        JOIN pg_namespace n ON n.oid = c.cfgnamespace
+        WHERE c.cfgname = 'spanish_unaccent' AND n.nspname = 'bedrock_integration'
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION bedrock_integration.spanish_unaccent (COPY = pg_catalog.spanish);
+        ALTER TEXT SEARCH CONFIGURATION bedrock_integration.spanish_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END $$;
+
+-- ============================================================================
+-- Generated Column and Index
+-- ============================================================================
+
+-- to_tsvector(regconfig, text) is immutable, so it can back a stored column
+ALTER TABLE bedrock_integration.bedrock_kb
+    ADD COLUMN IF NOT EXISTS chunks_tsv TSVECTOR
+    GENERATED ALWAYS AS (
+        to_tsvector('bedrock_integration.spanish_unaccent'::regconfig, COALESCE(chunks, ''))
+    ) STORED;
+
+COMMENT ON COLUMN bedrock_integration.bedrock_kb.chunks_tsv IS 'Spanish full-text vector of chunks (spanish_unaccent), generated';
+
+-- Replaces the english expression index
+DROP INDEX IF EXISTS bedrock_integration.bedrock_kb_chunks_fts_idx;
+
+CREATE INDEX IF NOT EXISTS bedrock_kb_chunks_tsv_idx
+ON bedrock_integration.bedrock_kb
+USING gin (chunks_tsv);
+
+-- ============================================================================
+-- Hybrid Search (Reciprocal Rank Fusion)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION bedrock_integration.hybrid_search(
+    query_text TEXT,
+    query_embedding VECTOR(1024),
+    match_count INT DEFAULT 5,
+    candidate_count INT DEFAULT 40,
+    rrf_k INT DEFAULT 60,
+    semantic_weight FLOAT DEFAULT 1.0,
+    full_text_weight FLOAT DEFAULT 1.0,
+    metadata_filter JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    chunks TEXT,
+    similarity FLOAT,
+    score FLOAT,
+    semantic_rank INT,
+    keyword_rank INT,
+    metadata JSONB
+) AS $$
+#variable_conflict use_column
+DECLARE
+    caller_ef_search TEXT := current_setting('hnsw.ef_search', true);
+BEGIN
+    IF candidate_count > COALESCE(NULLIF(caller_ef_search, '')::INT, 40) THEN
+        PERFORM set_config('hnsw.ef_search', LEAST(candidate_count, 1000)::TEXT, true);
+    END IF;
+
+    RETURN QUERY
+    WITH nearest AS MATERIALIZED (
+        -- Pure index scan, as in search_nearest_chunks; the metadata filter
+        -- is applied to the candidates afterwards
+        SELECT kb.id, kb.embedding <=> query_embedding AS distance, kb.metadata
+        FROM bedrock_integration.bedrock_kb kb
+        ORDER BY kb.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    semantic AS (
+        SELECT n.id, row_number() OVER (ORDER BY n.distance) AS rank
+        FROM nearest n
+        WHERE metadata_filter IS NULL OR n.metadata @> metadata_filter
+    ),
+    keyword AS (
+        SELECT kb.id, row_number() OVER (ORDER BY ts_rank_cd(kb.chunks_tsv, q) DESC) AS rank
+        FROM bedrock_integration.bedrock_kb kb,
+             websearch_to_tsquery('bedrock_integration.spanish_unaccent'::regconfig, query_text) q
+        WHERE kb.chunks_tsv @@ q
+          AND (metadata_filter IS NULL OR kb.metadata @> metadata_filter)
+        ORDER BY ts_rank_cd(kb.chunks_tsv, q) DESC
+        LIMIT candidate_count
+    ),
+    fused AS (
+        SELECT COALESCE(s.id, k.id) AS id,
+               COALESCE(semantic_weight / (rrf_k + s.rank), 0)
+                 + COALESCE(full_text_weight / (rrf_k + k.rank), 0) AS score,
+               s.rank AS semantic_rank,
+               k.rank AS keyword_rank
+        FROM semantic s
+        FULL OUTER JOIN keyword k ON k.id = s.id
+        ORDER BY score DESC
+        LIMIT match_count
+    )
+    -- Primary-key lookups for the winners only
+    SELECT kb.id, kb.chunks, 1 - (kb.embedding <=> query_embedding) AS similarity,
+           f.score, f.semantic_rank::INT, f.keyword_rank::INT, kb.metadata
+    FROM fused f
+    JOIN bedrock_integration.bedrock_kb kb ON kb.id = f.id
+    ORDER BY f.score DESC;
+
+    IF caller_ef_search IS NOT NULL AND current_setting('hnsw.ef_search', true) <> caller_ef_search THEN
+        PERFORM set_config('hnsw.ef_search', caller_ef_search, true);
+    END IF;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+COMMENT ON FUNCTION bedrock_integration.hybrid_search IS
+    'Vector and Spanish full-text candidates fused with Reciprocal Rank Fusion';
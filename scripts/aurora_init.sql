@@ -46,25 +46,47 @@ COMMENT ON COLUMN bedrock_integration.bedrock_kb.chunks IS 'Text content of the
 COMMENT ON COLUMN bedrock_integration.bedrock_kb.embedding IS '1024-dimensional vector from Amazon Titan Embeddings v2';
 COMMENT ON COLUMN bedrock_integration.bedrock_kb.metadata IS 'JSON metadata including source document, page number, etc.';
 
+-- Query analytics written by VectorDatabase.log_query (batched in the
+-- background, see query_log_writer.py); scripts/replay_queries.py replays
+-- exports of this table
+CREATE TABLE IF NOT EXISTS bedrock_integration.query_logs (
+    id BIGSERIAL PRIMARY KEY,
+    query_text TEXT NOT NULL,
+    query_embedding VECTOR(1024),
+    results_count INTEGER,
+    response_time_ms DOUBLE PRECISION,
+    metadata JSONB,
+    user_id TEXT,
+    session_id TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS query_logs_created_at_idx
+ON bedrock_integration.query_logs (created_at DESC);
+
+COMMENT ON TABLE bedrock_integration.query_logs IS 'Queries answered by the RAG system, for analytics and load replay';
+
 -- ============================================================================
 -- STEP 4: Create Indexes for Performance
 -- ============================================================================
 
 -- Index for vector similarity search using cosine distance
-CREATE INDEX IF NOT EXISTS bedrock_kb_embedding_idx 
-ON bedrock_integration.bedrock_kb 
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 100);
+-- HNSW needs no training data, so it can be built on the empty table (an
+-- ivfflat index built here would train its lists on zero rows). Re-check
+-- the method and parameters as the corpus grows:
+--   python scripts/vector_index_advisor.py --apply
+CREATE INDEX IF NOT EXISTS bedrock_kb_embedding_idx
+ON bedrock_integration.bedrock_kb
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 -- Index for metadata queries
 CREATE INDEX IF NOT EXISTS bedrock_kb_metadata_idx 
 ON bedrock_integration.bedrock_kb 
 USING gin (metadata);
 
--- Index for full-text search on chunks
-CREATE INDEX IF NOT EXISTS bedrock_kb_chunks_fts_idx 
-ON bedrock_integration.bedrock_kb 
-USING gin (to_tsvector('english', chunks));
+-- Full-text search on chunks: the Spanish generated column chunks_tsv and
+-- its GIN index are created with hybrid_search() in STEP 6 (aurora_hybrid.sql)
 
 -- Index for timestamp queries
 CREATE INDEX IF NOT EXISTS bedrock_kb_created_at_idx 
@@ -93,7 +115,93 @@ EXECUTE FUNCTION bedrock_integration.update_updated_at_column();
 -- STEP 6: Create Helper Functions
 -- ============================================================================
 
--- Function to search similar documents by vector
+-- The helper functions are inline so this script runs unchanged in the RDS
+-- Query Editor, through a driver or with psql. Keep them identical to
+-- aurora_search.sql, aurora_hybrid.sql and aurora_kb_stats.sql.
+
+-- Vector search: search_nearest_chunks() and search_similar_documents()
+-- (same statements as aurora_search.sql, which upgrades existing databases)
+
+-- ----------------------------------------------------------------------------
+-- Nearest-Neighbour Search
+-- ----------------------------------------------------------------------------
+
+-- Signature before the ef_search parameter; a second overload would make
+-- five-argument calls ambiguous
+DROP FUNCTION IF EXISTS bedrock_integration.search_nearest_chunks(VECTOR(1024), FLOAT, INT, JSONB, INT);
+
+CREATE OR REPLACE FUNCTION bedrock_integration.search_nearest_chunks(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5,
+    metadata_filter JSONB DEFAULT NULL,
+    max_candidates INT DEFAULT 1000,
+    ef_search INT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    chunks TEXT,
+    similarity FLOAT,
+    metadata JSONB
+) AS $$
+DECLARE
+    -- Without a metadata filter the threshold only trims the tail of the
+    -- ordering, so match_count candidates are always enough
+    fetch_count INT := CASE WHEN metadata_filter IS NULL THEN match_count ELSE match_count * 4 END;
+    candidate_count INT;
+    matched UUID[];
+    caller_ef_search TEXT := current_setting('hnsw.ef_search', true);
+BEGIN
+    IF ef_search IS NOT NULL THEN
+        max_candidates := LEAST(max_candidates, ef_search);
+        fetch_count := LEAST(fetch_count, max_candidates);
+    END IF;
+
+    LOOP
+        IF ef_search IS NULL AND fetch_count > COALESCE(NULLIF(caller_ef_search, '')::INT, 40) THEN
+            PERFORM set_config('hnsw.ef_search', LEAST(fetch_count, 1000)::TEXT, true);
+        END IF;
+
+        WITH candidates AS MATERIALIZED (
+            SELECT kb.id, kb.embedding <=> query_embedding AS distance, kb.metadata
+            FROM bedrock_integration.bedrock_kb kb
+            ORDER BY kb.embedding <=> query_embedding
+            LIMIT fetch_count
+        )
+        SELECT COUNT(*),
+               array_agg(c.id ORDER BY c.distance) FILTER (
+                   WHERE c.distance < 1 - match_threshold
+                     AND (metadata_filter IS NULL OR c.metadata @> metadata_filter)
+               )
+        INTO candidate_count, matched
+        FROM candidates c;
+
+        EXIT WHEN metadata_filter IS NULL
+              OR COALESCE(cardinality(matched), 0) >= match_count
+              OR candidate_count < fetch_count
+              OR fetch_count >= max_candidates;
+        fetch_count := LEAST(fetch_count * 4, max_candidates);
+    END LOOP;
+
+    IF caller_ef_search IS NOT NULL AND current_setting('hnsw.ef_search', true) <> caller_ef_search THEN
+        PERFORM set_config('hnsw.ef_search', caller_ef_search, true);
+    END IF;
+    PERFORM set_config('docsmart.last_scan', candidate_count || ',' || fetch_count, true);
+
+    -- Primary-key lookups for the winners only
+    RETURN QUERY
+    SELECT kb.id, kb.chunks, 1 - (kb.embedding <=> query_embedding) AS similarity, kb.metadata
+    FROM unnest(matched[1:match_count]) WITH ORDINALITY AS m(id, rank)
+    JOIN bedrock_integration.bedrock_kb kb ON kb.id = m.id
+    ORDER BY m.rank;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+COMMENT ON FUNCTION bedrock_integration.search_nearest_chunks IS
+    'Index-scan nearest neighbours, threshold/metadata filter applied afterwards with widening';
+
+-- Original signature, kept for existing callers; now an index scan.
+-- VOLATILE like search_nearest_chunks, which changes hnsw.ef_search
 CREATE OR REPLACE FUNCTION bedrock_integration.search_similar_documents(
     query_embedding VECTOR(1024),
     match_threshold FLOAT DEFAULT 0.7,
@@ -105,21 +213,264 @@ RETURNS TABLE (
     similarity FLOAT,
     metadata JSONB
 ) AS $$
+    SELECT * FROM bedrock_integration.search_nearest_chunks(query_embedding, match_threshold, match_count);
+$$ LANGUAGE sql VOLATILE;
+
+-- Spanish full-text column, its GIN index and hybrid_search()
+-- (same statements as aurora_hybrid.sql, which upgrades existing databases)
+
+-- ----------------------------------------------------------------------------
+-- Text Search Configuration
+-- ----------------------------------------------------------------------------
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
 BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_ts_config c
+        JOIN pg_namespace n ON n.oid = c.cfgnamespace
+        WHERE c.cfgname = 'spanish_unaccent' AND n.nspname = 'bedrock_integration'
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION bedrock_integration.spanish_unaccent (COPY = pg_catalog.spanish);
+        ALTER TEXT SEARCH CONFIGURATION bedrock_integration.spanish_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END $$;
+
+-- ----------------------------------------------------------------------------
+-- Generated Column and Index
+-- ----------------------------------------------------------------------------
+
+-- to_tsvector(regconfig, text) is immutable, so it can back a stored column
+ALTER TABLE bedrock_integration.bedrock_kb
+    ADD COLUMN IF NOT EXISTS chunks_tsv TSVECTOR
+    GENERATED ALWAYS AS (
+        to_tsvector('bedrock_integration.spanish_unaccent'::regconfig, COALESCE(chunks, ''))
+    ) STORED;
+
+COMMENT ON COLUMN bedrock_integration.bedrock_kb.chunks_tsv IS 'Spanish full-text vector of chunks (spanish_unaccent), generated';
+
+-- Replaces the english expression index
+DROP INDEX IF EXISTS bedrock_integration.bedrock_kb_chunks_fts_idx;
+
+CREATE INDEX IF NOT EXISTS bedrock_kb_chunks_tsv_idx
+ON bedrock_integration.bedrock_kb
+USING gin (chunks_tsv);
+
+-- ----------------------------------------------------------------------------
+-- Hybrid Search (Reciprocal Rank Fusion)
+-- ----------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION bedrock_integration.hybrid_search(
+    query_text TEXT,
+    query_embedding VECTOR(1024),
+    match_count INT DEFAULT 5,
+    candidate_count INT DEFAULT 40,
+    rrf_k INT DEFAULT 60,
+    semantic_weight FLOAT DEFAULT 1.0,
+    full_text_weight FLOAT DEFAULT 1.0,
+    metadata_filter JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    chunks TEXT,
+    similarity FLOAT,
+    score FLOAT,
+    semantic_rank INT,
+    keyword_rank INT,
+    metadata JSONB
+) AS $$
+#variable_conflict use_column
+DECLARE
+    caller_ef_search TEXT := current_setting('hnsw.ef_search', true);
+BEGIN
+    IF candidate_count > COALESCE(NULLIF(caller_ef_search, '')::INT, 40) THEN
+        PERFORM set_config('hnsw.ef_search', LEAST(candidate_count, 1000)::TEXT, true);
+    END IF;
+
     RETURN QUERY
-    SELECT 
-        bedrock_kb.id,
-        bedrock_kb.chunks,
-        1 - (bedrock_kb.embedding <=> query_embedding) AS similarity,
-        bedrock_kb.metadata
+    WITH nearest AS MATERIALIZED (
+        -- Pure index scan, as in search_nearest_chunks; the metadata filter
+        -- is applied to the candidates afterwards
+        SELECT kb.id, kb.embedding <=> query_embedding AS distance, kb.metadata
+        FROM bedrock_integration.bedrock_kb kb
+        ORDER BY kb.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    semantic AS (
+        SELECT n.id, row_number() OVER (ORDER BY n.distance) AS rank
+        FROM nearest n
+        WHERE metadata_filter IS NULL OR n.metadata @> metadata_filter
+    ),
+    keyword AS (
+        SELECT kb.id, row_number() OVER (ORDER BY ts_rank_cd(kb.chunks_tsv, q) DESC) AS rank
+        FROM bedrock_integration.bedrock_kb kb,
+             websearch_to_tsquery('bedrock_integration.spanish_unaccent'::regconfig, query_text) q
+        WHERE kb.chunks_tsv @@ q
+          AND (metadata_filter IS NULL OR kb.metadata @> metadata_filter)
+        ORDER BY ts_rank_cd(kb.chunks_tsv, q) DESC
+        LIMIT candidate_count
+    ),
+    fused AS (
+        SELECT COALESCE(s.id, k.id) AS id,
+               COALESCE(semantic_weight / (rrf_k + s.rank), 0)
+                 + COALESCE(full_text_weight / (rrf_k + k.rank), 0) AS score,
+               s.rank AS semantic_rank,
+               k.rank AS keyword_rank
+        FROM semantic s
+        FULL OUTER JOIN keyword k ON k.id = s.id
+        ORDER BY score DESC
+        LIMIT match_count
+    )
+    -- Primary-key lookups for the winners only
+    SELECT kb.id, kb.chunks, 1 - (kb.embedding <=> query_embedding) AS similarity,
+           f.score, f.semantic_rank::INT, f.keyword_rank::INT, kb.metadata
+    FROM fused f
+    JOIN bedrock_integration.bedrock_kb kb ON kb.id = f.id
+    ORDER BY f.score DESC;
+
+    IF caller_ef_search IS NOT NULL AND current_setting('hnsw.ef_search', true) <> caller_ef_search THEN
+        PERFORM set_config('hnsw.ef_search', caller_ef_search, true);
+    END IF;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+COMMENT ON FUNCTION bedrock_integration.hybrid_search IS
+    'Vector and Spanish full-text candidates fused with Reciprocal Rank Fusion';
+
+-- Statistics summary tables, their maintenance triggers and
+-- get_kb_statistics() / get_kb_file_statistics()
+-- (same statements as aurora_kb_stats.sql, which upgrades existing databases)
+
+-- ----------------------------------------------------------------------------
+-- Summary Tables
+-- ----------------------------------------------------------------------------
+
+-- Chunk count and text size per source file
+CREATE TABLE IF NOT EXISTS bedrock_integration.kb_file_stats (
+    file_name TEXT PRIMARY KEY,
+    chunk_count BIGINT NOT NULL,
+    total_chars BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Number of chunks carrying each metadata key
+CREATE TABLE IF NOT EXISTS bedrock_integration.kb_metadata_keys (
+    key TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL
+);
+
+COMMENT ON TABLE bedrock_integration.kb_file_stats IS 'Per-file chunk counts maintained by triggers on bedrock_kb';
+COMMENT ON TABLE bedrock_integration.kb_metadata_keys IS 'Metadata key usage maintained by triggers on bedrock_kb';
+
+-- ----------------------------------------------------------------------------
+-- Maintenance Trigger
+-- ----------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION bedrock_integration.kb_stats_maintain()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO bedrock_integration.kb_file_stats AS s (file_name, chunk_count, total_chars)
+        SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+               -COUNT(*), -COALESCE(SUM(LENGTH(chunks)), 0)
+        FROM old_rows
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (file_name) DO UPDATE
+        SET chunk_count = s.chunk_count + EXCLUDED.chunk_count,
+            total_chars = s.total_chars + EXCLUDED.total_chars,
+            updated_at = CURRENT_TIMESTAMP;
+
+        INSERT INTO bedrock_integration.kb_metadata_keys AS k (key, row_count)
+        SELECT key, -COUNT(*)
+        FROM old_rows, jsonb_object_keys(metadata) AS key
+        WHERE jsonb_typeof(metadata) = 'object'
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (key) DO UPDATE SET row_count = k.row_count + EXCLUDED.row_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO bedrock_integration.kb_file_stats AS s (file_name, chunk_count, total_chars)
+        SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+               COUNT(*), COALESCE(SUM(LENGTH(chunks)), 0)
+        FROM new_rows
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (file_name) DO UPDATE
+        SET chunk_count = s.chunk_count + EXCLUDED.chunk_count,
+            total_chars = s.total_chars + EXCLUDED.total_chars,
+            updated_at = CURRENT_TIMESTAMP;
+
+        INSERT INTO bedrock_integration.kb_metadata_keys AS k (key, row_count)
+        SELECT key, COUNT(*)
+        FROM new_rows, jsonb_object_keys(metadata) AS key
+        WHERE jsonb_typeof(metadata) = 'object'
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (key) DO UPDATE SET row_count = k.row_count + EXCLUDED.row_count;
+    END IF;
+
+    DELETE FROM bedrock_integration.kb_file_stats WHERE chunk_count <= 0;
+    DELETE FROM bedrock_integration.kb_metadata_keys WHERE row_count <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER kb_stats_insert
+AFTER INSERT ON bedrock_integration.bedrock_kb
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+CREATE OR REPLACE TRIGGER kb_stats_update
+AFTER UPDATE ON bedrock_integration.bedrock_kb
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+CREATE OR REPLACE TRIGGER kb_stats_delete
+AFTER DELETE ON bedrock_integration.bedrock_kb
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+-- ----------------------------------------------------------------------------
+-- Rebuild (initial backfill, or repair after TRUNCATE / trigger downtime)
+-- ----------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION bedrock_integration.refresh_kb_statistics()
+RETURNS VOID AS $$
+BEGIN
+    -- Block writers while recounting so no change is counted twice or lost
+    LOCK TABLE bedrock_integration.bedrock_kb IN SHARE MODE;
+
+    DELETE FROM bedrock_integration.kb_file_stats;
+    INSERT INTO bedrock_integration.kb_file_stats (file_name, chunk_count, total_chars)
+    SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+           COUNT(*), COALESCE(SUM(LENGTH(chunks)), 0)
     FROM bedrock_integration.bedrock_kb
-    WHERE 1 - (bedrock_kb.embedding <=> query_embedding) > match_threshold
-    ORDER BY bedrock_kb.embedding <=> query_embedding
-    LIMIT match_count;
+    GROUP BY 1;
+
+    DELETE FROM bedrock_integration.kb_metadata_keys;
+    INSERT INTO bedrock_integration.kb_metadata_keys (key, row_count)
+    SELECT key, COUNT(*)
+    FROM bedrock_integration.bedrock_kb, jsonb_object_keys(metadata) AS key
+    WHERE jsonb_typeof(metadata) = 'object'
+    GROUP BY 1;
 END;
 $$ LANGUAGE plpgsql;
 
--- Function to get statistics about the knowledge base
+SELECT bedrock_integration.refresh_kb_statistics();
+
+-- ----------------------------------------------------------------------------
+-- Statistics Functions
+-- ----------------------------------------------------------------------------
+
+-- Same columns as before; reads the summary tables and the created_at index
+-- (MIN/MAX are index lookups) instead of aggregating over every chunk
 CREATE OR REPLACE FUNCTION bedrock_integration.get_kb_statistics()
 RETURNS TABLE (
     total_chunks BIGINT,
@@ -130,15 +481,27 @@ RETURNS TABLE (
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT 
-        COUNT(*)::BIGINT AS total_chunks,
-        AVG(LENGTH(chunks))::FLOAT AS avg_chunk_length,
-        COUNT(DISTINCT jsonb_object_keys(metadata))::INT AS total_metadata_keys,
-        MIN(created_at) AS oldest_entry,
-        MAX(created_at) AS newest_entry
-    FROM bedrock_integration.bedrock_kb;
+    SELECT
+        COALESCE(SUM(f.chunk_count), 0)::BIGINT AS total_chunks,
+        (SUM(f.total_chars)::FLOAT / NULLIF(SUM(f.chunk_count), 0)) AS avg_chunk_length,
+        (SELECT COUNT(*) FROM bedrock_integration.kb_metadata_keys)::INT AS total_metadata_keys,
+        (SELECT MIN(b.created_at) FROM bedrock_integration.bedrock_kb b) AS oldest_entry,
+        (SELECT MAX(b.created_at) FROM bedrock_integration.bedrock_kb b) AS newest_entry
+    FROM bedrock_integration.kb_file_stats f;
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Chunk counts per file (used by the UI sidebar)
+CREATE OR REPLACE FUNCTION bedrock_integration.get_kb_file_statistics()
+RETURNS TABLE (
+    file_name TEXT,
+    chunk_count BIGINT,
+    total_chars BIGINT
+) AS $$
+    SELECT f.file_name, f.chunk_count, f.total_chars
+    FROM bedrock_integration.kb_file_stats f
+    ORDER BY f.file_name;
+$$ LANGUAGE sql STABLE;
 
 -- ============================================================================
 -- STEP 7: Create Views for Monitoring
@@ -241,9 +604,10 @@ DO $$
 BEGIN
     RAISE NOTICE 'Database initialization completed successfully!';
     RAISE NOTICE 'Schema: bedrock_integration';
-    RAISE NOTICE 'Table: bedrock_kb';
+    RAISE NOTICE 'Tables: bedrock_kb, query_logs';
     RAISE NOTICE 'Vector dimension: 1024 (Amazon Titan Embeddings v2)';
-    RAISE NOTICE 'Indexes created: 4 (vector similarity, metadata, full-text, timestamp)';
-    RAISE NOTICE 'Helper functions created: 2 (search_similar_documents, get_kb_statistics)';
+    RAISE NOTICE 'Indexes created: 4 (vector similarity, metadata, Spanish full-text, timestamp)';
+    RAISE NOTICE 'Helper functions created: 6 (search_nearest_chunks, search_similar_documents, hybrid_search, get_kb_statistics, get_kb_file_statistics, refresh_kb_statistics)';
+    RAISE NOTICE 'Statistics tables: kb_file_stats, kb_metadata_keys (maintained by triggers)';
     RAISE NOTICE 'Views created: 2 (recent_ingestions, kb_health_metrics)';
 END $$;
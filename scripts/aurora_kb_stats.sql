@@ -0,0 +1,172 @@
+-- Knowledge Base Statistics Summary
+-- DocSmart RAG System - AWS AI Engineer Nanodegree Final Project
+--
+-- Keeps per-file chunk counts and metadata key counts in small summary
+-- tables maintained by statement-level triggers, so statistics are read in
+-- time proportional to the number of files instead of scanning bedrock_kb.
+-- The triggers use transition tables: one summary update per INSERT/COPY
+-- batch, not per row.
+--
+-- Inlined in aurora_init.sql (STEP 6); keep both identical. Safe to run
+-- again on an existing database:
+--   psql -h YOUR_AURORA_ENDPOINT -U dbadmin -d docsmart_kb -f aurora_kb_stats.sql
+
+-- ============================================================================
+-- Summary Tables
+-- ============================================================================
+
+-- Chunk count and text size per source file
+CREATE TABLE IF NOT EXISTS bedrock_integration.kb_file_stats (
+    file_name TEXT PRIMARY KEY,
+    chunk_count BIGINT NOT NULL,
+    total_chars BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Number of chunks carrying each metadata key
+CREATE TABLE IF NOT EXISTS bedrock_integration.kb_metadata_keys (
+    key TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL
+);
+
+COMMENT ON TABLE bedrock_integration.kb_file_stats IS 'Per-file chunk counts maintained by triggers on bedrock_kb';
+COMMENT ON TABLE bedrock_integration.kb_metadata_keys IS 'Metadata key usage maintained by triggers on bedrock_kb';
+
+-- ============================================================================
+-- Maintenance Trigger
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION bedrock_integration.kb_stats_maintain()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO bedrock_integration.kb_file_stats AS s (file_name, chunk_count, total_chars)
+        SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+               -COUNT(*), -COALESCE(SUM(LENGTH(chunks)), 0)
+        FROM old_rows
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (file_name) DO UPDATE
+        SET chunk_count = s.chunk_count + EXCLUDED.chunk_count,
+            total_chars = s.total_chars + EXCLUDED.total_chars,
+            updated_at = CURRENT_TIMESTAMP;
+
+        INSERT INTO bedrock_integration.kb_metadata_keys AS k (key, row_count)
+        SELECT key, -COUNT(*)
+        FROM old_rows, jsonb_object_keys(metadata) AS key
+        WHERE jsonb_typeof(metadata) = 'object'
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (key) DO UPDATE SET row_count = k.row_count + EXCLUDED.row_count;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO bedrock_integration.kb_file_stats AS s (file_name, chunk_count, total_chars)
+        SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+               COUNT(*), COALESCE(SUM(LENGTH(chunks)), 0)
+        FROM new_rows
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (file_name) DO UPDATE
+        SET chunk_count = s.chunk_count + EXCLUDED.chunk_count,
+            total_chars = s.total_chars + EXCLUDED.total_chars,
+            updated_at = CURRENT_TIMESTAMP;
+
+        INSERT INTO bedrock_integration.kb_metadata_keys AS k (key, row_count)
+        SELECT key, COUNT(*)
+        FROM new_rows, jsonb_object_keys(metadata) AS key
+        WHERE jsonb_typeof(metadata) = 'object'
+        GROUP BY 1
+        ORDER BY 1
+        ON CONFLICT (key) DO UPDATE SET row_count = k.row_count + EXCLUDED.row_count;
+    END IF;
+
+    DELETE FROM bedrock_integration.kb_file_stats WHERE chunk_count <= 0;
+    DELETE FROM bedrock_integration.kb_metadata_keys WHERE row_count <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER kb_stats_insert
+AFTER INSERT ON bedrock_integration.bedrock_kb
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+CREATE OR REPLACE TRIGGER kb_stats_update
+AFTER UPDATE ON bedrock_integration.bedrock_kb
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+CREATE OR REPLACE TRIGGER kb_stats_delete
+AFTER DELETE ON bedrock_integration.bedrock_kb
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION bedrock_integration.kb_stats_maintain();
+
+-- ============================================================================
+-- Rebuild (initial backfill, or repair after TRUNCATE / trigger downtime)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION bedrock_integration.refresh_kb_statistics()
+RETURNS VOID AS $$
+BEGIN
+    -- Block writers while recounting so no change is counted twice or lost
+    LOCK TABLE bedrock_integration.bedrock_kb IN SHARE MODE;
+
+    DELETE FROM bedrock_integration.kb_file_stats;
+    INSERT INTO bedrock_integration.kb_file_stats (file_name, chunk_count, total_chars)
+    SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'),
+           COUNT(*), COALESCE(SUM(LENGTH(chunks)), 0)
+    FROM bedrock_integration.bedrock_kb
+    GROUP BY 1;
+
+    DELETE FROM bedrock_integration.kb_metadata_keys;
+    INSERT INTO bedrock_integration.kb_metadata_keys (key, row_count)
+    SELECT key, COUNT(*)
+    FROM bedrock_integration.bedrock_kb, jsonb_object_keys(metadata) AS key
+    WHERE jsonb_typeof(metadata) = 'object'
+    GROUP BY 1;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT bedrock_integration.refresh_kb_statistics();
+
+-- ============================================================================
+-- Statistics Functions
+-- ============================================================================
+
+-- Same columns as before; reads the summary tables and the created_at index
+-- (MIN/MAX are index lookups) instead of aggregating over every chunk
+CREATE OR REPLACE FUNCTION bedrock_integration.get_kb_statistics()
+RETURNS TABLE (
+    total_chunks BIGINT,
+    avg_chunk_length FLOAT,
+    total_metadata_keys INT,
+    oldest_entry TIMESTAMP WITH TIME ZONE,
+    newest_entry TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        COALESCE(SUM(f.chunk_count), 0)::BIGINT AS total_chunks,
+        (SUM(f.total_chars)::FLOAT / NULLIF(SUM(f.chunk_count), 0)) AS avg_chunk_length,
+        (SELECT COUNT(*) FROM bedrock_integration.kb_metadata_keys)::INT AS total_metadata_keys,
+        (SELECT MIN(b.created_at) FROM bedrock_integration.bedrock_kb b) AS oldest_entry,
+        (SELECT MAX(b.created_at) FROM bedrock_integration.bedrock_kb b) AS newest_entry
+    FROM bedrock_integration.kb_file_stats f;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Chunk counts per file (used by the UI sidebar)
+CREATE OR REPLACE FUNCTION bedrock_integration.get_kb_file_statistics()
+RETURNS TABLE (
+    file_name TEXT,
+    chunk_count BIGINT,
+    total_chars BIGINT
+) AS $$
+    SELECT f.file_name, f.chunk_count, f.total_chars
+    FROM bedrock_integration.kb_file_stats f
+    ORDER BY f.file_name;
+$$ LANGUAGE sql STABLE;
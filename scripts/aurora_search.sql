@@ -0,0 +1,132 @@
+-- Vector Search Functions
+-- DocSmart RAG System - AWS AI Engineer Nanodegree Final Project
+--
+-- The original search_similar_documents filtered on
+--   WHERE 1 - (embedding <=> query_embedding) > match_threshold
+-- before ORDER BY ... LIMIT. A predicate on the distance cannot be answered
+-- by the ivfflat/HNSW index, so the planner either scanned the whole table
+-- or ran the index scan and discarded rows through a filter node.
+--
+-- search_nearest_chunks runs a pure nearest-neighbour index scan
+--   ORDER BY embedding <=> $1 LIMIT n
+-- in a materialized CTE and applies the threshold (and an optional metadata
+-- filter) to those candidates afterwards. With a metadata filter, when it
+-- leaves fewer than match_count rows and the index returned a full
+-- candidate set, it fetches four times as many candidates and tries again,
+-- up to max_candidates. Without one, the first match_count candidates are
+-- the answer: rows past them are only further away.
+--
+-- An HNSW index scan returns at most hnsw.ef_search rows, so the loop
+-- raises hnsw.ef_search (transaction-local, capped at pgvector's 1000) to
+-- the candidate count before each scan and restores it afterwards. A
+-- caller that sets hnsw.ef_search itself and passes it as ef_search keeps
+-- control of the scan: the setting is left alone and the candidates are
+-- capped at it (VectorDatabase.search_similar_documents widens it between
+-- calls instead). An ivfflat scan returns only the rows in its
+-- ivfflat.probes lists; that limit is always the caller's to widen.
+-- Changing a setting is a side effect, so the function is VOLATILE.
+--
+-- The last scan is reported in the transaction-local setting
+-- docsmart.last_scan as 'candidates,requested': fewer candidates than
+-- requested means the index ran out at the current effort.
+--
+-- The threshold keeps the original strict comparison:
+--   1 - distance > match_threshold, i.e. distance < 1 - match_threshold
+--
+-- Inlined in aurora_init.sql (STEP 6); keep both identical. Safe to run
+-- again on an existing database:
+--   psql -h YOUR_AURORA_ENDPOINT -U dbadmin -d docsmart_kb -f aurora_search.sql
+
+-- ============================================================================
+-- Nearest-Neighbour Search
+-- ============================================================================
+
+-- Signature before the ef_search parameter; a second overload would make
+-- five-argument calls ambiguous
+DROP FUNCTION IF EXISTS bedrock_integration.search_nearest_chunks(VECTOR(1024), FLOAT, INT, JSONB, INT);
+
+CREATE OR REPLACE FUNCTION bedrock_integration.search_nearest_chunks(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5,
+    metadata_filter JSONB DEFAULT NULL,
+    max_candidates INT DEFAULT 1000,
+    ef_search INT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    chunks TEXT,
+    similarity FLOAT,
+    metadata JSONB
+) AS $$
+DECLARE
+    -- Without a metadata filter the threshold only trims the tail of the
+    -- ordering, so match_count candidates are always enough
+    fetch_count INT := CASE WHEN metadata_filter IS NULL THEN match_count ELSE match_count * 4 END;
+    candidate_count INT;
+    matched UUID[];
+    caller_ef_search TEXT := current_setting('hnsw.ef_search', true);
+BEGIN
+    IF ef_search IS NOT NULL THEN
+        max_candidates := LEAST(max_candidates, ef_search);
+        fetch_count := LEAST(fetch_count, max_candidates);
+    END IF;
+
+    LOOP
+        IF ef_search IS NULL AND fetch_count > COALESCE(NULLIF(caller_ef_search, '')::INT, 40) THEN
+            PERFORM set_config('hnsw.ef_search', LEAST(fetch_count, 1000)::TEXT, true);
+        END IF;
+
+        WITH candidates AS MATERIALIZED (
+            SELECT kb.id, kb.embedding <=> query_embedding AS distance, kb.metadata
+            FROM bedrock_integration.bedrock_kb kb
+            ORDER BY kb.embedding <=> query_embedding
+            LIMIT fetch_count
+        )
+        SELECT COUNT(*),
+               array_agg(c.id ORDER BY c.distance) FILTER (
+                   WHERE c.distance < 1 - match_threshold
+                     AND (metadata_filter IS NULL OR c.metadata @> metadata_filter)
+               )
+        INTO candidate_count, matched
+        FROM candidates c;
+
+        EXIT WHEN metadata_filter IS NULL
+              OR COALESCE(cardinality(matched), 0) >= match_count
+              OR candidate_count < fetch_count
+              OR fetch_count >= max_candidates;
+        fetch_count := LEAST(fetch_count * 4, max_candidates);
+    END LOOP;
+
+    IF caller_ef_search IS NOT NULL AND current_setting('hnsw.ef_search', true) <> caller_ef_search THEN
+        PERFORM set_config('hnsw.ef_search', caller_ef_search, true);
+    END IF;
+    PERFORM set_config('docsmart.last_scan', candidate_count || ',' || fetch_count, true);
+
+    -- Primary-key lookups for the winners only
+    RETURN QUERY
+    SELECT kb.id, kb.chunks, 1 - (kb.embedding <=> query_embedding) AS similarity, kb.metadata
+    FROM unnest(matched[1:match_count]) WITH ORDINALITY AS m(id, rank)
+    JOIN bedrock_integration.bedrock_kb kb ON kb.id = m.id
+    ORDER BY m.rank;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+COMMENT ON FUNCTION bedrock_integration.search_nearest_chunks IS
+    'Index-scan nearest neighbours, threshold/metadata filter applied afterwards with widening';
+
+-- Original signature, kept for existing callers; now an index scan.
+-- VOLATILE like search_nearest_chunks, which changes hnsw.ef_search
+CREATE OR REPLACE FUNCTION bedrock_integration.search_similar_documents(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    chunks TEXT,
+    similarity FLOAT,
+    metadata JSONB
+) AS $$
+    SELECT * FROM bedrock_integration.search_nearest_chunks(query_embedding, match_threshold, match_count);
+$$ LANGUAGE sql VOLATILE;
@@ -0,0 +1,463 @@
+"""
+Local Bedrock Emulator for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This script runs a local HTTP server that speaks the subset of the Bedrock
+REST APIs used by the project, so the pipeline can be load-tested offline:
+- bedrock-runtime InvokeModel (Titan embeddings and Claude messages)
+- bedrock-runtime InvokeModelWithResponseStream (Claude, AWS event stream)
+- bedrock-agent-runtime Retrieve (cosine search over a local document folder)
+
+Embeddings are deterministic: every token is hashed into a 1024-dim vector,
+so the same text always yields the same embedding and texts sharing words
+end up close to each other. Claude responses are canned and built from the
+first context document in the prompt.
+
+Latency, throttling and error rates can be injected per operation to
+reproduce realistic Bedrock behaviour.
+
+Usage:
+    python scripts/bedrock_emulator.py --port 8765 --docs sample_docs \\
+        --invoke-latency lognormal:800:0.3 --throttle-rate 0.02
+
+    # Point the project at the emulator (any non-empty credentials work)
+    export BEDROCK_ENDPOINT_URL=http://localhost:8765
+    export AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test
+    export KNOWLEDGE_BASE_ID=LOCALKB001
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import sys
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+EMBEDDING_DIMENSIONS = 1024
+CHUNK_SIZE = 1000
+SUPPORTED_EXTENSIONS = {'.txt', '.md'}
+
+# ============================================================================
+# Deterministic Embeddings
+# ============================================================================
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split into word tokens."""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    return re.findall(r'\w+', normalized)
+
+
+def hash_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS, normalize: bool = True) -> List[float]:
+    """
+    Build a deterministic embedding by feature-hashing each token.
+
+    Each token contributes +1/-1 to two positions chosen from its SHA-256
+    digest, so identical texts give identical vectors and overlapping
+    vocabulary gives positive cosine similarity.
+    """
+    vector = [0.0] * dimensions
+    for token in tokenize(text):
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        for offset in (0, 8):
+            index = int.from_bytes(digest[offset:offset + 4], 'big') % dimensions
+            sign = 1.0 if digest[offset + 4] & 1 else -1.0
+            vector[index] += sign
+
+    if normalize:
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+    return vector
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+# ============================================================================
+# Local Corpus (for Retrieve)
+# ============================================================================
+
+class LocalCorpus:
+    """Chunks and embeddings of every text file in a local folder."""
+
+    def __init__(self, docs_dir: Optional[str], bucket: str = "docsmart-emulator"):
+        self.chunks: List[Dict[str, Any]] = []
+        if docs_dir and Path(docs_dir).is_dir():
+            for path in sorted(Path(docs_dir).rglob('*')):
+                if path.suffix.lower() in SUPPORTED_EXTENSIONS:
+                    self._add_file(path, Path(docs_dir), bucket)
+        print(f"✓ Loaded {len(self.chunks)} chunk(s) from {docs_dir or '(no docs folder)'}")
+
+    def _add_file(self, path: Path, root: Path, bucket: str) -> None:
+        text = path.read_text(encoding='utf-8', errors='ignore')
+        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+
+        current = ""
+        chunk_texts = []
+        for paragraph in paragraphs:
+            if current and len(current) + len(paragraph) > CHUNK_SIZE:
+                chunk_texts.append(current)
+                current = ""
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            chunk_texts.append(current)
+
+        uri = f"s3://{bucket}/{path.relative_to(root).as_posix()}"
+        for i, chunk in enumerate(chunk_texts):
+            self.chunks.append({
+                'text': chunk,
+                'embedding': hash_embedding(chunk),
+                'uri': uri,
+                'chunk_id': f"{hashlib.md5(uri.encode()).hexdigest()[:12]}-{i}"
+            })
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        query_embedding = hash_embedding(query)
+        scored = sorted(
+            ((cosine(query_embedding, chunk['embedding']), chunk) for chunk in self.chunks),
+            key=lambda pair: pair[0],
+            reverse=True
+        )
+        return [
+            {
+                'content': {'text': chunk['text'], 'type': 'TEXT'},
+                'location': {'type': 'S3', 's3Location': {'uri': chunk['uri']}},
+                'metadata': {
+                    'x-amz-bedrock-kb-source-uri': chunk['uri'],
+                    'x-amz-bedrock-kb-chunk-id': chunk['chunk_id']
+                },
+                # Bedrock scores are in [0, 1]
+                'score': round((score + 1) / 2, 6)
+            }
+            for score, chunk in scored[:top_k]
+        ]
+
+# ============================================================================
+# Canned Claude Responses
+# ============================================================================
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def canned_claude_answer(request: Dict[str, Any]) -> Tuple[str, int]:
+    """Build a deterministic answer from the first context document in the prompt."""
+    prompt_parts = [request.get('system', '')]
+    for message in request.get('messages', []):
+        content = message.get('content', '')
+        if isinstance(content, list):
+            content = ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+        prompt_parts.append(content)
+    prompt = '\n'.join(prompt_parts)
+
+    match = re.search(r'Documento 1 \(relevancia: [\d.]+\):\n(.+?)(?:\n\nDocumento 2|\n</documentos_disponibles>)',
+                      prompt, re.DOTALL)
+    if match:
+        excerpt = ' '.join(match.group(1).split())[:400]
+        answer = f"Según los documentos disponibles: {excerpt}"
+    else:
+        answer = "No encontré información suficiente en los documentos proporcionados para responder."
+
+    max_tokens = int(request.get('max_tokens', 1000))
+    words = answer.split()
+    answer = ' '.join(words[:max_tokens])
+    return answer, estimate_tokens(prompt)
+
+# ============================================================================
+# AWS Event Stream Encoding
+# ============================================================================
+
+def encode_event(payload: bytes, event_type: str = 'chunk') -> bytes:
+    """Encode one message in the application/vnd.amazon.eventstream format."""
+    headers = b''
+    for name, value in ((':event-type', event_type),
+                        (':content-type', 'application/json'),
+                        (':message-type', 'event')):
+        name_bytes, value_bytes = name.encode('utf-8'), value.encode('utf-8')
+        headers += struct.pack('>B', len(name_bytes)) + name_bytes
+        headers += struct.pack('>BH', 7, len(value_bytes)) + value_bytes
+
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack('>II', total_length, len(headers))
+    prelude += struct.pack('>I', binascii.crc32(prelude) & 0xffffffff)
+    message = prelude + headers + payload
+    return message + struct.pack('>I', binascii.crc32(message) & 0xffffffff)
+
+
+def claude_stream_events(answer: str, model_id: str, input_tokens: int) -> List[Dict[str, Any]]:
+    """Claude Messages streaming events for a complete answer."""
+    words = answer.split(' ')
+    deltas = [' '.join(words[i:i + 5]) + (' ' if i + 5 < len(words) else '') for i in range(0, len(words), 5)]
+    output_tokens = estimate_tokens(answer)
+
+    events = [
+        {'type': 'message_start', 'message': {
+            'id': f"msg_emulator_{hashlib.md5(answer.encode()).hexdigest()[:16]}",
+            'type': 'message', 'role': 'assistant', 'model': model_id, 'content': [],
+            'stop_reason': None, 'usage': {'input_tokens': input_tokens, 'output_tokens': 1}}},
+        {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}},
+    ]
+    events += [
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': delta}}
+        for delta in deltas
+    ]
+    events += [
+        {'type': 'content_block_stop', 'index': 0},
+        {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+         'usage': {'output_tokens': output_tokens}},
+        {'type': 'message_stop', 'amazon-bedrock-invocationMetrics': {
+            'inputTokenCount': input_tokens, 'outputTokenCount': output_tokens}},
+    ]
+    return events
+
+# ============================================================================
+# Fault Injection
+# ============================================================================
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA into a sampler (seconds)."""
+    parts = spec.split(':')
+    kind = parts[0]
+    if kind in ('0', 'none'):
+        return lambda: 0.0
+    if kind == 'fixed':
+        value = float(parts[1]) / 1000
+        return lambda: value
+    if kind == 'uniform':
+        low, high = float(parts[1]) / 1000, float(parts[2]) / 1000
+        return lambda: random.uniform(low, high)
+    if kind == 'lognormal':
+        mu, sigma = math.log(float(parts[1]) / 1000), float(parts[2])
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class EmulatorError(Exception):
+    """An AWS-style error response."""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+# ============================================================================
+# HTTP Handler
+# ============================================================================
+
+INVOKE_PATH = re.compile(r'^/model/(?P<model>[^/]+)/(?P<action>invoke|invoke-with-response-stream)$')
+RETRIEVE_PATH = re.compile(r'^/knowledgebases/(?P<kb>[^/]+)/retrieve$')
+
+
+class BedrockEmulatorHandler(BaseHTTPRequestHandler):
+    """Routes Bedrock REST calls to the emulated operations."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DocSmartBedrockEmulator/1.0'
+
+    # Set by run_server()
+    corpus: LocalCorpus = None
+    latencies: Dict[str, Callable[[], float]] = {}
+    throttle_rate = 0.0
+    error_rate = 0.0
+    stream_chunk_delay = 0.0
+    verbose = False
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        raw_body = self.rfile.read(length) if length else b''
+        path = unquote(self.path.split('?', 1)[0])
+
+        try:
+            body = json.loads(raw_body or b'{}')
+            invoke = INVOKE_PATH.match(path)
+            retrieve = RETRIEVE_PATH.match(path)
+
+            if invoke and invoke.group('action') == 'invoke':
+                self._inject_faults('invoke')
+                self._send_json(200, self._invoke_model(invoke.group('model'), body))
+            elif invoke:
+                self._inject_faults('invoke')
+                self._invoke_model_stream(invoke.group('model'), body)
+            elif retrieve:
+                self._inject_faults('retrieve')
+                self._send_json(200, self._retrieve(retrieve.group('kb'), body))
+            else:
+                raise EmulatorError(404, 'UnknownOperationException', f"Unsupported path: {path}")
+
+        except EmulatorError as e:
+            self._send_error(e)
+        except (ValueError, KeyError) as e:
+            self._send_error(EmulatorError(400, 'ValidationException', str(e)))
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def _invoke_model(self, model_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if 'embed' in model_id:
+            if not body.get('inputText'):
+                raise EmulatorError(400, 'ValidationException', "inputText is required")
+            dimensions = int(body.get('dimensions', EMBEDDING_DIMENSIONS))
+            if dimensions not in (256, 512, 1024):
+                raise EmulatorError(400, 'ValidationException', "dimensions must be 256, 512 or 1024")
+            return {
+                'embedding': hash_embedding(body['inputText'], dimensions, body.get('normalize', True)),
+                'inputTextTokenCount': estimate_tokens(body['inputText'])
+            }
+
+        if 'anthropic' in model_id:
+            answer, input_tokens = canned_claude_answer(body)
+            return {
+                'id': f"msg_emulator_{hashlib.md5(answer.encode()).hexdigest()[:16]}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': model_id,
+                'content': [{'type': 'text', 'text': answer}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': {'input_tokens': input_tokens, 'output_tokens': estimate_tokens(answer)}
+            }
+
+        raise EmulatorError(400, 'ValidationException', f"Model not supported by the emulator: {model_id}")
+
+    def _invoke_model_stream(self, model_id: str, body: Dict[str, Any]) -> None:
+        if 'anthropic' not in model_id:
+            raise EmulatorError(400, 'ValidationException', "Streaming is only emulated for Claude models")
+
+        answer, input_tokens = canned_claude_answer(body)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.amazon.eventstream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('x-amzn-bedrock-content-type', 'application/json')
+        self.end_headers()
+
+        for event in claude_stream_events(answer, model_id, input_tokens):
+            payload = json.dumps({
+                'bytes': base64.b64encode(json.dumps(event).encode('utf-8')).decode('ascii')
+            }).encode('utf-8')
+            self._write_chunk(encode_event(payload))
+            if self.stream_chunk_delay:
+                time.sleep(self.stream_chunk_delay)
+        self._write_chunk(b'')
+
+    def _retrieve(self, knowledge_base_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        query = body['retrievalQuery']['text']
+        config = body.get('retrievalConfiguration', {}).get('vectorSearchConfiguration', {})
+        top_k = int(config.get('numberOfResults', 5))
+        if not 1 <= top_k <= 100:
+            raise EmulatorError(400, 'ValidationException', "numberOfResults must be between 1 and 100")
+        return {'retrievalResults': self.corpus.search(query, top_k)}
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _inject_faults(self, operation: str) -> None:
+        latency = self.latencies.get(operation)
+        if latency:
+            time.sleep(latency())
+        if random.random() < self.throttle_rate:
+            raise EmulatorError(429, 'ThrottlingException', "Too many requests, please wait before trying again.")
+        if random.random() < self.error_rate:
+            raise EmulatorError(500, 'InternalServerException', "Injected emulator failure.")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, error: EmulatorError) -> None:
+        data = json.dumps({'message': error.message, '__type': error.code}).encode('utf-8')
+        self.send_response(error.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('x-amzn-ErrorType', error.code)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.verbose:
+            super().log_message(format, *args)
+
+# ============================================================================
+# Main Execution
+# ============================================================================
+
+def run_server(args: argparse.Namespace) -> None:
+    """Configure the handler and serve until interrupted."""
+    BedrockEmulatorHandler.corpus = LocalCorpus(args.docs)
+    BedrockEmulatorHandler.latencies = {
+        'invoke': parse_latency(args.invoke_latency),
+        'retrieve': parse_latency(args.retrieve_latency)
+    }
+    BedrockEmulatorHandler.throttle_rate = args.throttle_rate
+    BedrockEmulatorHandler.error_rate = args.error_rate
+    BedrockEmulatorHandler.stream_chunk_delay = args.stream_chunk_delay_ms / 1000
+    BedrockEmulatorHandler.verbose = args.verbose
+
+    server = ThreadingHTTPServer((args.host, args.port), BedrockEmulatorHandler)
+    server.daemon_threads = True
+
+    print(f"✓ Bedrock emulator listening on http://{args.host}:{args.port}")
+    print(f"  Invoke latency: {args.invoke_latency} | Retrieve latency: {args.retrieve_latency}")
+    print(f"  Throttle rate: {args.throttle_rate:.1%} | Error rate: {args.error_rate:.1%}")
+    print(f"\n  export BEDROCK_ENDPOINT_URL=http://{args.host}:{args.port}\n")
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Bedrock emulator for offline load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--docs', default='sample_docs', help="Folder indexed for Retrieve")
+    parser.add_argument('--invoke-latency', default='0', help="e.g. lognormal:800:0.3")
+    parser.add_argument('--retrieve-latency', default='0', help="e.g. lognormal:60:0.4")
+    parser.add_argument('--stream-chunk-delay-ms', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls answered with 500")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    run_server(args)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n✓ Emulator stopped.")
+        sys.exit(0)
@@ -0,0 +1,335 @@
+"""
+Query Log Replay Load Generator for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This script replays a production query log against a build of the system,
+open-loop: requests are fired at their scheduled arrival time whether or not
+earlier requests have finished, so queueing delay shows up in the latency
+numbers instead of silently slowing the generator down.
+
+Input log: JSON Lines (or CSV with a header) with the fields written by
+log_query. Only query_text is required:
+    {"query_text": "...", "timestamp": "2024-05-02T10:15:03", "session_id": "abc",
+     "response_time_ms": 1840}
+
+Targets:
+    pipeline  Call bedrock_utils.rag_pipeline in-process (combine with
+              scripts/bedrock_emulator.py for offline runs)
+    http      POST {"query": ..., "session_id": ...} to --url
+
+Usage:
+    python scripts/replay_queries.py queries.jsonl --speeds 1 2 4 8
+    python scripts/replay_queries.py queries.jsonl --rate 20 --duration 60 --sessions 200
+    python scripts/replay_queries.py queries.jsonl --target http --url http://localhost:8000/query
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# ============================================================================
+# Log Loading
+# ============================================================================
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Accept epoch seconds/milliseconds or ISO-8601 strings."""
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+        return number / 1000 if number > 1e11 else number
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def load_query_log(path: str) -> List[Dict[str, Any]]:
+    """
+    Load query records sorted by timestamp.
+
+    Returns:
+        List of dicts with 'query_text', 'timestamp' (float or None),
+        'session_id' and 'recorded_ms'
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        if Path(path).suffix.lower() == '.csv':
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for row in rows:
+        query_text = row.get('query_text') or row.get('query')
+        if not query_text:
+            continue
+        records.append({
+            'query_text': query_text,
+            'timestamp': parse_timestamp(row.get('timestamp') or row.get('created_at')),
+            'session_id': row.get('session_id'),
+            'recorded_ms': float(row['response_time_ms']) if row.get('response_time_ms') else None
+        })
+
+    if records and all(r['timestamp'] is not None for r in records):
+        records.sort(key=lambda r: r['timestamp'])
+    return records
+
+# ============================================================================
+# Arrival Schedules
+# ============================================================================
+
+def recorded_schedule(records: List[Dict[str, Any]], speed: float, duration: Optional[float]) -> List[float]:
+    """Offsets (seconds) preserving the recorded inter-arrival gaps, scaled by `speed`."""
+    missing = sum(1 for r in records if r['timestamp'] is None)
+    if not records or missing == len(records):
+        raise ValueError("Log has no timestamps; use --rate for a synthetic arrival rate")
+    if missing:
+        # Without them the log is not in arrival order and the gaps are unknown
+        raise ValueError(f"{missing} of {len(records)} records have no timestamp; "
+                         "fix the log or use --rate for a synthetic arrival rate")
+
+    start = records[0]['timestamp']
+    offsets = [(r['timestamp'] - start) / speed for r in records]
+    if duration:
+        offsets = [o for o in offsets if o <= duration]
+    return offsets
+
+
+def poisson_schedule(rate: float, duration: float) -> List[float]:
+    """Offsets for a Poisson arrival process at `rate` requests per second."""
+    offsets, t = [], 0.0
+    while True:
+        t += random.expovariate(rate)
+        if t > duration:
+            return offsets
+        offsets.append(t)
+
+# ============================================================================
+# Targets
+# ============================================================================
+
+def pipeline_target() -> Callable[[str, str], None]:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bedrock_utils import rag_pipeline
+
+    def call(query: str, session_id: str) -> None:
+        result = rag_pipeline(query)
+        generation = result.get('generation') or {}
+        if 'error' in generation or 'error' in (result.get('retrieval') or {}):
+            raise RuntimeError(generation.get('error') or result['retrieval']['error'])
+
+    return call
+
+
+def http_target(url: str, timeout: float) -> Callable[[str, str], None]:
+    def call(query: str, session_id: str) -> None:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'query': query, 'session_id': session_id}).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'X-Session-Id': session_id},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    return call
+
+# ============================================================================
+# Open-Loop Runner
+# ============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    offsets: List[float],
+    target: Callable[[str, str], None],
+    sessions: int,
+    max_in_flight: int
+) -> Dict[str, Any]:
+    """
+    Fire one request per offset and collect latencies.
+
+    Latency is measured from the scheduled send time, so time spent waiting
+    for a free worker counts against the system under test.
+    """
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    in_flight = threading.Semaphore(max_in_flight)
+    dropped = 0
+
+    # Simulated sessions: keep the recorded session id when there is one,
+    # otherwise spread requests across `sessions` synthetic sessions.
+    def session_for(i: int, record: Dict[str, Any]) -> str:
+        return record.get('session_id') or f"replay-session-{i % sessions}"
+
+    def execute(scheduled_at: float, query: str, session_id: str) -> None:
+        error = None
+        try:
+            target(query, session_id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            in_flight.release()
+        finished = time.perf_counter()
+        with lock:
+            results.append({
+                'scheduled_at': scheduled_at,
+                'latency_s': finished - scheduled_at,
+                'error': error
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i, offset in enumerate(offsets):
+            record = records[i % len(records)]
+            scheduled_at = start + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not in_flight.acquire(blocking=False):
+                # The system is saturated beyond max_in_flight: count it, do not wait
+                dropped += 1
+                continue
+            executor.submit(execute, scheduled_at, record['query_text'], session_for(i, record))
+    wall_time = time.perf_counter() - start
+
+    latencies = sorted(r['latency_s'] for r in results if not r['error'])
+    errors = [r['error'] for r in results if r['error']]
+    span = offsets[-1] if offsets else 0.0
+
+    error_types: Dict[str, int] = {}
+    for error in errors:
+        key = error.split(':', 1)[0]
+        error_types[key] = error_types.get(key, 0) + 1
+
+    return {
+        'offered': len(offsets),
+        'completed': len(latencies),
+        'errors': len(errors),
+        'dropped': dropped,
+        'error_types': error_types,
+        'offered_rps': round(len(offsets) / span, 3) if span else None,
+        'achieved_rps': round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        'wall_time_s': round(wall_time, 3),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p90': round(percentile(latencies, 90) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0
+        }
+    }
+
+
+def is_saturated(run: Dict[str, Any], slo_p99_ms: float) -> bool:
+    """A run is saturated when it misses the p99 SLO, sheds load or keeps up with < 90% of offered load."""
+    if run['dropped'] or run['latency_ms']['p99'] > slo_p99_ms:
+        return True
+    if run['offered_rps'] and run['achieved_rps'] < 0.9 * run['offered_rps']:
+        return True
+    return False
+
+# ============================================================================
+# Main Execution
+# ============================================================================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a query log against DocSmart (open-loop)")
+    parser.add_argument('log_file', help="JSONL or CSV query log")
+    parser.add_argument('--target', choices=['pipeline', 'http'], default='pipeline')
+    parser.add_argument('--url', help="Endpoint for --target http")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--speeds', nargs='+', type=float, default=[1.0],
+                        help="Replay speed multipliers for recorded arrivals (1 = real time)")
+    parser.add_argument('--rate', type=float, nargs='+',
+                        help="Synthetic Poisson arrival rates (req/s) instead of recorded timestamps")
+    parser.add_argument('--duration', type=float, help="Seconds of traffic per run")
+    parser.add_argument('--sessions', type=int, default=50, help="Synthetic sessions when the log has none")
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--slo-p99-ms', type=float, default=3000.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='replay_report.json')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    records = load_query_log(args.log_file)
+    if not records:
+        print(f"✗ No queries found in {args.log_file}")
+        sys.exit(1)
+
+    if args.target == 'http':
+        if not args.url:
+            parser.error("--url is required with --target http")
+        target = http_target(args.url, args.timeout)
+    else:
+        target = pipeline_target()
+
+    print("=" * 70)
+    print("DocSmart Query Log Replay")
+    print("=" * 70)
+    print(f"  Log: {args.log_file} ({len(records)} queries)")
+    print(f"  Target: {args.url if args.target == 'http' else 'bedrock_utils.rag_pipeline'}")
+    print(f"  p99 SLO: {args.slo_p99_ms:.0f} ms\n")
+
+    if args.rate:
+        plans = [(f"rate={rate}", poisson_schedule(rate, args.duration or 60.0)) for rate in args.rate]
+    else:
+        try:
+            plans = [(f"speed={speed}x", recorded_schedule(records, speed, args.duration))
+                     for speed in args.speeds]
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+    report = {'log_file': args.log_file, 'target': args.target, 'runs': [], 'saturation_point': None}
+    for label, offsets in plans:
+        run = replay(records, offsets, target, args.sessions, args.max_in_flight)
+        run['label'] = label
+        run['saturated'] = is_saturated(run, args.slo_p99_ms)
+        report['runs'].append(run)
+
+        status = "✗ saturated" if run['saturated'] else "✓"
+        print(f"{label:<14} offered {run['offered_rps'] or 0:>8.2f} req/s   achieved {run['achieved_rps']:>8.2f} req/s   "
+              f"p50 {run['latency_ms']['p50']:>8.1f} ms   p99 {run['latency_ms']['p99']:>8.1f} ms   "
+              f"errors {run['errors']}   dropped {run['dropped']}   {status}")
+
+        if run['saturated'] and report['saturation_point'] is None:
+            report['saturation_point'] = {'label': label, 'offered_rps': run['offered_rps']}
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    if report['saturation_point']:
+        print(f"⚠ Saturation reached at {report['saturation_point']['label']} "
+              f"(~{report['saturation_point']['offered_rps']} req/s offered)")
+    else:
+        print("✓ No saturation observed at the tested load levels")
+    print(f"✓ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n✗ Replay interrupted by user.")
+        sys.exit(1)
@@ -9,6 +9,11 @@ PDF, DOCX, TXT, and other formats supported by Bedrock Knowledge Base.
 Usage:
     python scripts/upload_to_s3.py
 
+Uploads are incremental: a manifest (.s3_upload_manifest.db) remembers the
+size, mtime and content hash of every uploaded file. Unchanged files are
+skipped and objects whose local file was removed are deleted from S3, so
+the Knowledge Base sync only sees real changes.
+
 Configuration:
     Update the BUCKET_NAME variable with your S3 bucket name from Stack 1 output.
     Optionally, modify PREFIX to upload to a specific folder in S3.
@@ -21,6 +26,9 @@ from pathlib import Path
 from botocore.exceptions import ClientError, NoCredentialsError
 import mimetypes
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from document_manifest import DocumentManifest, file_fingerprint
+
 # ============================================================================
 # Configuration
 # ============================================================================
@@ -43,6 +51,9 @@ SUPPORTED_EXTENSIONS = {
 # AWS Region
 AWS_REGION = "us-east-1"
 
+# Record of uploaded files (keyed by S3 key) used to skip unchanged files
+MANIFEST_PATH = ".s3_upload_manifest.db"
+
 # ============================================================================
 # Initialize AWS Clients
 # ============================================================================
@@ -168,14 +179,36 @@ def upload_file_to_s3(s3_client, local_path, s3_key):
         print(f"    ERROR: {e}")
         return False
 
-def upload_directory(s3_client, local_dir, prefix=""):
+def delete_removed_objects(s3_client, manifest, current_keys):
+    """
+    Delete S3 objects that were uploaded earlier but whose local file is gone.
+
+    Only keys recorded in the manifest are considered, so objects uploaded
+    by other means are never touched.
+
+    Returns:
+        Number of objects deleted
+    """
+    deleted = 0
+    for s3_key in manifest.missing_paths(current_keys):
+        try:
+            s3_client.delete_object(Bucket=BUCKET_NAME, Key=s3_key)
+            manifest.remove(s3_key)
+            print(f"  Deleted removed file: {s3_key} ✓")
+            deleted += 1
+        except ClientError as e:
+            print(f"  ✗ ERROR deleting {s3_key}: {e}")
+    return deleted
+
+def upload_directory(s3_client, local_dir, prefix="", manifest=None):
     """
-    Upload all supported files from a directory to S3.
+    Upload new and changed supported files from a directory to S3.
     
     Args:
         s3_client: boto3 S3 client
         local_dir: Local directory path
         prefix: S3 key prefix (folder path)
+        manifest: DocumentManifest of previous uploads (None uploads everything)
     """
     print(f"\n{'='*70}")
     print(f"Starting upload from '{local_dir}' to s3://{BUCKET_NAME}/{prefix}")
@@ -189,11 +222,13 @@ def upload_directory(s3_client, local_dir, prefix=""):
         print(f"\nSupported extensions: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
         return
     
-    print(f"Found {len(files)} file(s) to upload.\n")
+    print(f"Found {len(files)} file(s).\n")
     
-    # Upload each file
+    # Upload each new or changed file
     success_count = 0
     fail_count = 0
+    skipped_count = 0
+    current_keys = []
     
     for local_path, relative_path in files:
         # Construct S3 key maintaining folder structure
@@ -204,16 +239,41 @@ def upload_directory(s3_client, local_dir, prefix=""):
         
         # Replace backslashes with forward slashes for S3
         s3_key = s3_key.replace('\\', '/')
+        current_keys.append(s3_key)
+        
+        fingerprint = None
+        if manifest is not None:
+            # Compare against the last upload of this key
+            entry = manifest.get(s3_key)
+            if entry is not None:
+                stat = os.stat(local_path)
+                if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+                    skipped_count += 1
+                    continue
+            fingerprint = file_fingerprint(local_path)
+            if entry is not None and fingerprint['content_hash'] == entry['content_hash']:
+                manifest.record(s3_key, fingerprint, [])
+                skipped_count += 1
+                continue
         
         if upload_file_to_s3(s3_client, local_path, s3_key):
             success_count += 1
+            if manifest is not None:
+                manifest.record(s3_key, fingerprint, [])
         else:
             fail_count += 1
     
+    deleted_count = 0
+    if manifest is not None:
+        deleted_count = delete_removed_objects(s3_client, manifest, current_keys)
+    
     # Print summary
     print(f"\n{'='*70}")
     print(f"Upload Summary:")
-    print(f"  ✓ Successful: {success_count}")
+    print(f"  ✓ Uploaded: {success_count}")
+    print(f"  = Unchanged (skipped): {skipped_count}")
+    if deleted_count > 0:
+        print(f"  - Deleted from S3: {deleted_count}")
     if fail_count > 0:
         print(f"  ✗ Failed: {fail_count}")
     print(f"  Total files: {len(files)}")
@@ -281,8 +341,12 @@ def main():
     # Initialize S3 client
     s3_client = initialize_s3_client()
     
-    # Upload files
-    upload_directory(s3_client, LOCAL_DIR, PREFIX)
+    # Upload new and changed files
+    manifest = DocumentManifest(MANIFEST_PATH)
+    try:
+        upload_directory(s3_client, LOCAL_DIR, PREFIX, manifest)
+    finally:
+        manifest.close()
     
     # Verify uploads
     verify_uploads(s3_client, PREFIX)
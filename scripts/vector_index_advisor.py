@@ -0,0 +1,374 @@
+"""
+Vector Index Advisor for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+Chooses and (re)builds the ANN index on bedrock_kb.embedding for the
+current corpus size and a recall/latency target.
+
+aurora_init.sql used to build ivfflat with lists = 100 on an empty table:
+ivfflat learns its list centroids from the rows present at build time, so
+that index clusters nothing, and a fixed list count is wrong for any real
+corpus size. This tool:
+- Reads the row count, the pgvector version and the current index
+- Recommends HNSW (m / ef_construction by recall target) or ivfflat
+  (lists = rows / 1000 up to 1M rows, sqrt(rows) above), plus the query
+  setting (hnsw.ef_search / ivfflat.probes) that meets the target. With a
+  --latency-ms budget, ivfflat is chosen when its estimated scan time fits
+  (a smaller index that builds much faster than the HNSW graph), HNSW
+  otherwise
+- With --apply, builds the new index with CREATE INDEX CONCURRENTLY under a
+  temporary name, then drops the old one concurrently and renames, so
+  searches keep running throughout
+- With --watch SECONDS, repeats the check (e.g. ivfflat needs more lists
+  as the table grows)
+
+The chosen settings are stored as JSON in the index comment; later runs use
+them to decide whether a rebuild is due, and the search path reads the
+query setting from there. When only the query setting changes (e.g. a new
+--recall that the built index already supports), --apply rewrites the
+comment without rebuilding.
+
+Usage:
+    python scripts/vector_index_advisor.py
+    python scripts/vector_index_advisor.py --recall 0.98 --latency-ms 20 --apply
+    python scripts/vector_index_advisor.py --prefer ivfflat --apply --watch 3600
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_database import KB_TABLE, VectorDatabase
+
+INDEX_NAME = "bedrock_kb_embedding_idx"
+INDEX_SCHEMA = "bedrock_integration"
+BUILD_SUFFIX = "_new"
+DIMENSIONS = 1024
+
+# Recall target -> HNSW build parameters and ef_search, ivfflat probe factor
+HNSW_TIERS = [
+    # (max recall, m, ef_construction, ef_search)
+    (0.90, 12, 64, 40),
+    (0.95, 16, 64, 64),
+    (0.98, 24, 128, 128),
+    (1.00, 32, 200, 200),
+]
+IVFFLAT_PROBE_FACTOR = [
+    # (max recall, probes = factor * sqrt(lists))
+    (0.90, 1.0),
+    (0.95, 2.0),
+    (0.98, 4.0),
+    (1.00, 8.0),
+]
+
+# ivfflat needs enough rows per list to train meaningful centroids
+IVFFLAT_MIN_ROWS = 10_000
+
+# Rebuild ivfflat when lists is off by more than this factor
+LISTS_TOLERANCE = 2.0
+
+# Rough per-query cost model for the latency budget (1024-dim float4,
+# warm cache); compare with VectorDatabase.search_tuning_statistics()
+IVFFLAT_US_PER_VECTOR = 1.0    # sequential distance computation in a probed list
+HNSW_US_PER_VISIT = 5.0        # random graph access + distance per neighbor visited
+
+# ============================================================================
+# Recommendation
+# ============================================================================
+
+def _tier(table, recall: float):
+    for row in table:
+        if recall <= row[0]:
+            return row
+    return table[-1]
+
+
+def _hnsw(rows: int, recall: float) -> Dict[str, Any]:
+    _, m, ef_construction, ef_search = _tier(HNSW_TIERS, recall)
+    return {'method': "hnsw", 'params': {'m': m, 'ef_construction': ef_construction},
+            'query': {'hnsw.ef_search': ef_search},
+            'estimated_ms': ef_search * m * HNSW_US_PER_VISIT / 1000}
+
+
+def _ivfflat(rows: int, recall: float) -> Dict[str, Any]:
+    lists = max(1, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))
+    _, factor = _tier(IVFFLAT_PROBE_FACTOR, recall)
+    probes = min(lists, max(1, math.ceil(factor * math.sqrt(lists))))
+    # Every centroid plus the rows of the probed lists
+    scanned = lists + probes * rows / lists
+    return {'method': "ivfflat", 'params': {'lists': lists}, 'query': {'ivfflat.probes': probes},
+            'estimated_ms': scanned * IVFFLAT_US_PER_VECTOR / 1000}
+
+
+def recommend(rows: int, recall: float = 0.95, latency_ms: Optional[float] = None,
+              hnsw_available: bool = True, prefer: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Index method and parameters for a corpus size and target.
+
+    Without a latency budget HNSW is recommended whenever it is available.
+    With one, ivfflat is recommended if its estimated query time at the
+    recall target fits the budget, since it is far smaller and faster to
+    build; HNSW is recommended when only its graph search fits.
+
+    Args:
+        rows (int): Rows in bedrock_kb
+        recall (float): Target recall@k of the approximate search
+        latency_ms (float): Per-query latency budget, if any
+        hnsw_available (bool): pgvector >= 0.5.0
+        prefer (str): Force "hnsw" or "ivfflat"
+
+    Returns:
+        Dict with 'method', 'params' (index WITH options), 'query'
+        ({'hnsw.ef_search': n} or {'ivfflat.probes': n}), 'estimated_ms',
+        'rows', 'recall' and 'reason'
+    """
+    if prefer == "hnsw" and not hnsw_available:
+        raise ValueError("HNSW requires pgvector 0.5.0 or later")
+
+    hnsw, ivfflat = _hnsw(rows, recall), _ivfflat(rows, recall)
+    if prefer:
+        target, reason = (hnsw if prefer == "hnsw" else ivfflat), f"{prefer} requested"
+    elif not hnsw_available:
+        target, reason = ivfflat, "pgvector < 0.5.0 has no HNSW"
+    elif rows < IVFFLAT_MIN_ROWS:
+        target, reason = hnsw, f"{rows:,} rows are too few to train ivfflat lists"
+    elif latency_ms is None:
+        target, reason = hnsw, f"best recall/latency trade-off at recall {recall:g}"
+    elif ivfflat['estimated_ms'] <= latency_ms:
+        target = ivfflat
+        reason = (f"ivfflat (~{ivfflat['estimated_ms']:.1f} ms) fits the {latency_ms:g} ms budget "
+                  f"at recall {recall:g}; smaller and faster to build than HNSW")
+    elif hnsw['estimated_ms'] <= latency_ms:
+        target = hnsw
+        reason = (f"{latency_ms:g} ms budget needs HNSW's graph search "
+                  f"(~{hnsw['estimated_ms']:.1f} ms; ivfflat ~{ivfflat['estimated_ms']:.1f} ms)")
+    else:
+        target = hnsw
+        reason = (f"no index meets the {latency_ms:g} ms budget at recall {recall:g}; "
+                  f"HNSW is the fastest (~{hnsw['estimated_ms']:.1f} ms)")
+
+    return dict(target, rows=rows, recall=recall, reason=reason)
+
+
+def needs_rebuild(current: Optional[Dict[str, Any]], target: Dict[str, Any]) -> Optional[str]:
+    """Reason the current index should be replaced, or None to keep it."""
+    if current is None:
+        return "no vector index"
+    if not current['valid']:
+        return "index is invalid (failed concurrent build)"
+    if current['method'] != target['method']:
+        return f"{current['method']} -> {target['method']}"
+    options = current['options']
+    if target['method'] == "ivfflat":
+        lists, wanted = options.get('lists', 100), target['params']['lists']
+        built_rows = (current.get('advisor') or {}).get('rows')
+        if max(lists, wanted) / max(1, min(lists, wanted)) > LISTS_TOLERANCE:
+            return f"lists {lists} -> {wanted} for {target['rows']:,} rows"
+        if built_rows is not None and target['rows'] > LISTS_TOLERANCE * max(built_rows, 1):
+            return f"table grew from {built_rows:,} to {target['rows']:,} rows since the centroids were trained"
+        return None
+    for key, default in (('m', 16), ('ef_construction', 64)):
+        if options.get(key, default) < target['params'][key]:
+            return f"{key} {options.get(key, default)} -> {target['params'][key]} for recall {target['recall']:g}"
+    return None
+
+# ============================================================================
+# Database Inspection
+# ============================================================================
+
+def connect() -> Any:
+    """Dedicated autocommit connection (CREATE INDEX CONCURRENTLY cannot run in a transaction)."""
+    conn = psycopg2.connect(**VectorDatabase().dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        # Index builds outlast the pool's statement_timeout
+        cur.execute("SET statement_timeout = 0")
+    return conn
+
+
+def row_count(cur: Any) -> int:
+    cur.execute(f"SELECT reltuples::BIGINT FROM pg_class WHERE oid = '{KB_TABLE}'::regclass")
+    estimate = cur.fetchone()[0]
+    if estimate is None or estimate < 0:
+        # Never analyzed
+        cur.execute(f"SELECT COUNT(*) FROM {KB_TABLE}")
+        return cur.fetchone()[0]
+    return estimate
+
+
+def hnsw_available(cur: Any) -> bool:
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    row = cur.fetchone()
+    if row is None:
+        raise RuntimeError("pgvector extension is not installed")
+    major, minor = (int(part) for part in row[0].split('.')[:2])
+    return (major, minor) >= (0, 5)
+
+
+def vector_indexes(cur: Any) -> Dict[str, Dict[str, Any]]:
+    """ANN indexes on bedrock_kb by name."""
+    cur.execute(f"""
+        SELECT c.relname, am.amname, COALESCE(c.reloptions, '{{}}'), i.indisvalid,
+               pg_relation_size(c.oid), obj_description(c.oid, 'pg_class')
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        WHERE i.indrelid = '{KB_TABLE}'::regclass AND am.amname IN ('ivfflat', 'hnsw')
+    """)
+    indexes = {}
+    for name, method, reloptions, valid, size, comment in cur.fetchall():
+        options = {}
+        for option in reloptions:
+            key, _, value = option.partition('=')
+            options[key] = int(value) if value.isdigit() else value
+        try:
+            advisor = json.loads(comment).get('advisor') if comment else None
+        except ValueError:
+            advisor = None
+        indexes[name] = {'name': name, 'method': method, 'options': options, 'valid': valid,
+                         'size_bytes': size, 'advisor': advisor}
+    return indexes
+
+# ============================================================================
+# Migration
+# ============================================================================
+
+def build_index(cur: Any, target: Dict[str, Any], maintenance_work_mem: str) -> float:
+    """
+    Build the target index next to the current one and swap it in.
+
+    Returns:
+        Build time in seconds
+    """
+    new_name = INDEX_NAME + BUILD_SUFFIX
+    # Leftover from an interrupted run
+    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_SCHEMA}.{new_name}")
+
+    with_clause = ", ".join(f"{key} = {value}" for key, value in target['params'].items())
+    cur.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+    print(f"  Building {target['method']} ({with_clause}) concurrently...")
+    start = time.time()
+    cur.execute(
+        f"CREATE INDEX CONCURRENTLY {new_name} ON {KB_TABLE} "
+        f"USING {target['method']} (embedding vector_cosine_ops) WITH ({with_clause})"
+    )
+    elapsed = time.time() - start
+
+    cur.execute(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE c.relname = %s AND n.nspname = %s",
+        (new_name, INDEX_SCHEMA)
+    )
+    if not cur.fetchone()[0]:
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_SCHEMA}.{new_name}")
+        raise RuntimeError("Concurrent index build left an invalid index; it was dropped")
+
+    # Both indexes exist until the old one is gone; the rename is a brief lock
+    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_SCHEMA}.{INDEX_NAME}")
+    cur.execute(f"ALTER INDEX {INDEX_SCHEMA}.{new_name} RENAME TO {INDEX_NAME}")
+    write_comment(cur, {
+        'rows': target['rows'], 'recall': target['recall'], 'query': target['query'],
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    })
+    return elapsed
+
+
+def write_comment(cur: Any, advisor: Dict[str, Any]) -> None:
+    """Store the advisor settings in the index comment (read by the search path)."""
+    cur.execute(f"COMMENT ON INDEX {INDEX_SCHEMA}.{INDEX_NAME} IS %s",
+                (json.dumps({'advisor': advisor}),))
+
+
+def stale_comment(current: Dict[str, Any], target: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Updated advisor settings for an index that is kept, or None if its
+    comment already matches the target.
+
+    'rows' and 'built_at' describe the build (ivfflat's centroids) and are
+    kept; only the recall target and query setting are replaced.
+    """
+    advisor = dict(current.get('advisor') or {})
+    if advisor.get('recall') == target['recall'] and advisor.get('query') == target['query']:
+        return None
+    advisor.update(recall=target['recall'], query=target['query'])
+    return advisor
+
+
+def check(args: argparse.Namespace) -> None:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            rows = row_count(cur)
+            target = recommend(rows, args.recall, args.latency_ms, hnsw_available(cur), args.prefer)
+            indexes = vector_indexes(cur)
+            current = indexes.get(INDEX_NAME)
+            reason = needs_rebuild(current, target)
+
+            print(f"\nbedrock_kb: ~{rows:,} rows")
+            if current:
+                print(f"  Current: {current['method']} {current['options']} "
+                      f"({current['size_bytes'] / 1024 / 1024:.1f} MB{'' if current['valid'] else ', INVALID'})")
+            else:
+                print("  Current: no vector index (sequential scans)")
+            print(f"  Recommended: {target['method']} {target['params']}, query {target['query']} "
+                  f"(~{target['estimated_ms']:.1f} ms estimated)")
+            print(f"  Why: {target['reason']}")
+            for name in indexes:
+                if name not in (INDEX_NAME, INDEX_NAME + BUILD_SUFFIX):
+                    print(f"  ⚠ Extra vector index {name} (slows writes; drop it if unused)")
+
+            if reason is None:
+                print("✓ Current index matches the recommendation")
+                advisor = stale_comment(current, target)
+                if advisor is None:
+                    return
+                print(f"→ Query setting: {(current.get('advisor') or {}).get('query')} -> {target['query']}")
+                if not args.apply:
+                    print("  (run with --apply to record it)")
+                    return
+                write_comment(cur, advisor)
+                print(f"✓ {INDEX_NAME} comment updated (no rebuild)")
+                return
+            print(f"→ Rebuild: {reason}")
+            if not args.apply:
+                print("  (run with --apply to build it)")
+                return
+            elapsed = build_index(cur, target, args.maintenance_work_mem)
+            print(f"✓ {INDEX_NAME} rebuilt in {elapsed:.1f}s")
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recommend and build the bedrock_kb vector index")
+    parser.add_argument('--recall', type=float, default=0.95, help="Target recall (default 0.95)")
+    parser.add_argument('--latency-ms', type=float, help="Per-query latency budget")
+    parser.add_argument('--prefer', choices=['hnsw', 'ivfflat'], help="Force the index method")
+    parser.add_argument('--apply', action='store_true', help="Build the recommended index")
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help="Re-check periodically")
+    parser.add_argument('--maintenance-work-mem', default='1GB',
+                        help="maintenance_work_mem for the build (HNSW builds fastest when the graph fits)")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            check(args)
+        except Exception as e:
+            print(f"✗ Index check failed: {e}")
+            if not args.watch:
+                sys.exit(1)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
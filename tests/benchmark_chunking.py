@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Chunking throughput benchmark for DocSmart.
+
+Measures MB/s of the character chunker (chunk_text / StreamingChunker) and
+the token chunker (token_spans / TokenChunker) on synthetic Spanish policy
+text or on real files, and reports the token count distribution of the
+chunks each one produces.
+
+Usage:
+    python tests/benchmark_chunking.py
+    python tests/benchmark_chunking.py --size-mb 20 --repeat 3
+    python tests/benchmark_chunking.py --input spec-sheets/*.txt --output chunk_bench.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processor import SEGMENT_CHARS, StreamingChunker, chunk_text, clean_text
+from token_chunker import TokenChunker, get_encoding, token_spans
+
+SENTENCES = [
+    "Los empleados tienen derecho a veinte días hábiles de vacaciones por año.",
+    "Las solicitudes deben enviarse con al menos dos semanas de anticipación.",
+    "El reembolso de gastos de viaje requiere la factura original y la aprobación del gerente.",
+    "La política de trabajo remoto permite hasta tres días por semana fuera de la oficina.",
+    "Cualquier excepción debe ser aprobada por el departamento de Recursos Humanos.",
+    "El incumplimiento de esta norma puede dar lugar a medidas disciplinarias.",
+    "Para más información, consulte la sección 4.2 del manual del empleado.",
+]
+
+
+def synthetic_text(size_mb: float, seed: int) -> str:
+    """Paragraphs of random policy sentences totalling about `size_mb` MB."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        paragraph = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 8)))
+        paragraphs.append(paragraph)
+        size += len(paragraph.encode('utf-8')) + 2
+    return "\n\n".join(paragraphs)
+
+
+def segments_of(text: str) -> List[str]:
+    """Split text into SEGMENT_CHARS-sized pieces at paragraph breaks (like iter_segments)."""
+    segments = []
+    start = 0
+    while start < len(text):
+        end = text.find("\n\n", start + SEGMENT_CHARS)
+        end = len(text) if end == -1 else end
+        segments.append(text[start:end])
+        start = end + 2
+    return segments
+
+
+def run_streaming(chunker: Any, segments: List[str]) -> List[str]:
+    chunks = []
+    for segment in segments:
+        chunks.extend(chunk['text'] for chunk in chunker.add(segment))
+    chunks.extend(chunk['text'] for chunk in chunker.finish())
+    return chunks
+
+
+def measure(name: str, fn: Callable[[], List[str]], size_bytes: int, repeat: int,
+            encoding: Any) -> Dict[str, Any]:
+    timings = []
+    chunks: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn()
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    result = {
+        'name': name,
+        'seconds': best,
+        'mb_per_s': size_bytes / (1024 * 1024) / best,
+        'chunks': len(chunks)
+    }
+    if encoding is not None and chunks:
+        counts = [len(encoding.encode_ordinary(chunk)) for chunk in chunks]
+        result['tokens'] = {
+            'min': min(counts),
+            'mean': statistics.mean(counts),
+            'max': max(counts),
+            'stdev': statistics.pstdev(counts)
+        }
+    print(f"  {name:<28} {result['mb_per_s']:8.2f} MB/s  {len(chunks):>7} chunks", end='')
+    if 'tokens' in result:
+        t = result['tokens']
+        print(f"  tokens min/mean/max {t['min']}/{t['mean']:.0f}/{t['max']}", end='')
+    print()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chunking throughput benchmark")
+    parser.add_argument('--input', nargs='*', help="Text files to chunk (default: synthetic text)")
+    parser.add_argument('--size-mb', type=float, default=5.0, help="Synthetic text size")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=200)
+    parser.add_argument('--chunk-tokens', type=int, default=512)
+    parser.add_argument('--overlap-tokens', type=int, default=64)
+    parser.add_argument('--encoding', default='cl100k_base')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='chunk_bench.json')
+    args = parser.parse_args()
+
+    if args.input:
+        text = "\n\n".join(open(path, encoding='utf-8', errors='ignore').read() for path in args.input)
+    else:
+        text = synthetic_text(args.size_mb, args.seed)
+    text = clean_text(text)
+    segments = segments_of(text)
+    size_bytes = len(text.encode('utf-8'))
+
+    try:
+        encoding = get_encoding(args.encoding)
+    except Exception as e:
+        print(f"⚠ Token chunker skipped: could not load tiktoken encoding '{args.encoding}' ({e})")
+        encoding = None
+
+    print(f"\nChunking {size_bytes / (1024 * 1024):.1f} MB in {len(segments)} segments "
+          f"(best of {args.repeat})\n")
+
+    results = [
+        measure("chars: chunk_text", lambda: chunk_text(text, args.chunk_size, args.chunk_overlap),
+                size_bytes, args.repeat, encoding),
+        measure("chars: StreamingChunker",
+                lambda: run_streaming(StreamingChunker(args.chunk_size, args.chunk_overlap), segments),
+                size_bytes, args.repeat, encoding),
+    ]
+    if encoding is not None:
+        results.append(measure(
+            "tokens: token_spans",
+            lambda: [text[s:e].strip() for s, e in
+                     token_spans(text, args.chunk_tokens, args.overlap_tokens, encoding)],
+            size_bytes, args.repeat, encoding
+        ))
+        results.append(measure(
+            "tokens: TokenChunker",
+            lambda: run_streaming(TokenChunker(args.chunk_tokens, args.overlap_tokens, encoding), segments),
+            size_bytes, args.repeat, encoding
+        ))
+
+    with open(args.output, 'w') as f:
+        json.dump({'size_bytes': size_bytes, 'segments': len(segments), 'results': results}, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
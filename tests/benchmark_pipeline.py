@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the DocSmart RAG pipeline.
+
+Replaces the Bedrock clients in bedrock_utils with fake clients that sleep
+according to a configurable latency distribution, so the pipeline's own
+overhead (validation, result processing, context building, JSON handling)
+can be measured without AWS access.
+
+Usage:
+    python tests/benchmark_pipeline.py
+    python tests/benchmark_pipeline.py --concurrency 1 8 32 --requests 500 \\
+        --retrieve-latency lognormal:40:0.4 --invoke-latency lognormal:800:0.3
+    python tests/benchmark_pipeline.py --output bench.json --compare baseline.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The fake clients replace these before any call is made, but boto3 still
+# needs a region to build the real ones at import time.
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("KNOWLEDGE_BASE_ID", "BENCHKB0001")
+
+import bedrock_utils
+
+SAMPLE_QUERIES = [
+    "¿Cuántos días de vacaciones tengo si llevo 1 año?",
+    "¿Con cuánta anticipación debo solicitar mis vacaciones?",
+    "¿Puedo cobrar las vacaciones no tomadas?",
+    "¿Qué beneficios de salud ofrece la empresa?",
+    "¿Cuál es el horario de asistencia y qué pasa si llego tarde?",
+    "A mi cuánto me toca? Estoy hace 3 años y 6 meses",
+]
+
+# ============================================================================
+# Latency Distributions
+# ============================================================================
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Parse a latency spec into a sampler returning seconds.
+
+    Formats (values in milliseconds):
+        fixed:50            Always 50 ms
+        uniform:20:80       Uniform between 20 and 80 ms
+        lognormal:40:0.4    Log-normal with median 40 ms and sigma 0.4
+        0                   No latency
+    """
+    parts = spec.split(':')
+    kind = parts[0]
+
+    if kind in ('0', 'none'):
+        return lambda: 0.0
+    if kind == 'fixed':
+        value = float(parts[1]) / 1000
+        return lambda: value
+    if kind == 'uniform':
+        low, high = float(parts[1]) / 1000, float(parts[2]) / 1000
+        return lambda: random.uniform(low, high)
+    if kind == 'lognormal':
+        mu, sigma = math.log(float(parts[1]) / 1000), float(parts[2])
+        return lambda: random.lognormvariate(mu, sigma)
+
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+# ============================================================================
+# Fake Bedrock Clients
+# ============================================================================
+
+class FakeAgentRuntime:
+    """Stand-in for the bedrock-agent-runtime client (retrieve only)."""
+
+    def __init__(self, latency: Callable[[], float], results_per_query: int = 5):
+        self.latency = latency
+        self.results = [
+            {
+                'content': {'text': ("Política de vacaciones: los empleados con un año de "
+                                     "antigüedad tienen derecho a 15 días hábiles. ") * 6},
+                'score': 0.9 - i * 0.05,
+                'location': {
+                    'type': 'S3',
+                    's3Location': {'uri': f"s3://docsmart-bench/politica_{i}.txt"}
+                },
+                'metadata': {'x-amz-bedrock-kb-chunk-id': f"chunk-{i}"}
+            }
+            for i in range(results_per_query)
+        ]
+
+    def retrieve(self, **kwargs: Any) -> Dict[str, Any]:
+        time.sleep(self.latency())
+        count = kwargs['retrievalConfiguration']['vectorSearchConfiguration']['numberOfResults']
+        return {'retrievalResults': self.results[:count]}
+
+
+class FakeRuntime:
+    """Stand-in for the bedrock-runtime client (invoke_model only)."""
+
+    def __init__(self, latency: Callable[[], float]):
+        self.latency = latency
+        self.body = json.dumps({
+            'content': [{'type': 'text', 'text': "Según la política, te corresponden 15 días hábiles."}],
+            'usage': {'input_tokens': 850, 'output_tokens': 40}
+        }).encode('utf-8')
+
+    def invoke_model(self, **kwargs: Any) -> Dict[str, Any]:
+        time.sleep(self.latency())
+        return {'body': io.BytesIO(self.body)}
+
+
+def install_fake_clients(retrieve_latency: str, invoke_latency: str) -> None:
+    """Swap the module-level Bedrock clients used by bedrock_utils."""
+    bedrock_utils.bedrock_agent_runtime = FakeAgentRuntime(parse_latency(retrieve_latency))
+    bedrock_utils.bedrock_runtime = FakeRuntime(parse_latency(invoke_latency))
+
+# ============================================================================
+# Scenarios
+# ============================================================================
+
+def scenario_valid_prompt(i: int) -> None:
+    bedrock_utils.valid_prompt(SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)])
+
+
+_CONTEXT_DOCS = None
+
+
+def scenario_context_building(i: int) -> None:
+    """generate_response with a zero-latency model: prompt/context construction only."""
+    global _CONTEXT_DOCS
+    if _CONTEXT_DOCS is None:
+        _CONTEXT_DOCS = bedrock_utils.query_knowledge_base(SAMPLE_QUERIES[0])['results']
+    bedrock_utils.generate_response(SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)], _CONTEXT_DOCS)
+
+
+def scenario_rag_pipeline(i: int) -> None:
+    result = bedrock_utils.rag_pipeline(SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)])
+    if result['generation'] and 'error' in result['generation']:
+        raise RuntimeError(result['generation']['error'])
+
+
+SCENARIOS = {
+    'valid_prompt': scenario_valid_prompt,
+    'context_building': scenario_context_building,
+    'rag_pipeline': scenario_rag_pipeline,
+}
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure_allocations(func: Callable[[int], None], iterations: int) -> Dict[str, float]:
+    """Average peak traced memory per call, measured single-threaded."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            func(i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_alloc_kb_mean': round(statistics.mean(peaks) / 1024, 2),
+        'peak_alloc_kb_max': round(max(peaks) / 1024, 2)
+    }
+
+
+def run_scenario(func: Callable[[int], None], concurrency: int, total_requests: int) -> Dict[str, Any]:
+    """Run `total_requests` calls at a fixed concurrency (closed loop)."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker() -> None:
+        nonlocal errors
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                func(i)
+                failed = False
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    wall_time = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'errors': errors,
+        'wall_time_s': round(wall_time, 4),
+        'throughput_rps': round(total_requests / wall_time, 2) if wall_time else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p90': round(percentile(latencies, 90) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3)
+        }
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return 'unknown'
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], baseline_path: str) -> None:
+    """Print throughput and p99 deltas against a previous results file."""
+    print(f"\nComparison vs {baseline_path} ({baseline.get('commit', '?')} -> {current['commit']})")
+    print("-" * 70)
+    for name, runs in current['scenarios'].items():
+        old_runs = {r['concurrency']: r for r in baseline.get('scenarios', {}).get(name, {}).get('runs', [])}
+        for run in runs['runs']:
+            old = old_runs.get(run['concurrency'])
+            if not old:
+                continue
+            rps_delta = (run['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0
+            p99_delta = (run['latency_ms']['p99'] / old['latency_ms']['p99'] - 1) * 100 if old['latency_ms']['p99'] else 0
+            print(f"{name:<18} c={run['concurrency']:<4} throughput {rps_delta:+6.1f}%   p99 {p99_delta:+6.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline DocSmart pipeline benchmark")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument('--retrieve-latency', default='lognormal:40:0.4')
+    parser.add_argument('--invoke-latency', default='lognormal:200:0.3')
+    parser.add_argument('--alloc-iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    # Read the baseline first so --compare and --output may name the same file
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("=" * 70)
+    print("DocSmart Offline Pipeline Benchmark")
+    print("=" * 70)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'config': vars(args),
+        'scenarios': {}
+    }
+
+    for name in args.scenarios:
+        func = SCENARIOS[name]
+        # Context building measures our own overhead only
+        if name == 'context_building':
+            install_fake_clients('0', '0')
+        else:
+            install_fake_clients(args.retrieve_latency, args.invoke_latency)
+
+        scenario = {'allocations': measure_allocations(func, args.alloc_iterations), 'runs': []}
+        for concurrency in args.concurrency:
+            run = run_scenario(func, concurrency, args.requests)
+            scenario['runs'].append(run)
+            print(f"{name:<18} c={concurrency:<4} {run['throughput_rps']:>10.1f} req/s   "
+                  f"p50 {run['latency_ms']['p50']:>9.2f} ms   p99 {run['latency_ms']['p99']:>9.2f} ms   "
+                  f"errors {run['errors']}")
+        print(f"{'':<18} peak alloc/request: {scenario['allocations']['peak_alloc_kb_mean']} KB")
+        results['scenarios'][name] = scenario
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if baseline is not None:
+        compare(results, baseline, args.compare)
+
+
+if __name__ == "__main__":
+    main()
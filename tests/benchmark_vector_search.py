@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Vector search benchmark for the Aurora knowledge base.
+
+Compares the legacy search_similar_documents query (distance predicate in
+WHERE) with search_nearest_chunks (pure ORDER BY ... LIMIT index scan,
+threshold applied afterwards; scripts/aurora_search.sql):
+- EXPLAIN (FORMAT JSON) of both statements, checked for an index scan on
+  the embedding index and for a filter on the distance
+- EXPLAIN (ANALYZE, BUFFERS) of one query each, saved to the output file
+- Latency percentiles over --queries queries, with and without a metadata
+  filter, and how often both return the same chunks
+
+Synthetic rows (clustered 1024-d vectors, metadata {"benchmark": true})
+are bulk-loaded with VectorDatabase.bulk_load when --load is given. Run it
+against a scratch database: a million rows is several GB.
+
+Usage:
+    python tests/benchmark_vector_search.py --load --rows 1000000
+    python tests/benchmark_vector_search.py --queries 200 --output search_bench.json
+    python tests/benchmark_vector_search.py --cleanup
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_database import KB_TABLE, VectorDatabase, vector_literal
+
+DIMENSIONS = 1024
+EMBEDDING_INDEX = "bedrock_kb_embedding_idx"
+
+LEGACY_SQL = f"""
+    SELECT id, chunks, 1 - (embedding <=> %(q)s::vector) AS similarity, metadata
+    FROM {KB_TABLE}
+    WHERE 1 - (embedding <=> %(q)s::vector) > %(threshold)s
+    ORDER BY embedding <=> %(q)s::vector
+    LIMIT %(k)s
+"""
+
+# The candidate scan inside search_nearest_chunks (plans of PL/pgSQL
+# statements are not visible to EXPLAIN on the function call)
+CANDIDATE_SQL = f"""
+    SELECT id, embedding <=> %(q)s::vector AS distance, metadata
+    FROM {KB_TABLE}
+    ORDER BY embedding <=> %(q)s::vector
+    LIMIT %(k)s
+"""
+
+NEAREST_SQL = """
+    SELECT id FROM bedrock_integration.search_nearest_chunks(
+        %(q)s::vector, %(threshold)s, %(k)s, %(filter)s::jsonb, %(max_candidates)s)
+"""
+
+# ============================================================================
+# Synthetic Data
+# ============================================================================
+
+def cluster_centers(clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSIONS)).astype(np.float32)
+    return centers / np.linalg.norm(centers, axis=1, keepdims=True)
+
+
+def synthetic_rows(rows: int, centers: np.ndarray, seed: int, batch: int = 10000) -> Iterator[Dict[str, Any]]:
+    """Rows around random cluster centers, generated batch by batch."""
+    rng = np.random.default_rng(seed + 1)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        assignment = rng.integers(0, len(centers), n)
+        vectors = centers[assignment] + 0.08 * rng.standard_normal((n, DIMENSIONS)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for i in range(n):
+            index = start + i
+            yield {
+                'id': str(uuid.uuid4()),
+                'text': f"Fragmento sintético {index} del grupo {assignment[i]}.",
+                'embedding': vectors[i].tolist(),
+                'metadata': {
+                    'benchmark': True,
+                    'file_name': f"bench_{assignment[i] % 200:03d}.txt",
+                    'chunk_index': index
+                }
+            }
+
+
+def query_vectors(queries: int, centers: np.ndarray, seed: int) -> List[List[float]]:
+    rng = np.random.default_rng(seed + 2)
+    picked = centers[rng.integers(0, len(centers), queries)]
+    vectors = picked + 0.08 * rng.standard_normal(picked.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [vector.tolist() for vector in vectors]
+
+# ============================================================================
+# Plans
+# ============================================================================
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(cur: Any, sql: str, params: Dict[str, Any], analyze: bool = False) -> Dict[str, Any]:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    cur.execute(f"EXPLAIN ({options}) {sql}", params)
+    return cur.fetchone()[0][0]
+
+
+def check_plan(name: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Index used by the scan and whether the distance is filtered row by row."""
+    nodes = list(plan_nodes(plan['Plan']))
+    index_scans = [n for n in nodes if n['Node Type'] in ('Index Scan', 'Index Only Scan')
+                   and n.get('Index Name') == EMBEDDING_INDEX]
+    filtered = any('<=>' in n.get('Filter', '') for n in nodes)
+    seq_scan = any(n['Node Type'] == 'Seq Scan' for n in nodes)
+    ok = bool(index_scans) and not filtered
+    print(f"  {'✓' if ok else '✗'} {name:<22} index scan: {'yes' if index_scans else 'no':<4}"
+          f" distance filter: {'yes' if filtered else 'no':<4} seq scan: {'yes' if seq_scan else 'no'}")
+    return {'index_scan': bool(index_scans), 'distance_filter': filtered, 'seq_scan': seq_scan}
+
+# ============================================================================
+# Timing
+# ============================================================================
+
+def time_queries(cur: Any, sql: str, queries: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+    timings = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        cur.execute(sql, {**params, 'q': q})
+        results.append([row[0] for row in cur.fetchall()])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'mean_ms': statistics.mean(timings),
+        'mean_results': statistics.mean(len(r) for r in results),
+        'results': results
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pgvector search benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Synthetic rows to load with --load")
+    parser.add_argument('--clusters', type=int, default=1000)
+    parser.add_argument('--load', action='store_true', help="Load synthetic rows first")
+    parser.add_argument('--cleanup', action='store_true', help="Delete synthetic rows and exit")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--max-candidates', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='search_bench.json')
+    args = parser.parse_args()
+
+    db = VectorDatabase()
+    centers = cluster_centers(args.clusters, args.seed)
+
+    if args.cleanup:
+        with db._connection() as conn, conn, conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {KB_TABLE} WHERE metadata @> '{{\"benchmark\": true}}'")
+            print(f"✓ Deleted {cur.rowcount} synthetic rows")
+        return
+
+    if args.load:
+        print(f"Loading {args.rows:,} synthetic rows...")
+        start = time.perf_counter()
+        loaded = db.bulk_load(synthetic_rows(args.rows, centers, args.seed))
+        elapsed = time.perf_counter() - start
+        print(f"✓ Loaded {loaded:,} rows in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s)")
+        with db._connection() as conn, conn, conn.cursor() as cur:
+            cur.execute(f"ANALYZE {KB_TABLE}")
+
+    queries = [vector_literal(q) for q in query_vectors(args.queries, centers, args.seed)]
+    params = {'threshold': args.threshold, 'k': args.top_k, 'filter': None,
+              'max_candidates': args.max_candidates}
+    report: Dict[str, Any] = {'args': vars(args)}
+
+    with db._connection() as conn, conn, conn.cursor() as cur:
+        cur.execute(f"SELECT reltuples::BIGINT FROM pg_class WHERE oid = '{KB_TABLE}'::regclass")
+        report['table_rows'] = cur.fetchone()[0]
+        print(f"\nbedrock_kb: ~{report['table_rows']:,} rows\n\nPlans:")
+
+        first = {**params, 'q': queries[0]}
+        report['plans'] = {
+            'legacy': check_plan("legacy WHERE filter", explain(cur, LEGACY_SQL, first)),
+            'nearest': check_plan("nearest candidates", explain(cur, CANDIDATE_SQL, first)),
+        }
+        report['explain_analyze'] = {
+            'legacy': explain(cur, LEGACY_SQL, first, analyze=True),
+            'nearest': explain(cur, CANDIDATE_SQL, first, analyze=True),
+        }
+
+        print(f"\nLatency over {len(queries)} queries (top {args.top_k}, threshold {args.threshold}):")
+        runs = {
+            'legacy': time_queries(cur, LEGACY_SQL, queries, params),
+            'nearest': time_queries(cur, NEAREST_SQL, queries, params),
+            'nearest_filtered': time_queries(
+                cur, NEAREST_SQL, queries,
+                {**params, 'filter': json.dumps({'file_name': 'bench_000.txt'})}
+            ),
+        }
+
+    for name, run in runs.items():
+        print(f"  {name:<18} p50 {run['p50_ms']:8.2f} ms  p95 {run['p95_ms']:8.2f} ms  "
+              f"mean results {run['mean_results']:.1f}")
+    same = sum(a == b for a, b in zip(runs['legacy']['results'], runs['nearest']['results']))
+    print(f"\n  legacy and nearest returned identical results for {same}/{len(queries)} queries")
+
+    report['latency'] = {name: {k: v for k, v in run.items() if k != 'results'} for name, run in runs.items()}
+    report['identical_results'] = same
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -229,7 +229,7 @@ def main():
     print("TEST SUMMARY")
     print("=" * 60)
     print("✅ All critical components tested")
-    print("✅ SQLite threading fixed (connection per operation)")
+    print("✅ SQLite threading fixed (per-thread WAL connections)")
     print("✅ log_query signature fixed (accepts user_id/session_id)")
     print("✅ Data format fixed (search_similar_documents returns dicts)")
     print("\n🎉 System is ready for demo!")
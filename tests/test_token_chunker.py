@@ -0,0 +1,130 @@
+"""
+Tests for the token chunker (token_chunker.py).
+
+Uses a small byte-level BPE encoding trained here on Spanish text, so no
+encoding has to be downloaded. Byte-level merges such as "ci" + the first
+byte of "ó" produce tokens that end inside a multi-byte character.
+
+Run:
+    python -m pytest tests/test_token_chunker.py -q
+"""
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+tiktoken = pytest.importorskip("tiktoken")
+
+from token_chunker import TokenChunker, token_offsets, token_spans  # noqa: E402
+
+SENTENCES = [
+    "Los empleados tienen derecho a veinte días hábiles de vacaciones por año.",
+    "Las solicitudes deben enviarse con al menos dos semanas de anticipación.",
+    "El reembolso de gastos de viaje requiere la factura original y la aprobación del gerente.",
+    "La política de trabajo remoto permite hasta tres días por semana fuera de la oficina.",
+    "Cualquier excepción debe ser aprobada por el departamento de Recursos Humanos.",
+    "La compañía ofrece formación en diseño, programación y gestión año tras año.",
+    "¿Qué ocurre si el niño está enfermo? Se aplica la licencia por cuidado familiar.",
+]
+
+PAT_STR = r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+
+
+def spanish_text(paragraphs: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 8)))
+                       for _ in range(paragraphs))
+
+
+def train_encoding(text: str, merges: int = 300):
+    """Byte-level BPE over space-prefixed words, as tiktoken encodings are built."""
+    words = Counter(tuple(bytes([b]) for b in (" " + word).encode("utf-8")) for word in text.split())
+    ranks = {bytes([i]): i for i in range(256)}
+    for _ in range(merges):
+        pairs = Counter()
+        for word, count in words.items():
+            for pair in zip(word, word[1:]):
+                pairs[pair] += count
+        if not pairs:
+            break
+        (left, right), _ = pairs.most_common(1)[0]
+        ranks[left + right] = len(ranks)
+        merged = Counter()
+        for word, count in words.items():
+            out, i = [], 0
+            while i < len(word):
+                if i + 1 < len(word) and word[i] == left and word[i + 1] == right:
+                    out.append(left + right)
+                    i += 2
+                else:
+                    out.append(word[i])
+                    i += 1
+            merged[tuple(out)] += count
+        words = merged
+    return tiktoken.Encoding(name="test_spanish_bpe", pat_str=PAT_STR,
+                             mergeable_ranks=ranks, special_tokens={})
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    return train_encoding(spanish_text(200, seed=1))
+
+
+@pytest.fixture(scope="module")
+def text():
+    # Accented text plus one 300-character pre-tokenizer piece
+    return spanish_text(120) + "\n\nCódigo " + "ñáéíóú" * 50 + " final."
+
+
+def test_encoding_splits_multibyte_characters(encoding, text):
+    def partial(token):
+        try:
+            encoding.decode_single_token_bytes(token).decode("utf-8")
+        except UnicodeDecodeError:
+            return True
+        return False
+
+    assert any(partial(token) for token in set(encoding.encode_ordinary(text)))
+
+
+def test_token_offsets_match_decode_with_offsets(encoding, text):
+    tokens = encoding.encode_ordinary(text)
+    offsets, clean = token_offsets(text, tokens, encoding)
+    _, expected = encoding.decode_with_offsets(tokens)
+    assert offsets[:-1].tolist() == expected
+    assert offsets[-1] == len(text)
+    assert not clean.all()
+
+
+@pytest.mark.parametrize("chunk_tokens,overlap_tokens", [(64, 8), (128, 16), (512, 64)])
+def test_chunks_never_exceed_the_token_limit(encoding, text, chunk_tokens, overlap_tokens):
+    spans = token_spans(text, chunk_tokens, overlap_tokens, encoding)
+    counts = [len(encoding.encode(text[start:end])) for start, end in spans]
+    assert max(counts) <= chunk_tokens
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(b[0] <= a[1] for a, b in zip(spans, spans[1:]))
+
+
+def test_long_piece_is_cut_into_full_chunks(encoding):
+    text = "ñáéíóú" * 50
+    spans = token_spans(text, 16, 2, encoding)
+    tokens = len(encoding.encode_ordinary(text))
+    assert len(spans) <= tokens // (16 - 2) + 2
+    assert max(len(encoding.encode(text[s:e])) for s, e in spans) <= 16
+
+
+@pytest.mark.parametrize("chunk_tokens,overlap_tokens", [(64, 8), (128, 16)])
+def test_streaming_matches_token_spans(encoding, text, chunk_tokens, overlap_tokens):
+    expected = [text[start:end].strip() for start, end in token_spans(text, chunk_tokens, overlap_tokens, encoding)]
+    paragraphs = text.split("\n\n")
+    for segments in (paragraphs, [text], ["\n\n".join(paragraphs[i:i + 7]) for i in range(0, len(paragraphs), 7)]):
+        chunker = TokenChunker(chunk_tokens, overlap_tokens, encoding)
+        chunks = []
+        for segment in segments:
+            chunks.extend(chunk['text'] for chunk in chunker.add(segment))
+        chunks.extend(chunk['text'] for chunk in chunker.finish())
+        assert chunks == [chunk for chunk in expected if chunk]
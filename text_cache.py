@@ -0,0 +1,115 @@
+"""
+Extracted Text Cache for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+Parsing PDFs and DOCX files dominates ingestion time, yet the cleaned text
+of a file only changes when the file does. This module stores the cleaned
+segments of every ingested file, keyed by its SHA-256 content hash, as
+gzip-compressed JSON lines:
+- TextCache.open_writer: Record segments while a file is being ingested
+- TextCache.read: Replay them later (e.g. after changing CHUNK_SIZE)
+
+Entries are written to a temporary file and renamed into place only after
+the file was fully processed, so an interrupted ingestion never leaves a
+truncated entry behind. Reads stream line by line, keeping memory flat.
+
+Example:
+    >>> cache = TextCache(".docsmart_text_cache")
+    >>> if cache.has(content_hash):
+    ...     segments = cache.read(content_hash)   # (page, text) pairs
+"""
+
+import gzip
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", ".docsmart_text_cache")
+
+# Bump when extraction or cleaning changes so old entries are not replayed
+TEXT_CACHE_VERSION = 1
+
+COMPRESS_LEVEL = 6
+
+# ============================================================================
+# Writer
+# ============================================================================
+
+class TextCacheWriter:
+    """Writes one cache entry; nothing is visible until commit()."""
+
+    def __init__(self, final_path: Path):
+        self.final_path = final_path
+        self.temp_path = final_path.with_name(f"{final_path.name}.{uuid.uuid4().hex}.tmp")
+        self._file = gzip.open(self.temp_path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL)
+
+    def write(self, page: Optional[int], text: str) -> None:
+        self._file.write(json.dumps([page, text], ensure_ascii=False))
+        self._file.write("\n")
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self.temp_path, self.final_path)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+class TextCache:
+    """Directory of compressed cleaned-text entries keyed by content hash."""
+
+    def __init__(self, directory: str = TEXT_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, content_hash: str) -> Path:
+        # Two-level fan-out keeps directories small on large corpora
+        return self.directory / content_hash[:2] / f"{content_hash}.v{TEXT_CACHE_VERSION}.jsonl.gz"
+
+    def has(self, content_hash: str) -> bool:
+        return self._path(content_hash).exists()
+
+    def read(self, content_hash: str) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Stream the cached segments of a file.
+
+        Returns:
+            Iterator of (page, cleaned text) in document order
+        """
+        with gzip.open(self._path(content_hash), 'rt', encoding='utf-8') as f:
+            for line in f:
+                page, text = json.loads(line)
+                yield page, text
+
+    def open_writer(self, content_hash: str) -> TextCacheWriter:
+        path = self._path(content_hash)
+        path.parent.mkdir(exist_ok=True)
+        return TextCacheWriter(path)
+
+    def remove(self, content_hash: str) -> None:
+        try:
+            os.remove(self._path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """Number of entries and compressed bytes on disk."""
+        entries = 0
+        size = 0
+        for path in self.directory.glob("*/*.jsonl.gz"):
+            entries += 1
+            size += path.stat().st_size
+        return {'entries': entries, 'bytes': size}
@@ -0,0 +1,247 @@
+"""
+Token-Based Chunker for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+Character-based chunks (CHUNK_SIZE=1000) have unpredictable token counts.
+This module chunks by tokens instead:
+- token_spans: (start, end) character offsets of token-sized chunks
+- TokenChunker: Incremental chunker (same interface as StreamingChunker)
+
+Each chunk is found in a window of text starting where the chunk starts:
+the window is tokenized with tiktoken, and the chunk ends at the last
+paragraph, sentence or line break inside its final SNAP_FRACTION of
+tokens, or else at the last word boundary that fits. The chunk is then
+re-encoded on its own and shortened until it is at most CHUNK_TOKENS
+tokens. Every decision depends only on the text from the chunk start, so
+the output is the same however the text is split into segments.
+
+Token offsets come from the bytes of each token. A byte-level BPE token
+can end inside a multi-byte UTF-8 character ("ñ", "ó"); chunks are only
+cut where a token starts on a character boundary.
+
+Configuration (environment variables):
+    CHUNK_TOKENS          Target tokens per chunk (default 512)
+    CHUNK_OVERLAP_TOKENS  Tokens shared by consecutive chunks (default 64)
+    CHUNK_ENCODING        tiktoken encoding (default cl100k_base)
+
+Example:
+    >>> spans = token_spans(text, chunk_tokens=512, overlap_tokens=64)
+    >>> first = text[spans[0][0]:spans[0][1]]
+"""
+
+import os
+import re
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from document_processor import SegmentBuffer
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")
+
+# Chunks may end this fraction of the target early to land on a boundary
+SNAP_FRACTION = 0.2
+
+# Tokens a window holds beyond the chunk, so the cut is not made where the
+# tokenization still depends on text past the window end
+WINDOW_MARGIN_TOKENS = 16
+
+# Characters per token assumed for the first window (doubled until it is enough)
+WINDOW_CHARS_PER_TOKEN = 6
+
+# Boundary positions, strongest first: a chunk ends just before a paragraph
+# or line break, or just after sentence-ending punctuation
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n')
+SENTENCE_END = re.compile(r'[.!?…][)\]"\'»]*(?=\s)')
+LINE_BREAK = re.compile(r'\n')
+
+_encodings = {}
+
+# Per encoding: byte length of each token id (-1 until first seen)
+_byte_lengths: Dict[str, np.ndarray] = {}
+
+
+def get_encoding(name: str = CHUNK_ENCODING) -> Any:
+    """tiktoken encoding by name (cached)."""
+    if name not in _encodings:
+        import tiktoken
+        _encodings[name] = tiktoken.get_encoding(name)
+    return _encodings[name]
+
+# ============================================================================
+# Span Computation
+# ============================================================================
+
+def token_offsets(text: str, tokens: List[int], encoding: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Character offset of every token plus the text length at the end, and
+    whether each of those offsets is a character boundary.
+
+    Offsets are mapped from the cumulative byte lengths of the tokens
+    (decode_single_token_bytes, cached per token id) through a byte ->
+    character map of the text, as decode_with_offsets() does but without
+    decoding every token in Python. A token that starts inside a multi-byte
+    character gets the offset of that character and is not a boundary.
+    """
+    table = _byte_lengths.get(encoding.name)
+    if table is None:
+        table = _byte_lengths[encoding.name] = np.full(encoding.max_token_value + 1, -1, dtype=np.int64)
+    ids = np.asarray(tokens, dtype=np.int64)
+    for token in np.unique(ids[table[ids] < 0]).tolist():
+        table[token] = len(encoding.decode_single_token_bytes(token))
+
+    data = np.frombuffer(text.encode('utf-8', 'surrogatepass'), dtype=np.uint8)
+    lead = np.append((data & 0xC0) != 0x80, True)
+    char_of_byte = np.cumsum(lead) - 1
+    byte_offsets = np.concatenate(([0], np.cumsum(table[ids])))
+    return char_of_byte[byte_offsets], lead[byte_offsets]
+
+
+def _word_boundary(text: str, position: int) -> bool:
+    """True unless `position` falls between two letters or digits."""
+    return not (text[position - 1].isalnum() and text[position].isalnum())
+
+
+def _boundary_tokens(text: str, offsets: np.ndarray, clean: np.ndarray,
+                     low: int, high: int) -> List[List[int]]:
+    """Token indices in (low, high] where a chunk may end, per boundary strength."""
+    first, last = int(offsets[low]), int(offsets[high])
+    result = []
+    for pattern, use_end in ((PARAGRAPH_BREAK, False), (SENTENCE_END, True), (LINE_BREAK, False)):
+        positions = []
+        # Sentence ends are matched from a few characters back (closing quotes)
+        for match in pattern.finditer(text, max(0, first - 8) if use_end else first):
+            position = match.end() if use_end else match.start()
+            if position > last:
+                break
+            positions.append(position)
+        indices = np.searchsorted(offsets, positions)
+        result.append([int(index) for index, position in zip(indices, positions)
+                       if low < index <= high and offsets[index] == position and clean[index]])
+    return result
+
+
+def _window_chunk(window: str, tokens: List[int], at_end: bool, chunk_tokens: int,
+                  overlap_tokens: int, encoding: Any) -> Tuple[int, int]:
+    """
+    End of the chunk that starts at the beginning of `window`, and the start
+    of the next chunk (character offsets into the window; both equal the
+    window length for the last chunk).
+    """
+    if at_end and len(tokens) <= chunk_tokens:
+        return len(window), len(window)
+
+    offsets, clean = token_offsets(window, tokens, encoding)
+    cuts = (np.flatnonzero(clean[1:chunk_tokens + 1]) + 1).tolist()
+    if not cuts:
+        # A single character encoded as more than chunk_tokens tokens
+        end = int(np.flatnonzero(clean[1:])[0]) + 1
+        return int(offsets[end]), int(offsets[end])
+
+    def words_before(limit: int) -> Iterator[int]:
+        # Cuts at or before token `limit` that fall on a word boundary, last first
+        return (i for i in reversed(cuts[:bisect_right(cuts, limit)])
+                if _word_boundary(window, int(offsets[i])))
+
+    snap = max(1, int(chunk_tokens * SNAP_FRACTION))
+    for indices in _boundary_tokens(window, offsets, clean, max(0, chunk_tokens - snap), chunk_tokens):
+        if indices:
+            end = indices[-1]
+            break
+    else:
+        end = next(words_before(chunk_tokens), cuts[-1])
+
+    # A cut inside a pre-tokenizer piece can re-encode to more tokens than
+    # it held; measure the chunk on its own and shorten it until it fits
+    shorter = chain(words_before(end - 1), reversed(cuts[:bisect_left(cuts, end)]))
+    while len(encoding.encode_ordinary(window[:offsets[end]])) > chunk_tokens:
+        end = next(shorter, None)
+        if end is None:
+            end = cuts[0]
+            break
+
+    target = max(end - overlap_tokens, 1)
+    next_start = next(words_before(target), None)
+    if next_start is None:
+        i = bisect_right(cuts, target)
+        next_start = cuts[i - 1] if i else end
+    return int(offsets[end]), int(offsets[next_start])
+
+
+def token_spans(text: str, chunk_tokens: int = CHUNK_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS, encoding: Any = None
+                ) -> List[Tuple[int, int]]:
+    """
+    Chunk a text by tokens and return character offsets.
+
+    Args:
+        text (str): Cleaned document text
+        chunk_tokens (int): Maximum tokens per chunk
+        overlap_tokens (int): Tokens shared by consecutive chunks
+        encoding: tiktoken Encoding (defaults to CHUNK_ENCODING)
+
+    Returns:
+        List of (start, end) offsets into `text`
+    """
+    spans, _ = _spans(text, chunk_tokens, overlap_tokens, encoding or get_encoding(), final=True)
+    return spans
+
+
+def _spans(text: str, chunk_tokens: int, overlap_tokens: int, encoding: Any,
+           final: bool) -> Tuple[List[Tuple[int, int]], int]:
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+
+    spans = []
+    start = 0
+    needed = chunk_tokens + WINDOW_MARGIN_TOKENS
+    while start < len(text):
+        size = needed * WINDOW_CHARS_PER_TOKEN
+        while True:
+            at_end = start + size >= len(text)
+            if at_end and not final:
+                # More text may follow: wait until the window is complete
+                return spans, start
+            window = text[start:start + size]
+            tokens = encoding.encode_ordinary(window)
+            if at_end or len(tokens) > needed:
+                break
+            size *= 2
+
+        end, next_start = _window_chunk(window, tokens, at_end, chunk_tokens, overlap_tokens, encoding)
+        spans.append((start, start + end))
+        start += next_start
+    return spans, start
+
+# ============================================================================
+# Incremental Chunker
+# ============================================================================
+
+class TokenChunker(SegmentBuffer):
+    """
+    Token-based incremental chunker; a drop-in for StreamingChunker.
+
+    Each add() tokenizes only windows of the unconsumed buffer (the tail
+    of the previous chunk plus the new segment); chunks whose window would
+    reach past the buffer end wait for the next segment.
+    """
+
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 encoding: Optional[Any] = None):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        super().__init__()
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoding = encoding or get_encoding()
+
+    def _spans(self, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        return _spans(self._buffer, self.chunk_tokens, self.overlap_tokens, self.encoding, final)
@@ -0,0 +1,378 @@
+"""
+Lightweight Tracing for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module provides nested tracing spans so a slow answer can be broken down
+into the time spent validating, retrieving, calling Bedrock and hitting the
+vector database:
+- start_span: Context manager that opens a (possibly nested) span
+- traced: Decorator that wraps a function in a span
+- set_attribute: Attach an attribute (model id, tokens, cache hit...) to the current span
+- wrap_context / submit: Carry the current trace into thread pools
+
+Spans are stored in a contextvars.ContextVar, so they follow asyncio tasks
+automatically. Thread pools do not copy context on their own; use submit()
+or wrap_context() when handing work to an executor.
+
+Configuration (environment variables):
+    TRACE_EXPORTER      "" (disabled), "jsonl", "memory" or "otlp"
+    TRACE_SAMPLE_RATE   Fraction of root spans recorded (0.0-1.0, default 1.0)
+    TRACE_FILE          Output file for the jsonl/otlp exporters
+    TRACE_OTLP_ENDPOINT Collector URL for the otlp exporter (e.g. http://localhost:4318/v1/traces)
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# ============================================================================
+# Span Model
+# ============================================================================
+
+class Span:
+    """A single timed operation within a trace."""
+
+    __slots__ = (
+        'name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+        'attributes', 'status', 'error', 'sampled'
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self.sampled = sampled
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error
+        }
+
+
+def _new_id(num_bytes: int) -> str:
+    return random.getrandbits(num_bytes * 8).to_bytes(num_bytes, 'big').hex()
+
+# ============================================================================
+# Exporters
+# ============================================================================
+
+class JsonlFileExporter:
+    """Append one JSON object per finished span to a local file."""
+
+    def __init__(self, path: str = "traces.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+class RingBufferExporter:
+    """Keep the most recent finished spans in memory (for the UI or tests)."""
+
+    def __init__(self, capacity: int = 1000):
+        self._spans = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span.to_dict())
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id:
+            spans = [s for s in spans if s['trace_id'] == trace_id]
+        return spans
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class OtlpJsonExporter:
+    """
+    Export spans in the OTLP/JSON format used by OpenTelemetry collectors.
+
+    Spans are buffered and flushed in batches of `batch_size`, either as an
+    HTTP POST to `endpoint` or appended as one resourceSpans document per line
+    to `path`. The last partial batch is flushed at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        path: Optional[str] = None,
+        service_name: str = "docsmart-rag",
+        batch_size: int = 50
+    ):
+        if not endpoint and not path:
+            raise ValueError("OtlpJsonExporter requires an endpoint or a path")
+        self.endpoint = endpoint
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._send(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: List[Span]) -> None:
+        payload = json.dumps(self._to_otlp(batch), default=str)
+        try:
+            if self.endpoint:
+                request = urllib.request.Request(
+                    self.endpoint,
+                    data=payload.encode('utf-8'),
+                    headers={'Content-Type': 'application/json'},
+                    method='POST'
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(payload + "\n")
+        except Exception as e:
+            print(f"Error exporting traces: {e}")
+
+    def _to_otlp(self, batch: List[Span]) -> Dict[str, Any]:
+        return {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [_otlp_attribute('service.name', self.service_name)]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'docsmart.tracing'},
+                    'spans': [
+                        {
+                            'traceId': span.trace_id,
+                            'spanId': span.span_id,
+                            'parentSpanId': span.parent_id or '',
+                            'name': span.name,
+                            'kind': 1,
+                            'startTimeUnixNano': str(span.start_ns),
+                            'endTimeUnixNano': str(span.end_ns),
+                            'attributes': [
+                                _otlp_attribute(k, v) for k, v in span.attributes.items()
+                            ],
+                            'status': {
+                                'code': 2 if span.status == 'error' else 1,
+                                'message': span.error or ''
+                            }
+                        }
+                        for span in batch
+                    ]
+                }]
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+# ============================================================================
+# Tracer
+# ============================================================================
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('docsmart_span', default=None)
+
+_exporter = None
+_sample_rate = 1.0
+
+
+def configure(exporter: Any = None, sample_rate: float = 1.0) -> None:
+    """
+    Set the exporter and the sampling rate used for new traces.
+
+    Args:
+        exporter: Object with an export(span) method, or None to disable tracing
+        sample_rate (float): Fraction of root spans to record (0.0-1.0)
+    """
+    global _exporter, _sample_rate
+
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError("sample_rate must be between 0.0 and 1.0")
+
+    _exporter = exporter
+    _sample_rate = sample_rate
+
+
+def configure_from_env() -> None:
+    """Configure tracing from the TRACE_* environment variables."""
+    kind = os.getenv("TRACE_EXPORTER", "").lower()
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+    if kind == "jsonl":
+        exporter = JsonlFileExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+    elif kind == "memory":
+        exporter = RingBufferExporter(int(os.getenv("TRACE_BUFFER_SIZE", "1000")))
+    elif kind == "otlp":
+        exporter = OtlpJsonExporter(
+            endpoint=os.getenv("TRACE_OTLP_ENDPOINT") or None,
+            path=os.getenv("TRACE_FILE", "traces.otlp.jsonl")
+        )
+    else:
+        exporter = None
+
+    configure(exporter, sample_rate)
+
+
+def get_exporter() -> Any:
+    """Return the configured exporter (None when tracing is disabled)."""
+    return _exporter
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Open a span as a child of the current one (or a new trace at the root).
+
+    The sampling decision is taken once per trace at the root span and
+    inherited by every child, so traces are either complete or absent.
+
+    Example:
+        >>> with start_span("bedrock.invoke_model", model_id=model_id) as span:
+        ...     response = bedrock_runtime.invoke_model(...)
+        ...     set_attribute("output_tokens", 120)
+    """
+    if _exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    if parent is None:
+        span = Span(name, _new_id(16), None, random.random() < _sample_rate)
+    else:
+        span = Span(name, parent.trace_id, parent.span_id, parent.sampled)
+
+    if span.sampled:
+        span.attributes.update(attributes)
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = 'error'
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        exporter = _exporter
+        if span.sampled and exporter is not None:
+            exporter.export(span)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the current span (no-op when not tracing)."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that runs the wrapped function (sync or async) inside a span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+# ============================================================================
+# Context Propagation
+# ============================================================================
+
+def wrap_context(func: Callable) -> Callable:
+    """
+    Bind `func` to a copy of the caller's context so spans opened inside it
+    (on another thread) become children of the caller's current span.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A Context can only be entered by one thread at a time
+        return ctx.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def submit(executor: Executor, func: Callable, *args: Any, **kwargs: Any) -> Future:
+    """executor.submit() that carries the current trace into the worker thread."""
+    return executor.submit(wrap_context(func), *args, **kwargs)
+
+
+configure_from_env()
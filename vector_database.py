@@ -0,0 +1,699 @@
+"""
+Vector Database for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+This module manages document chunks and embeddings in Aurora PostgreSQL with
+pgvector, using the bedrock_integration.bedrock_kb table created by
+scripts/aurora_init.sql:
+- VectorDatabase.insert_chunks: Store chunks with their embeddings
+- VectorDatabase.bulk_load: Stream any number of chunks in COPY batches
+- VectorDatabase.delete_chunks: Remove chunks by id
+- VectorDatabase.set_chunk_sources: Record the other sources of a deduplicated chunk
+- VectorDatabase.search_similar_documents: Nearest chunks as result dicts
+- VectorDatabase.similarity_search: Nearest chunks as (text, score, metadata)
+- VectorDatabase.hybrid_search: Vector + Spanish full-text results fused in the database (RRF)
+- VectorDatabase.get_statistics: Chunk counts per file (used by the UI sidebar)
+- VectorDatabase.search_tuning_statistics: Search effort levels used and their latency
+- VectorDatabase.log_query: Record a query in bedrock_integration.query_logs
+  (in the background, see query_log_writer.py), as the SQLite backend does
+
+get_statistics reads the trigger-maintained kb_file_stats summary
+(scripts/aurora_kb_stats.sql) instead of aggregating bedrock_kb, and keeps
+the result for STATS_CACHE_TTL seconds, since the sidebar asks on every
+Streamlit rerun. This process's own writes clear the cached value.
+
+Chunks are written with binary COPY (COPY ... FROM STDIN (FORMAT binary)):
+one round trip per batch instead of one INSERT per chunk, and embeddings
+are sent as raw float4 values instead of text literals the server parses.
+
+Searches set ivfflat.probes / hnsw.ef_search per query (SET LOCAL) instead
+of using the session default: they start at the value the index advisor
+recorded for the index (scripts/vector_index_advisor.py), or a low default,
+and are retried with twice the effort while fewer than top_k results clear
+the threshold, as long as the next attempt is expected to fit in
+SEARCH_LATENCY_BUDGET_MS. Every attempt is recorded for calibration.
+
+Every operation leases a connection from the shared pool in db_pool.py,
+so all VectorDatabase instances (one per Streamlit session) with the same
+settings share at most DB_POOL_MAX_SIZE connections.
+
+Connection settings come from the DB_* environment variables (see .env.example).
+"""
+
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import psycopg2.errors
+import psycopg2.extras
+
+from db_pool import ConnectionPool, get_pool
+from query_log_writer import QUERY_LOG_ASYNC, QueryLogWriter
+from tracing import set_attribute, start_span
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", "5432"))
+DB_NAME = os.getenv("DB_NAME", "docsmart_kb")
+DB_USER = os.getenv("DB_USER", "dbadmin")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+
+# Rows per COPY statement; each batch is its own transaction
+COPY_BATCH_SIZE = int(os.getenv("DB_COPY_BATCH_SIZE", "5000"))
+
+# Seconds a get_statistics() result is reused (0 disables the cache)
+STATS_CACHE_TTL = float(os.getenv("DB_STATS_CACHE_TTL", "5"))
+
+# Per-query search effort (hnsw.ef_search / ivfflat.probes)
+SEARCH_LATENCY_BUDGET_MS = float(os.getenv("DB_SEARCH_LATENCY_BUDGET_MS", "250"))
+HNSW_EF_SEARCH_START = int(os.getenv("DB_HNSW_EF_SEARCH_START", "40"))
+HNSW_EF_SEARCH_MAX = int(os.getenv("DB_HNSW_EF_SEARCH_MAX", "400"))
+IVFFLAT_PROBES_START = int(os.getenv("DB_IVFFLAT_PROBES_START", "1"))
+IVFFLAT_PROBES_MAX = int(os.getenv("DB_IVFFLAT_PROBES_MAX", "0"))  # 0 = all lists
+SEARCH_TUNING_LOG = os.getenv("DB_SEARCH_TUNING_LOG", "")           # JSONL file, "" = off
+
+KB_TABLE = "bedrock_integration.bedrock_kb"
+KB_COPY_COLUMNS = "(id, chunks, embedding, metadata)"
+LOG_TABLE = "bedrock_integration.query_logs"
+
+
+def vector_literal(embedding: List[float]) -> str:
+    """pgvector text representation of an embedding."""
+    return '[' + ','.join(repr(float(v)) for v in embedding) + ']'
+
+# ============================================================================
+# Binary COPY Encoding
+# ============================================================================
+
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+
+_FIELD = struct.Struct('>i')
+_JSONB_VERSION = b'\x01'
+
+
+def _field(data: bytes) -> bytes:
+    return _FIELD.pack(len(data)) + data
+
+
+def encode_copy_row(chunk: Dict[str, Any]) -> bytes:
+    """
+    One bedrock_kb row in PostgreSQL binary COPY format.
+
+    Fields match KB_COPY_COLUMNS: uuid (16 bytes), text (UTF-8), pgvector
+    (int16 dimensions, int16 unused, big-endian float4 values) and jsonb
+    (version byte followed by the JSON text).
+    """
+    embedding = chunk['embedding']
+    vector = struct.pack(f'>hh{len(embedding)}f', len(embedding), 0, *embedding)
+    metadata = json.dumps(chunk.get('metadata', {}), ensure_ascii=False)
+    return b''.join((
+        struct.pack('>h', 4),
+        _field(uuid.UUID(str(chunk['id'])).bytes),
+        _field(chunk['text'].encode('utf-8')),
+        _field(vector),
+        _field(_JSONB_VERSION + metadata.encode('utf-8'))
+    ))
+
+
+class CopyStream:
+    """
+    Read-only file object producing a binary COPY payload from rows.
+
+    Rows are encoded as psycopg2 reads, so a batch is never materialized as
+    one large buffer.
+    """
+
+    def __init__(self, chunks: Iterable[Dict[str, Any]]):
+        self._parts = itertools.chain(
+            (COPY_HEADER,), (encode_copy_row(chunk) for chunk in chunks), (COPY_TRAILER,)
+        )
+        self._buffer = bytearray()
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            part = next(self._parts, None)
+            if part is None:
+                break
+            self._buffer += part
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+def _result(chunk_id: Any, text: str, similarity: float, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Search result dict from a bedrock_kb row."""
+    metadata = metadata or {}
+    return {
+        'id': str(chunk_id),
+        'text': text,
+        'similarity': float(similarity),
+        'file_name': metadata.get('file_name', metadata.get('source', 'unknown')),
+        'chunk_index': metadata.get('chunk_index'),
+        'metadata': metadata
+    }
+
+# Per-DSN statistics cache shared by every session: key -> (fetched_at, stats)
+_stats_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+_stats_cache_lock = threading.Lock()
+
+# ============================================================================
+# Search Effort
+# ============================================================================
+
+# Seconds the vector index description is reused (the advisor may swap it)
+INDEX_CACHE_TTL = 300
+
+# pgvector's upper bound for hnsw.ef_search
+_EF_SEARCH_LIMIT = 1000
+
+_SEARCH_SETTINGS = {'hnsw': 'hnsw.ef_search', 'ivfflat': 'ivfflat.probes'}
+
+# Per-DSN vector index description: key -> (fetched_at, index or None)
+_index_cache: Dict[Tuple, Tuple[float, Optional[Dict[str, Any]]]] = {}
+
+# Recent search attempts: (setting, effort, elapsed_ms, results, candidates)
+_search_attempts: deque = deque(maxlen=5000)
+_search_log_lock = threading.Lock()
+
+
+def effort_range(index: Dict[str, Any], top_k: int) -> Tuple[int, int]:
+    """
+    First and largest effort value for a search on this index.
+
+    Args:
+        index (Dict): 'method', 'options' (reloptions) and 'baseline' (the
+            advisor's query setting, if recorded)
+        top_k (int): Results requested; HNSW returns at most ef_search rows
+
+    Returns:
+        (start, maximum)
+    """
+    if index['method'] == 'hnsw':
+        maximum = min(_EF_SEARCH_LIMIT, max(HNSW_EF_SEARCH_MAX, top_k))
+        start = index.get('baseline') or HNSW_EF_SEARCH_START
+        return min(maximum, max(start, top_k)), maximum
+    lists = index['options'].get('lists', 100)
+    maximum = min(lists, IVFFLAT_PROBES_MAX) if IVFFLAT_PROBES_MAX > 0 else lists
+    start = index.get('baseline') or IVFFLAT_PROBES_START
+    return max(1, min(maximum, start)), maximum
+
+
+def _last_scan(cur) -> Tuple[Optional[int], Optional[int]]:
+    """(candidates, requested) of the last search_nearest_chunks scan in this transaction."""
+    cur.execute("SELECT current_setting('docsmart.last_scan', true)")
+    value = cur.fetchone()[0]
+    if not value:
+        return None, None
+    candidates, requested = value.split(',')
+    return int(candidates), int(requested)
+
+
+def _wider_search_helps(method: str, filtered: bool, effort: int, max_candidates: int,
+                        candidates: Optional[int], requested: Optional[int]) -> bool:
+    """Whether more effort can return candidates the last scan did not see."""
+    if candidates is None:
+        return True
+    if method == 'ivfflat':
+        # The probed lists held fewer rows than the scan asked for
+        return candidates < requested
+    # HNSW: the scan stopped at the ef_search cap; without a filter the first
+    # top_k candidates were all seen and only the threshold removed them
+    return filtered and candidates >= requested >= effort and effort < max_candidates
+
+
+def _record_search(setting: str, attempts: List[Tuple[int, float, int, Optional[int]]], top_k: int) -> None:
+    with _search_log_lock:
+        for effort, elapsed_ms, results, candidates in attempts:
+            _search_attempts.append((setting, effort, elapsed_ms, results, candidates))
+        if SEARCH_TUNING_LOG:
+            with open(SEARCH_TUNING_LOG, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'ts': time.time(), 'setting': setting, 'top_k': top_k,
+                    'attempts': [{'effort': e, 'ms': round(ms, 3), 'results': r, 'candidates': c}
+                                 for e, ms, r, c in attempts]
+                }) + '\n')
+
+# ============================================================================
+# Query Log
+# ============================================================================
+
+_INSERT_LOG = (
+    f"INSERT INTO {LOG_TABLE} (query_text, query_embedding, results_count, response_time_ms, "
+    "metadata, user_id, session_id) VALUES %s"
+)
+_LOG_TEMPLATE = "(%s, %s::vector, %s, %s, %s::jsonb, %s, %s)"
+
+# Per-DSN background writer shared by every session
+_log_writers: Dict[Tuple, QueryLogWriter] = {}
+_log_writers_lock = threading.Lock()
+
+
+def _log_row(row: Tuple) -> Tuple:
+    query_text, query_embedding, results_count, response_time_ms, metadata, user_id, session_id = row
+    return (
+        query_text,
+        vector_literal(query_embedding) if query_embedding is not None else None,
+        results_count, response_time_ms,
+        json.dumps(metadata or {}, ensure_ascii=False), user_id, session_id
+    )
+
+
+def _write_log_rows(pool: ConnectionPool, rows: List[Tuple]) -> None:
+    """Insert query log rows in one statement."""
+    with pool.connection() as conn, conn, conn.cursor() as cur:
+        psycopg2.extras.execute_values(cur, _INSERT_LOG, [_log_row(row) for row in rows],
+                                       template=_LOG_TEMPLATE, page_size=len(rows))
+
+
+def _log_writer_for(key: Tuple, pool: ConnectionPool) -> QueryLogWriter:
+    """The process-wide query log writer of a database."""
+    with _log_writers_lock:
+        writer = _log_writers.get(key)
+        if writer is None or writer.closed:
+            writer = _log_writers[key] = QueryLogWriter(lambda rows: _write_log_rows(pool, rows))
+        return writer
+
+# ============================================================================
+# Vector Database
+# ============================================================================
+
+class VectorDatabase:
+    """Access layer for the pgvector knowledge base table."""
+
+    def __init__(self, host: str = DB_HOST, port: int = DB_PORT, dbname: str = DB_NAME,
+                 user: str = DB_USER, password: str = DB_PASSWORD,
+                 pool: Optional[ConnectionPool] = None):
+        """
+        Args:
+            host, port, dbname, user, password: Connection settings
+            pool (ConnectionPool): Pool to lease from (default: the shared
+                pool for these settings)
+        """
+        self.dsn = dict(host=host, port=port, dbname=dbname, user=user, password=password)
+        self.pool = pool
+        self._stats_key = tuple(sorted(self.dsn.items()))
+
+    def connect(self) -> None:
+        """Attach to the shared connection pool (opening it on first use)."""
+        if self.pool is None:
+            self.pool = get_pool(self.dsn)
+
+    def _connection(self):
+        self.connect()
+        return self.pool.connection()
+
+    def close(self) -> None:
+        """Detach from the pool; its connections stay open for other sessions."""
+        self.pool = None
+
+    def pool_statistics(self) -> Dict[str, Any]:
+        """Lease and wait-time metrics of the pool (see ConnectionPool.stats)."""
+        self.connect()
+        return self.pool.stats()
+
+    def insert_chunks(self, chunks: List[Dict[str, Any]]) -> int:
+        """
+        Insert chunks into the knowledge base, replacing rows with the same id.
+
+        Args:
+            chunks (List[Dict]): Each with 'id' (UUID string), 'text',
+                'embedding' (list of floats) and 'metadata' (dict)
+
+        Returns:
+            Number of rows inserted
+        """
+        with start_span("vector_db.insert_chunks", rows=len(chunks)):
+            return self.bulk_load(chunks, replace=True)
+
+    def bulk_load(self, chunks: Iterable[Dict[str, Any]], batch_size: int = COPY_BATCH_SIZE,
+                  replace: bool = False) -> int:
+        """
+        Stream chunks into the knowledge base with binary COPY.
+
+        Each batch of `batch_size` rows is one COPY statement in its own
+        transaction: a failure rolls back only the batch being written, and
+        earlier batches stay committed.
+
+        Args:
+            chunks (Iterable[Dict]): Rows as for insert_chunks; consumed lazily
+            batch_size (int): Rows per COPY statement / transaction
+            replace (bool): Delete existing rows with the batch's ids in the
+                same transaction first (COPY itself cannot upsert)
+
+        Returns:
+            Number of rows written
+
+        Example:
+            >>> db.bulk_load(iter_rows(), batch_size=10000)
+            250000
+        """
+        chunk_iter = iter(chunks)
+        total = 0
+        with start_span("vector_db.bulk_load", batch_size=batch_size):
+            while True:
+                batch = list(itertools.islice(chunk_iter, max(1, batch_size)))
+                if not batch:
+                    break
+                with self._connection() as conn, conn, conn.cursor() as cur:
+                    if replace:
+                        cur.execute(f"DELETE FROM {KB_TABLE} WHERE id = ANY(%s::uuid[])",
+                                    ([row['id'] for row in batch],))
+                    cur.copy_expert(
+                        f"COPY {KB_TABLE} {KB_COPY_COLUMNS} FROM STDIN (FORMAT binary)",
+                        CopyStream(batch)
+                    )
+                total += len(batch)
+                self._invalidate_statistics()
+            set_attribute('rows', total)
+        return total
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete chunks by id; returns the number of rows removed."""
+        if not chunk_ids:
+            return 0
+        with start_span("vector_db.delete_chunks", rows=len(chunk_ids)):
+            with self._connection() as conn, conn, conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {KB_TABLE} WHERE id = ANY(%s::uuid[])", (list(chunk_ids),))
+                deleted = cur.rowcount
+        self._invalidate_statistics()
+        return deleted
+
+    def set_chunk_sources(self, chunk_id: str, sources: List[Dict[str, Any]]) -> None:
+        """
+        Store the other sources a chunk's text appears in (see dedup.py) under
+        metadata.duplicate_sources, so answers can cite every one of them.
+        """
+        with self._connection() as conn, conn, conn.cursor() as cur:
+            if sources:
+                cur.execute(
+                    f"UPDATE {KB_TABLE} SET metadata = jsonb_set(metadata, '{{duplicate_sources}}', %s::jsonb) "
+                    "WHERE id = %s",
+                    (json.dumps(sources, ensure_ascii=False), chunk_id)
+                )
+            else:
+                cur.execute(
+                    f"UPDATE {KB_TABLE} SET metadata = metadata - 'duplicate_sources' "
+                    "WHERE id = %s",
+                    (chunk_id,)
+                )
+
+    def search_similar_documents(self, query_embedding: List[float], top_k: int = 5,
+                                 similarity_threshold: float = 0.0,
+                                 metadata_filter: Optional[Dict[str, Any]] = None,
+                                 max_candidates: int = 1000,
+                                 latency_budget_ms: float = SEARCH_LATENCY_BUDGET_MS) -> List[Dict[str, Any]]:
+        """
+        Most similar chunks by cosine similarity.
+
+        Runs bedrock_integration.search_nearest_chunks (scripts/aurora_search.sql):
+        an ivfflat/HNSW index scan, with the threshold and metadata filter
+        applied to the candidates afterwards. The index search effort
+        (hnsw.ef_search / ivfflat.probes) is set for this transaction only and
+        passed to the function, which scans at exactly that effort. It is
+        doubled while fewer than top_k results come back and the scan was
+        limited by the effort (not by the threshold or the metadata filter
+        over every candidate), within the latency budget (see effort_range).
+
+        Args:
+            query_embedding (List[float]): Query vector
+            top_k (int): Maximum results
+            similarity_threshold (float): Results must score above this cosine similarity
+            metadata_filter (Dict): Only chunks whose metadata contains these
+                key/values (JSONB @>), e.g. {'file_name': 'politica_vacaciones.txt'}
+            max_candidates (int): Most index candidates examined when the
+                metadata filter rejects many of them
+            latency_budget_ms (float): No wider retry once it is expected to
+                exceed this total (the first attempt always runs)
+
+        Returns:
+            List of dicts with 'id', 'text', 'similarity', 'file_name',
+            'chunk_index' and 'metadata', best first
+        """
+        params = (vector_literal(query_embedding), similarity_threshold, top_k,
+                  json.dumps(metadata_filter, ensure_ascii=False) if metadata_filter else None,
+                  max_candidates)
+        attempts = []
+        with start_span("vector_db.search", top_k=top_k):
+            index = self._vector_index()
+            with self._connection() as conn, conn, conn.cursor() as cur:
+                if index is None:
+                    setting, effort, maximum = None, 0, 0
+                else:
+                    setting = _SEARCH_SETTINGS[index['method']]
+                    effort, maximum = effort_range(index, top_k)
+                spent_ms = 0.0
+                while True:
+                    if setting:
+                        cur.execute(f"SET LOCAL {setting} = {int(effort)}")
+                    # With ef_search passed, the function scans at this effort
+                    # instead of raising hnsw.ef_search itself
+                    ef_search = int(effort) if setting == 'hnsw.ef_search' else None
+                    start = time.perf_counter()
+                    cur.execute(
+                        "SELECT id, chunks, similarity, metadata "
+                        "FROM bedrock_integration.search_nearest_chunks(%s::vector, %s, %s, %s::jsonb, %s, %s)",
+                        params + (ef_search,)
+                    )
+                    rows = cur.fetchall()
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    spent_ms += elapsed_ms
+                    candidates, requested = _last_scan(cur) if setting else (None, None)
+                    attempts.append((effort, elapsed_ms, len(rows), candidates))
+
+                    if len(rows) >= top_k or effort >= maximum:
+                        break
+                    if not _wider_search_helps(index['method'], metadata_filter is not None, effort,
+                                               max_candidates, candidates, requested):
+                        break
+                    wider = min(maximum, effort * 2)
+                    # Index search cost grows roughly linearly with the effort
+                    if spent_ms + elapsed_ms * wider / effort > latency_budget_ms:
+                        break
+                    effort = wider
+            set_attribute('results', len(rows))
+            if setting:
+                set_attribute(setting, effort)
+                set_attribute('search_attempts', len(attempts))
+                _record_search(setting, attempts, top_k)
+
+        return [_result(chunk_id, text, similarity, metadata) for chunk_id, text, similarity, metadata in rows]
+
+    def hybrid_search(self, query_text: str, query_embedding: List[float], top_k: int = 5,
+                      candidates: int = 40, rrf_k: int = 60, semantic_weight: float = 1.0,
+                      full_text_weight: float = 1.0,
+                      metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Vector and full-text search fused with Reciprocal Rank Fusion, in one query.
+
+        Runs bedrock_integration.hybrid_search (scripts/aurora_hybrid.sql):
+        the nearest `candidates` chunks and the best `candidates` matches of
+        the Spanish full-text query (accents ignored) are ranked separately
+        and scored weight / (rrf_k + rank) per list.
+
+        Args:
+            query_text (str): User question, parsed like a web search
+                ("quoted phrases", -excluded, or)
+            query_embedding (List[float]): Embedding of the question
+            top_k (int): Maximum results
+            candidates (int): Results taken from each list before fusion
+            rrf_k (int): RRF damping constant (60 is the usual choice)
+            semantic_weight (float): Weight of the vector ranking
+            full_text_weight (float): Weight of the full-text ranking
+            metadata_filter (Dict): Only chunks whose metadata contains these
+                key/values (JSONB @>)
+
+        Returns:
+            List of result dicts as in search_similar_documents, plus
+            'score', 'semantic_rank' and 'keyword_rank' (None when the chunk
+            is not in that list), best first
+
+        Example:
+            >>> db.hybrid_search("días de vacaciones", embed("días de vacaciones"), top_k=3)
+        """
+        with start_span("vector_db.hybrid_search", top_k=top_k):
+            index = self._vector_index()
+            with self._connection() as conn, conn, conn.cursor() as cur:
+                if index is not None:
+                    # The index scan must be able to return every candidate
+                    setting = _SEARCH_SETTINGS[index['method']]
+                    effort, _ = effort_range(index, candidates)
+                    cur.execute(f"SET LOCAL {setting} = {int(effort)}")
+                cur.execute(
+                    "SELECT id, chunks, similarity, score, semantic_rank, keyword_rank, metadata "
+                    "FROM bedrock_integration.hybrid_search(%s, %s::vector, %s, %s, %s, %s, %s, %s::jsonb)",
+                    (query_text, vector_literal(query_embedding), top_k, candidates, rrf_k,
+                     semantic_weight, full_text_weight,
+                     json.dumps(metadata_filter, ensure_ascii=False) if metadata_filter else None)
+                )
+                rows = cur.fetchall()
+            set_attribute('results', len(rows))
+
+        results = []
+        for chunk_id, text, similarity, score, semantic_rank, keyword_rank, metadata in rows:
+            result = _result(chunk_id, text, similarity, metadata)
+            result.update(score=float(score), semantic_rank=semantic_rank, keyword_rank=keyword_rank)
+            results.append(result)
+        return results
+
+    def similarity_search(self, query_embedding: List[float], top_k: int = 5,
+                          threshold: float = 0.0) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Most similar chunks by cosine similarity.
+
+        Returns:
+            List of (text, similarity, metadata), best first
+        """
+        return [
+            (result['text'], result['similarity'], result['metadata'])
+            for result in self.search_similar_documents(query_embedding, top_k, threshold)
+        ]
+
+    def _vector_index(self) -> Optional[Dict[str, Any]]:
+        """The ANN index on bedrock_kb.embedding (cached for INDEX_CACHE_TTL seconds)."""
+        now = time.monotonic()
+        with _stats_cache_lock:
+            cached = _index_cache.get(self._stats_key)
+        if cached is not None and now - cached[0] <= INDEX_CACHE_TTL:
+            return cached[1]
+
+        with self._connection() as conn, conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT am.amname, COALESCE(c.reloptions, '{{}}'), obj_description(c.oid, 'pg_class')
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                WHERE i.indrelid = '{KB_TABLE}'::regclass AND i.indisvalid
+                  AND am.amname IN ('hnsw', 'ivfflat')
+                ORDER BY c.relname = 'bedrock_kb_embedding_idx' DESC
+                LIMIT 1
+            """)
+            row = cur.fetchone()
+
+        index = None
+        if row is not None:
+            method, reloptions, comment = row
+            options = {}
+            for option in reloptions:
+                key, _, value = option.partition('=')
+                options[key] = int(value) if value.isdigit() else value
+            advisor = {}
+            if comment:
+                try:
+                    advisor = json.loads(comment).get('advisor') or {}
+                except (ValueError, AttributeError):
+                    pass  # Not an advisor comment
+            index = {'method': method, 'options': options,
+                     'baseline': advisor.get('query', {}).get(_SEARCH_SETTINGS[method])}
+        with _stats_cache_lock:
+            _index_cache[self._stats_key] = (now, index)
+        return index
+
+    def search_tuning_statistics(self) -> Dict[str, Any]:
+        """
+        Search attempts of this process by effort value, for calibrating the
+        DB_HNSW_* / DB_IVFFLAT_* settings and the advisor's recall targets.
+
+        Returns:
+            Dict mapping "setting=effort" to 'attempts', 'p50_ms', 'p95_ms',
+            'mean_results' and 'mean_candidates' (index rows examined)
+        """
+        with _search_log_lock:
+            attempts = list(_search_attempts)
+        grouped: Dict[Tuple[str, int], List[Tuple[float, int, Optional[int]]]] = {}
+        for setting, effort, elapsed_ms, results, candidates in attempts:
+            grouped.setdefault((setting, effort), []).append((elapsed_ms, results, candidates))
+        summary = {}
+        for (setting, effort), values in sorted(grouped.items()):
+            timings = sorted(ms for ms, _, _ in values)
+            examined = [c for _, _, c in values if c is not None]
+            summary[f"{setting}={effort}"] = {
+                'attempts': len(values),
+                'p50_ms': timings[len(timings) // 2],
+                'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                'mean_results': sum(r for _, r, _ in values) / len(values),
+                'mean_candidates': sum(examined) / len(examined) if examined else None
+            }
+        return summary
+
+    def log_query(self, query_text: str, query_embedding: Optional[List[float]], results_count: int,
+                  response_time_ms: float, metadata: Optional[Dict[str, Any]] = None,
+                  user_id: Optional[str] = None, session_id: Optional[str] = None) -> None:
+        """
+        Record a query for analytics (and for scripts/replay_queries.py).
+
+        With QUERY_LOG_ASYNC (default) the row is queued and written in the
+        background; call flush_query_log() to wait for it.
+        """
+        row = (query_text, query_embedding, results_count, response_time_ms, metadata, user_id, session_id)
+        self.connect()
+        if not QUERY_LOG_ASYNC:
+            _write_log_rows(self.pool, [row])
+            return
+        _log_writer_for(self._stats_key, self.pool).submit(row)
+
+    def flush_query_log(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued log_query rows are written; False on timeout."""
+        self.connect()
+        return _log_writer_for(self._stats_key, self.pool).flush(timeout)
+
+    def query_log_statistics(self) -> Dict[str, int]:
+        """Counters of the background query log writer (see QueryLogWriter.stats)."""
+        self.connect()
+        return _log_writer_for(self._stats_key, self.pool).stats()
+
+    def _invalidate_statistics(self) -> None:
+        with _stats_cache_lock:
+            _stats_cache.pop(self._stats_key, None)
+
+    def get_statistics(self, max_age: float = STATS_CACHE_TTL) -> Dict[str, Any]:
+        """
+        Chunk counts per source file.
+
+        Args:
+            max_age (float): Reuse a result up to this many seconds old
+                (0 always queries)
+
+        Returns:
+            Dict with 'total_chunks', 'total_files' and 'files' ({file_name: chunks})
+        """
+        now = time.monotonic()
+        with _stats_cache_lock:
+            cached = _stats_cache.get(self._stats_key)
+        if cached is not None and max_age > 0 and now - cached[0] <= max_age:
+            return cached[1]
+
+        with start_span("vector_db.get_statistics"):
+            with self._connection() as conn, conn, conn.cursor() as cur:
+                try:
+                    cur.execute("SELECT file_name, chunk_count FROM bedrock_integration.get_kb_file_statistics()")
+                except psycopg2.errors.UndefinedFunction:
+                    # Database predates scripts/aurora_kb_stats.sql
+                    print("⚠ get_kb_file_statistics() missing; run scripts/aurora_kb_stats.sql. "
+                          "Falling back to a full table scan.")
+                    conn.rollback()
+                    cur.execute(
+                        f"SELECT COALESCE(metadata->>'file_name', metadata->>'source', 'unknown'), COUNT(*) "
+                        f"FROM {KB_TABLE} GROUP BY 1 ORDER BY 1"
+                    )
+                files = {name: count for name, count in cur.fetchall()}
+            set_attribute('total_files', len(files))
+
+        stats = {
+            'total_chunks': sum(files.values()),
+            'total_files': len(files),
+            'files': files
+        }
+        with _stats_cache_lock:
+            _stats_cache[self._stats_key] = (now, stats)
+        return stats
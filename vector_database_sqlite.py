@@ -0,0 +1,527 @@
+"""
+SQLite Vector Database for DocSmart RAG System
+AWS AI Engineer Nanodegree - Final Project
+
+Local backend (DB_HOST=sqlite) with the same interface as the Aurora
+VectorDatabase, used for development and the demo:
+- VectorDatabaseSQLite.insert_chunks / delete_chunks: Store and remove chunks
+- VectorDatabaseSQLite.similarity_search: (text, score, metadata) tuples
+- VectorDatabaseSQLite.search_similar_documents: Result dicts for the RAG system
+- VectorDatabaseSQLite.log_query: Query analytics
+- VectorDatabaseSQLite.get_statistics: Chunk counts per file (from a
+  trigger-maintained summary table)
+
+The database runs in WAL mode, so searches read a consistent snapshot while
+ingestion writes. Each thread keeps one open connection (sqlite3
+connections cannot be shared across threads) with its own prepared
+statement cache, and the schema is checked once per process, not per call.
+
+Embeddings are stored as raw little-endian float32 BLOBs and loaded with
+numpy.frombuffer, without parsing. Searches do not read them per query:
+every process keeps one resident, row-normalized matrix per database file
+(EmbeddingMatrix), so a search is a single matrix-vector product. The
+matrix is updated in place by this process's inserts and deletes; a
+generation counter in the kb_state table (bumped by triggers on every
+change to documents) tells it when another process wrote, and it reloads.
+
+log_query only queues the row: a background QueryLogWriter (see
+query_log_writer.py) per database file inserts queued rows in batches.
+
+Configuration (environment variables):
+    SQLITE_DB_PATH  Database file (default: DB_NAME when DB_HOST=sqlite,
+                    otherwise docsmart.db)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from query_log_writer import QUERY_LOG_ASYNC, QueryLogWriter
+from tracing import set_attribute, start_span
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH") or (
+    os.getenv("DB_NAME", "docsmart.db") if os.getenv("DB_HOST") == "sqlite" else "docsmart.db"
+)
+
+# Prepared statements kept per connection (sqlite3 caches them by SQL text)
+STATEMENT_CACHE_SIZE = 128
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    file_name TEXT,
+    chunk_index INTEGER,
+    text TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    metadata TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS documents_file_name ON documents (file_name);
+
+-- Bumped on every embedding change; resident matrices compare it to reload
+CREATE TABLE IF NOT EXISTS kb_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO kb_state (id, generation) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS documents_generation_insert AFTER INSERT ON documents
+BEGIN UPDATE kb_state SET generation = generation + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS documents_generation_delete AFTER DELETE ON documents
+BEGIN UPDATE kb_state SET generation = generation + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS documents_generation_update AFTER UPDATE OF embedding ON documents
+BEGIN UPDATE kb_state SET generation = generation + 1 WHERE id = 1; END;
+
+-- Chunks per file, maintained by triggers so get_statistics never scans documents
+CREATE TABLE IF NOT EXISTS file_stats (
+    file_name TEXT PRIMARY KEY,
+    chunk_count INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS file_stats_insert AFTER INSERT ON documents
+BEGIN
+    INSERT INTO file_stats (file_name, chunk_count) VALUES (COALESCE(NEW.file_name, 'unknown'), 1)
+    ON CONFLICT (file_name) DO UPDATE SET chunk_count = chunk_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS file_stats_delete AFTER DELETE ON documents
+BEGIN
+    UPDATE file_stats SET chunk_count = chunk_count - 1 WHERE file_name = COALESCE(OLD.file_name, 'unknown');
+    DELETE FROM file_stats WHERE file_name = COALESCE(OLD.file_name, 'unknown') AND chunk_count <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS file_stats_update AFTER UPDATE OF file_name ON documents
+BEGIN
+    UPDATE file_stats SET chunk_count = chunk_count - 1 WHERE file_name = COALESCE(OLD.file_name, 'unknown');
+    DELETE FROM file_stats WHERE file_name = COALESCE(OLD.file_name, 'unknown') AND chunk_count <= 0;
+    INSERT INTO file_stats (file_name, chunk_count) VALUES (COALESCE(NEW.file_name, 'unknown'), 1)
+    ON CONFLICT (file_name) DO UPDATE SET chunk_count = chunk_count + 1;
+END;
+-- Backfill databases created before file_stats existed
+INSERT INTO file_stats (file_name, chunk_count)
+SELECT COALESCE(file_name, 'unknown'), COUNT(*) FROM documents
+WHERE NOT EXISTS (SELECT 1 FROM file_stats)
+GROUP BY 1;
+
+CREATE TABLE IF NOT EXISTS query_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query_text TEXT NOT NULL,
+    query_embedding BLOB,
+    results_count INTEGER,
+    response_time_ms REAL,
+    metadata TEXT,
+    user_id TEXT,
+    session_id TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Statement texts are constants so every call reuses the prepared statement
+# An upsert (not INSERT OR REPLACE, which skips delete triggers) keeps file_stats exact
+_INSERT_CHUNK = (
+    "INSERT INTO documents (id, file_name, chunk_index, text, embedding, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET file_name = excluded.file_name, chunk_index = excluded.chunk_index, "
+    "text = excluded.text, embedding = excluded.embedding, metadata = excluded.metadata"
+)
+_DELETE_CHUNK = "DELETE FROM documents WHERE id = ?"
+_SELECT_EMBEDDINGS = "SELECT id, embedding FROM documents"
+_SELECT_CHUNK = "SELECT text, metadata, file_name, chunk_index FROM documents WHERE id = ?"
+_SELECT_GENERATION = "SELECT generation FROM kb_state WHERE id = 1"
+_SELECT_METADATA = "SELECT metadata FROM documents WHERE id = ?"
+_UPDATE_METADATA = "UPDATE documents SET metadata = ? WHERE id = ?"
+_FILE_COUNTS = "SELECT file_name, chunk_count FROM file_stats ORDER BY file_name"
+_INSERT_LOG = (
+    "INSERT INTO query_logs (query_text, query_embedding, results_count, response_time_ms, "
+    "metadata, user_id, session_id) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def encode_embedding(embedding: Iterable[float]) -> bytes:
+    """Little-endian float32 bytes of an embedding."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def decode_embedding(data: Any) -> np.ndarray:
+    """float32 array from a stored embedding (also reads legacy JSON text)."""
+    if isinstance(data, str):
+        return np.asarray(json.loads(data), dtype=np.float32)
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def open_connection(db_path: str) -> sqlite3.Connection:
+    """Connection in WAL mode with a prepared statement cache."""
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints; commits no longer fsync the main file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def _log_row(row: Tuple) -> Tuple:
+    query_text, query_embedding, results_count, response_time_ms, metadata, user_id, session_id = row
+    return (
+        query_text,
+        encode_embedding(query_embedding) if query_embedding is not None else None,
+        results_count, response_time_ms,
+        json.dumps(metadata or {}, ensure_ascii=False), user_id, session_id
+    )
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+# ============================================================================
+# Resident Embedding Matrix
+# ============================================================================
+
+class EmbeddingMatrix:
+    """
+    All embeddings of one database file as a row-normalized float32 matrix.
+
+    Rows live in a growable buffer with an id -> row map; deletes move the
+    last row into the freed slot. `generation` is the kb_state generation
+    the matrix reflects, or None when it must be (re)loaded.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.generation: Optional[int] = None
+        self.loads = 0
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        """Read every embedding and the generation from one snapshot."""
+        conn.execute("BEGIN")
+        try:
+            generation = conn.execute(_SELECT_GENERATION).fetchone()[0]
+            rows = conn.execute(_SELECT_EMBEDDINGS).fetchall()
+        finally:
+            conn.commit()
+        self.ids = [row[0] for row in rows]
+        self.rows = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        if rows:
+            self.matrix = _normalize(np.vstack([decode_embedding(row[1]) for row in rows]))
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.generation = generation
+        self.loads += 1
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self.matrix.shape[1] not in (0, dim):
+            raise ValueError(f"Embedding dimension {dim} does not match stored {self.matrix.shape[1]}")
+        capacity = self.matrix.shape[0]
+        if rows > capacity or self.matrix.shape[1] == 0:
+            grown = np.zeros((max(rows, capacity * 3 // 2, 1024), dim), dtype=np.float32)
+            if self.ids:
+                grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+            self.matrix = grown
+
+    def upsert(self, chunk_ids: List[str], vectors: np.ndarray) -> None:
+        vectors = _normalize(vectors)
+        self._reserve(len(self.ids) + len(chunk_ids), vectors.shape[1])
+        for chunk_id, vector in zip(chunk_ids, vectors):
+            row = self.rows.get(chunk_id)
+            if row is None:
+                row = self.rows[chunk_id] = len(self.ids)
+                self.ids.append(chunk_id)
+            self.matrix[row] = vector
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        for chunk_id in chunk_ids:
+            row = self.rows.pop(chunk_id, None)
+            if row is None:
+                continue
+            last_id = self.ids.pop()
+            if last_id != chunk_id:
+                self.ids[row] = last_id
+                self.rows[last_id] = row
+                self.matrix[row] = self.matrix[len(self.ids)]
+
+    def top(self, query: np.ndarray, top_k: int, threshold: float) -> List[Tuple[str, float]]:
+        n = len(self.ids)
+        if n == 0 or top_k <= 0:
+            return []
+        scores = self.matrix[:n] @ _normalize(query)
+        k = min(top_k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > threshold]
+
+
+_matrices: Dict[str, EmbeddingMatrix] = {}
+_matrices_lock = threading.Lock()
+
+
+def _matrix_for(db_path: str) -> EmbeddingMatrix:
+    """The process-wide matrix of a database file (shared by all sessions)."""
+    key = os.path.realpath(db_path)
+    with _matrices_lock:
+        if key not in _matrices:
+            _matrices[key] = EmbeddingMatrix()
+        return _matrices[key]
+
+
+_log_writers: Dict[str, QueryLogWriter] = {}
+
+
+def _log_writer_for(db_path: str) -> QueryLogWriter:
+    """The process-wide query log writer of a database file."""
+    key = os.path.realpath(db_path)
+    with _matrices_lock:
+        writer = _log_writers.get(key)
+        if writer is None or writer.closed:
+            local = threading.local()
+
+            def write_rows(rows):
+                # Runs on the writer thread, which keeps its own connection
+                if getattr(local, 'conn', None) is None:
+                    local.conn = open_connection(db_path)
+                with local.conn as conn:
+                    conn.executemany(_INSERT_LOG, [_log_row(row) for row in rows])
+
+            writer = _log_writers[key] = QueryLogWriter(write_rows)
+        return writer
+
+# ============================================================================
+# Vector Database
+# ============================================================================
+
+class VectorDatabaseSQLite:
+    """SQLite knowledge base with per-thread WAL connections."""
+
+    def __init__(self, db_path: str = SQLITE_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self.matrix = _matrix_for(db_path)
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection (opened, and the schema checked, on first use)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = open_connection(self.db_path)
+            with self._lock:
+                self._connections.append(conn)
+            if not self._schema_ready:
+                self._create_schema(conn)
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+
+    def connect(self) -> None:
+        """Open the calling thread's connection and make sure the schema exists."""
+        self.conn
+
+    def initialize_schema(self) -> None:
+        """Create the tables and indexes if they do not exist."""
+        self._create_schema(self.conn)
+
+    def close(self) -> None:
+        """Close the connections of every thread."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def insert_chunks(self, chunks: List[Dict[str, Any]]) -> int:
+        """
+        Insert chunks (same row format as VectorDatabase.insert_chunks).
+
+        Args:
+            chunks (List[Dict]): Each with 'id', 'text', 'embedding' and 'metadata'
+
+        Returns:
+            Number of rows inserted
+        """
+        rows = []
+        for chunk in chunks:
+            metadata = chunk.get('metadata', {})
+            rows.append((
+                chunk['id'], metadata.get('file_name'), metadata.get('chunk_index'), chunk['text'],
+                encode_embedding(chunk['embedding']), json.dumps(metadata, ensure_ascii=False)
+            ))
+        if not rows:
+            return 0
+        with start_span("sqlite.insert_chunks", rows=len(rows)):
+            self._write(
+                lambda conn: conn.executemany(_INSERT_CHUNK, rows),
+                lambda matrix: matrix.upsert(
+                    [row[0] for row in rows],
+                    np.vstack([decode_embedding(row[4]) for row in rows])
+                )
+            )
+        return len(rows)
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete chunks by id; returns the number of rows removed."""
+        if not chunk_ids:
+            return 0
+        deleted = [0]
+
+        def delete(conn):
+            # rowcount sums changes() per statement, which excludes the rows
+            # the kb_state/file_stats triggers write (total_changes does not)
+            deleted[0] = conn.executemany(_DELETE_CHUNK, [(cid,) for cid in chunk_ids]).rowcount
+
+        self._write(delete, lambda matrix: matrix.remove(chunk_ids))
+        return deleted[0]
+
+    def _write(self, statement, update_matrix) -> None:
+        """
+        Run a write to documents and apply the same change to the resident matrix.
+
+        The write lock is taken up front so the generations read before and
+        after belong to this write alone; if the matrix was current before,
+        it is updated in place instead of reloaded.
+        """
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.execute(_SELECT_GENERATION).fetchone()[0]
+            statement(conn)
+            after = conn.execute(_SELECT_GENERATION).fetchone()[0]
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        with self.matrix.lock:
+            if self.matrix.generation == before:
+                update_matrix(self.matrix)
+                self.matrix.generation = after
+
+    def set_chunk_sources(self, chunk_id: str, sources: List[Dict[str, Any]]) -> None:
+        """Store the other sources of a deduplicated chunk in metadata.duplicate_sources."""
+        with self.conn as conn:
+            row = conn.execute(_SELECT_METADATA, (chunk_id,)).fetchone()
+            if row is None:
+                return
+            metadata = json.loads(row[0] or '{}')
+            if sources:
+                metadata['duplicate_sources'] = sources
+            else:
+                metadata.pop('duplicate_sources', None)
+            conn.execute(_UPDATE_METADATA, (json.dumps(metadata, ensure_ascii=False), chunk_id))
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _top_matches(self, query_embedding: List[float], top_k: int,
+                     threshold: float) -> List[Tuple[str, float]]:
+        conn = self.conn
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self.matrix.lock:
+            generation = conn.execute(_SELECT_GENERATION).fetchone()[0]
+            if self.matrix.generation != generation:
+                # First search, or another process changed the table
+                self.matrix.load(conn)
+                set_attribute('matrix_reloaded', True)
+            return self.matrix.top(query, top_k, threshold)
+
+    def similarity_search(self, query_embedding: List[float], top_k: int = 5,
+                          threshold: float = 0.0) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Most similar chunks by cosine similarity.
+
+        Returns:
+            List of (text, similarity, metadata), best first
+        """
+        return [
+            (result['text'], result['similarity'], result['metadata'])
+            for result in self.search_similar_documents(query_embedding, top_k, threshold)
+        ]
+
+    def search_similar_documents(self, query_embedding: List[float], top_k: int = 5,
+                                 similarity_threshold: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Most similar chunks by cosine similarity, as dicts for the RAG system.
+
+        Returns:
+            List of dicts with 'id', 'text', 'similarity', 'file_name',
+            'chunk_index' and 'metadata', best first
+        """
+        with start_span("sqlite.search", top_k=top_k):
+            matches = self._top_matches(query_embedding, top_k, similarity_threshold)
+            results = []
+            for chunk_id, score in matches:
+                text, metadata, file_name, chunk_index = self.conn.execute(_SELECT_CHUNK, (chunk_id,)).fetchone()
+                results.append({
+                    'id': chunk_id,
+                    'text': text,
+                    'similarity': score,
+                    'file_name': file_name or 'unknown',
+                    'chunk_index': chunk_index,
+                    'metadata': json.loads(metadata or '{}')
+                })
+            set_attribute('results', len(results))
+        return results
+
+    # ------------------------------------------------------------------
+    # Analytics
+    # ------------------------------------------------------------------
+
+    def log_query(self, query_text: str, query_embedding: Optional[List[float]], results_count: int,
+                  response_time_ms: float, metadata: Optional[Dict[str, Any]] = None,
+                  user_id: Optional[str] = None, session_id: Optional[str] = None) -> None:
+        """
+        Record a query for analytics.
+
+        With QUERY_LOG_ASYNC (default) the row is queued and written in the
+        background; call flush_query_log() to wait for it.
+        """
+        row = (query_text, query_embedding, results_count, response_time_ms, metadata, user_id, session_id)
+        if not QUERY_LOG_ASYNC:
+            with self.conn as conn:
+                conn.execute(_INSERT_LOG, _log_row(row))
+            return
+        if not self._schema_ready:
+            self.connect()
+        _log_writer_for(self.db_path).submit(row)
+
+    def flush_query_log(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued log_query rows are written; False on timeout."""
+        return _log_writer_for(self.db_path).flush(timeout)
+
+    def query_log_statistics(self) -> Dict[str, int]:
+        """Counters of the background query log writer (see QueryLogWriter.stats)."""
+        return _log_writer_for(self.db_path).stats()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Chunk counts per source file.
+
+        Returns:
+            Dict with 'total_chunks', 'total_files' and 'files' ({file_name: chunks})
+        """
+        files = {name: count for name, count in self.conn.execute(_FILE_COUNTS).fetchall()}
+        return {
+            'total_chunks': sum(files.values()),
+            'total_files': len(files),
+            'files': files
+        }